@@ -0,0 +1,73 @@
+# -----------------------------------------------------------
+# Checked-in evidently_*.jsonl vs the columnar chunk file (chunk_file.py)
+# per codec: file size, write time, load (lazy records, nothing decoded
+# yet), full load (every field of every record as a dict), text column
+# only, and one doc's chunks through the file index (JSONL has to parse
+# every line for it)
+#   python bench_chunk_file.py [--repeat 5]
+# -----------------------------------------------------------
+import os, sys, json, time, argparse, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DermaScan-Agent"))
+from chunk_file import CODECS, EXT, ChunkReader, convert_jsonl, read_chunks
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def best_of(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def load_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def one_file(path: str, filenames):
+    """Every doc's chunks, one doc at a time, through a fresh reader (no block cache carried over)."""
+    for fn in filenames:
+        with ChunkReader(path) as r:
+            r.records_for(fn)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", default=HERE)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'file':<28} | {'codec':<5} | {'KB':>6} | {'smaller':>7} | {'write ms':>8} | {'load ms':>7} | "
+          f"{'faster':>6} | {'full ms':>7} | {'faster':>6} | {'text ms':>7} | {'1 doc ms':>8} | {'faster':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in sorted(os.listdir(args.data_dir)):
+            src = os.path.join(args.data_dir, name)
+            if not (name.startswith("evidently_") and name.endswith(".jsonl")) or not os.path.getsize(src):
+                continue
+            size = os.path.getsize(src)
+            t_json, rows = best_of(lambda: load_jsonl(src), args.repeat)
+            filenames = list(dict.fromkeys(r.get("filename") for r in rows))
+            per_doc_json = t_json   # a JSONL file has no index: one doc costs a full parse
+            print(f"{name:<28} | {'jsonl':<5} | {size / 1024:>6.0f} | {'':>7} | {'':>8} | {t_json:>7.1f} | "
+                  f"{'':>6} | {t_json:>7.1f} | {'':>6} | {'':>7} | {per_doc_json:>8.2f} | {'':>6}")
+            for codec in CODECS:
+                dst = os.path.join(tmp, f"{os.path.splitext(name)[0]}.{codec}{EXT}")
+                t_write, _ = best_of(lambda: convert_jsonl(src, dst, codec), 1)
+                t_load, back = best_of(lambda: read_chunks(dst), args.repeat)
+                t_full, full = best_of(lambda: read_chunks(dst, lazy=False), args.repeat)
+                assert back == rows and full == rows, f"{name}: {codec} round trip differs"
+                with ChunkReader(dst) as r:
+                    t_text, _ = best_of(lambda: r.column("text"), args.repeat)
+                t_docs, _ = best_of(lambda: one_file(dst, filenames), 1)
+                per_doc = t_docs / max(1, len(filenames))
+                print(f"{'':<28} | {codec:<5} | {os.path.getsize(dst) / 1024:>6.0f} | "
+                      f"{size / os.path.getsize(dst):>6.1f}x | {t_write:>8.1f} | {t_load:>7.1f} | "
+                      f"{t_json / t_load:>5.1f}x | {t_full:>7.1f} | {t_json / t_full:>5.1f}x | {t_text:>7.1f} | {per_doc:>8.2f} | {per_doc_json / per_doc:>5.0f}x")
+
+
+if __name__ == "__main__":
+    main()
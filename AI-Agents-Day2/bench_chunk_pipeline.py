@@ -0,0 +1,90 @@
+# -----------------------------------------------------------
+# Three-pass chunking (the old main) vs the single-pass pipeline
+#   python bench_chunk_pipeline.py --repeat 10
+# The Evidently docs are rebuilt offline by stitching the checked-in
+# evidently_sliding.jsonl windows back together via their start offsets.
+# -----------------------------------------------------------
+import os, json, time, argparse, tempfile, tracemalloc
+from typing import Dict, List
+
+from chunk_day2 import (CHUNKERS, OUTPUTS, make_doc_id, sliding_window, split_paragraphs,
+                        split_markdown_by_level, write_jsonl, run_pipeline)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_evidently_docs(path: str = os.path.join(HERE, "evidently_sliding.jsonl")) -> List[Dict]:
+    docs: Dict[str, Dict] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            d = docs.setdefault(r["filename"], {
+                "doc_id": make_doc_id(r["source"], r["filename"]),
+                "source": r["source"], "filename": r["filename"],
+                "metadata": r.get("metadata", {}), "content": "",
+            })
+            d["content"] = d["content"][:r["start"]] + r["text"]
+    return list(docs.values())
+
+
+def three_pass(docs: List[Dict], opts: Dict, outdir: str) -> None:
+    """What main() did before: one full list per strategy, metadata copied per chunk."""
+    sliding_out = []
+    for d in docs:
+        for c in sliding_window(d["content"], size=opts["size"], overlap=opts["overlap"]):
+            sliding_out.append({"split_type": "sliding", "source": d["source"], "filename": d["filename"],
+                                "metadata": d["metadata"], "start": c["start"], "end": c["end"], "text": c["text"]})
+    write_jsonl(sliding_out, os.path.join(outdir, "sliding.jsonl"))
+    para_out = []
+    for d in docs:
+        for i, p in enumerate(split_paragraphs(d["content"])):
+            para_out.append({"split_type": "paragraph", "source": d["source"], "filename": d["filename"],
+                             "metadata": d["metadata"], "paragraph_index": i, "text": p})
+    write_jsonl(para_out, os.path.join(outdir, "paragraph.jsonl"))
+    sect_out = []
+    for d in docs:
+        for i, s in enumerate(split_markdown_by_level(d["content"], level=opts["section_level"])):
+            sect_out.append({"split_type": "section", "source": d["source"], "filename": d["filename"],
+                             "metadata": d["metadata"], "section_index": i, "text": s})
+    write_jsonl(sect_out, os.path.join(outdir, "section.jsonl"))
+
+
+def measure(label: str, fn) -> None:
+    """Time a clean run, then repeat under tracemalloc for the peak (tracing slows allocs)."""
+    t0 = time.perf_counter()
+    fn()
+    secs = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<26} | {secs:>7.2f}s | {peak / 2**20:>8.1f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=10, help="replicate the corpus N times")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+    opts = {"size": 2000, "overlap": 1000, "section_level": 2}
+
+    base = load_evidently_docs()
+    docs = [dict(d, filename=f"{k}/{d['filename']}") for k in range(args.repeat) for d in base]
+    print(f"{len(docs)} docs, {sum(len(d['content']) for d in docs) / 2**20:.1f} MB of text")
+    print(f"{'variant':<26} | {'time':>8} | {'peak (parent)':>8}")
+    with tempfile.TemporaryDirectory() as out:
+        outputs = {name: os.path.join(out, f"sp_{name}.jsonl") for name in OUTPUTS}
+        docs_path = os.path.join(out, "docs.jsonl")
+        measure("three-pass", lambda: three_pass(docs, opts, out))
+        measure("single-pass, in-process", lambda: run_pipeline(iter(docs), outputs, docs_path, opts, workers=1))
+        if args.workers > 1:
+            measure(f"single-pass, {args.workers} workers",
+                    lambda: run_pipeline(iter(docs), outputs, docs_path, opts, workers=args.workers))
+        sizes = {name: os.path.getsize(p) for name, p in outputs.items()}
+        old = sum(os.path.getsize(os.path.join(out, f"{n}.jsonl")) for n in CHUNKERS if n in OUTPUTS)
+        print(f"output bytes: three-pass {old / 2**20:.1f} MB, single-pass "
+              f"{(sum(sizes.values()) + os.path.getsize(docs_path)) / 2**20:.1f} MB (incl. docs file)")
+
+
+if __name__ == "__main__":
+    main()
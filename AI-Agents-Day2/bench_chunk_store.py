@@ -0,0 +1,70 @@
+# -----------------------------------------------------------
+# Sliding-window chunks as JSONL/dicts vs the offset-based ChunkStore
+#   python bench_chunk_store.py --size 2000 --overlap 1000
+# -----------------------------------------------------------
+import os, json, time, argparse, tempfile, tracemalloc
+
+from chunk_day2 import sliding_window
+from chunk_store import ChunkStore
+from bench_chunk_pipeline import load_evidently_docs
+
+
+def build_dicts(docs, size, overlap):
+    return [{"split_type": "sliding", "doc_id": d["doc_id"], "source": d["source"], "filename": d["filename"],
+             "start": c["start"], "end": c["end"], "text": c["text"]}
+            for d in docs for c in sliding_window(d["content"], size=size, overlap=overlap)]
+
+
+def build_store(docs, size, overlap):
+    store = ChunkStore(text_field="text")
+    for d in docs:
+        spans = ((c["start"], c["end"]) for c in sliding_window(d["content"], size=size, overlap=overlap))
+        store.add(d["content"], spans, doc_id=d["doc_id"], source=d["source"], filename=d["filename"])
+    return store
+
+
+def traced(fn):
+    tracemalloc.start()
+    out = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, current / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=2000)
+    ap.add_argument("--overlap", type=int, default=1000)
+    args = ap.parse_args()
+
+    docs = load_evidently_docs()
+    chunks, dict_mb = traced(lambda: build_dicts(docs, args.size, args.overlap))
+    store, store_mb = traced(lambda: build_store(docs, args.size, args.overlap))
+    print(f"{len(docs)} docs, {len(chunks)} chunks (size={args.size}, overlap={args.overlap})")
+    print(f"{'':<12} | {'memory MB':>10} | {'disk MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, "sliding.jsonl")
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for r in chunks:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        packed = os.path.join(tmp, "sliding.chunks")
+        store.save(packed)
+        print(f"{'dicts/JSONL':<12} | {dict_mb:>10.2f} | {os.path.getsize(jsonl) / 2**20:>8.2f}")
+        print(f"{'ChunkStore':<12} | {store_mb:>10.2f} | {os.path.getsize(packed) / 2**20:>8.2f}")
+
+        t0 = time.perf_counter()
+        with open(jsonl, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        t1 = time.perf_counter()
+        loaded = ChunkStore.load(packed)
+        t2 = time.perf_counter()
+        texts = [loaded.text(i) for i in range(len(loaded))]
+        t3 = time.perf_counter()
+        assert texts == [r["text"] for r in rows]
+        print(f"load: JSONL {1000 * (t1 - t0):.1f} ms, mmap store {1000 * (t2 - t1):.2f} ms "
+              f"(+{1000 * (t3 - t2):.1f} ms to materialize every chunk)")
+
+
+if __name__ == "__main__":
+    main()
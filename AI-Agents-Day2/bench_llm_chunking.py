@@ -0,0 +1,76 @@
+# -----------------------------------------------------------
+# LLM chunking against a fake local client (no API key, no network)
+#   python bench_llm_chunking.py --docs 40 --latency 0.3 --concurrency 8
+# FakeClient mimics client.responses.create with injected latency and
+# occasional 429s; a second run shows resume-after-crash.
+# -----------------------------------------------------------
+import os, time, random, argparse, tempfile, threading
+
+from chunk_day2_llm import run_llm_chunking
+from bench_chunk_pipeline import load_evidently_docs
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class Crash(Exception):
+    """Non-retryable, like a quota/auth error that aborts the run."""
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.output_text = text
+
+
+class FakeClient:
+    def __init__(self, latency: float, error_rate: float = 0.0, crash_after: int = -1):
+        self.latency, self.error_rate, self.crash_after = latency, error_rate, crash_after
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.responses = self   # client.responses.create(...)
+
+    def create(self, model: str, input):
+        with self.lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.latency)
+        if n == self.crash_after:
+            raise Crash("fake quota exhausted")
+        if random.random() < self.error_rate:
+            raise RateLimited("fake 429")
+        doc = input[0]["content"]
+        return FakeResponse("## Part A\n\n" + doc[:200] + "\n\n---\n\n## Part B\n\n" + doc[200:400])
+
+
+def timed(label: str, docs, out: str, client, **kw) -> None:
+    t0 = time.perf_counter()
+    stats = run_llm_chunking(docs, out, client=client, **kw)
+    print(f"{label:<34} {time.perf_counter() - t0:6.2f}s  calls={client.calls:<4} {stats}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=40)
+    ap.add_argument("--latency", type=float, default=0.3)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rps", type=float, default=20.0)
+    args = ap.parse_args()
+
+    docs = load_evidently_docs()[:args.docs]
+    with tempfile.TemporaryDirectory() as tmp:
+        def out(name):
+            return os.path.join(tmp, name)
+        timed("serial (concurrency=1)", docs, out("serial.jsonl"),
+              FakeClient(args.latency), concurrency=1, rps=1000)
+        timed(f"concurrent ({args.concurrency}, {args.rps} rps, 10% 429s)", docs, out("conc.jsonl"),
+              FakeClient(args.latency, error_rate=0.1), concurrency=args.concurrency, rps=args.rps)
+        # a fatal error midway, then rerun: only the unfinished docs are sent again
+        timed("fatal error on call 15", docs, out("resume.jsonl"),
+              FakeClient(args.latency, crash_after=15), concurrency=args.concurrency, rps=args.rps, retries=1)
+        timed("rerun (resume)", docs, out("resume.jsonl"),
+              FakeClient(args.latency), concurrency=args.concurrency, rps=args.rps)
+
+
+if __name__ == "__main__":
+    main()
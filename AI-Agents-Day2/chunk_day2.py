@@ -1,80 +1,58 @@
-﻿import io, os, sys, json, re, zipfile, argparse
-from typing import List, Dict
+﻿import os, sys, re, time, argparse, hashlib, tempfile
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List
 
-import requests
-
-# ---- Safe frontmatter parser (no external deps) ----
-_FM_START = re.compile(r"^---\s*$", re.MULTILINE)
+# shared streaming ZIP helpers live next to the Streamlit app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DermaScan-Agent"))
+from repo_zip import try_download, iter_zip_texts
+from ingest_manifest import IngestManifest, iter_changes, rewrite_jsonl
+from batch_ingest import ingest_many, format_throughput, fetch_zip, parse_zip
+from doc_parse import parse_frontmatter
+from chunk_store import ChunkStore
+from chunk_file import EXT, open_writer
+import tracing
+from tracing import span, record
 
+# ---- Frontmatter (head-only scan, cached, C YAML loader when available) ----
 def parse_frontmatter_safely(text: str) -> (Dict, str):
     """
     Returns (metadata_dict, content_str).
     If no YAML frontmatter, metadata={}, content=text.
-    If YAML block exists but no yaml lib, returns {} and full content after frontmatter.
+    If the YAML is invalid or no yaml lib is installed, returns {} and the content after frontmatter.
     """
-    if not text.startswith("---"):
-        return {}, text
-
-    # Find the first two '---' lines
-    matches = list(_FM_START.finditer(text))
-    if len(matches) < 2 or matches[0].start() != 0:
-        return {}, text
-
-    start = matches[0].end()
-    end = matches[1].start()
-    raw_yaml = text[start:end].strip()
-    body = text[matches[1].end():].lstrip("\n")
-
-    # Try to parse YAML if pyyaml is available; otherwise return empty metadata
-    meta = {}
-    try:
-        import yaml  # optional
-        meta = yaml.safe_load(raw_yaml) or {}
-        if not isinstance(meta, dict):
-            meta = {}
-    except Exception:
-        # no yaml or bad yaml: keep meta empty, still return body
-        meta = {}
-
-    return meta, body
-
-# ---------- Day 1 helpers: download & parse .md/.mdx ----------
-def zip_url(owner: str, repo: str, branch: str) -> str:
-    return f"https://codeload.github.com/{owner}/{repo}/zip/refs/heads/{branch}"
-
-def try_download(owner: str, repo: str, branches=("main","master")) -> bytes:
-    last_status = None
-    for br in branches:
-        resp = requests.get(zip_url(owner, repo, br), timeout=60)
-        last_status = resp.status_code
-        if resp.status_code == 200:
-            return resp.content
-    raise RuntimeError(f"Failed to download {owner}/{repo} (tried {branches}, last={last_status})")
+    return parse_frontmatter(text)
+
+# ---------- Day 1 helpers: stream & parse .md/.mdx ----------
+def make_doc_id(source: str, filename: str) -> str:
+    """Stable across runs and workers, so chunk files can reference docs by id."""
+    return hashlib.sha1(f"{source}/{filename}".encode("utf-8")).hexdigest()[:16]
+
+def make_doc(owner: str, repo: str, filename: str, text: str) -> Dict:
+    metadata, content = parse_frontmatter_safely(text)
+    return {
+        "doc_id": make_doc_id(f"{owner}/{repo}", filename),
+        "source": f"{owner}/{repo}",
+        "filename": filename,  # top folder already stripped
+        "metadata": metadata,
+        "content": content
+    }
+
+def iter_repo_docs(owner: str, repo: str, exts=(".md", ".mdx"), workers: int = 1) -> Iterator[Dict]:
+    """Yield one parsed doc at a time; the ZIP is spooled to disk, not buffered in RAM.
+    workers > 1 decodes and parses the members across a process pool (same order)."""
+    if workers > 1:
+        with tempfile.TemporaryDirectory() as tmp:
+            path, _ = fetch_zip(owner, repo, tmp)
+            yield from parse_zip(path, owner, repo, make_doc, exts, workers=workers)
+        return
+    with try_download(owner, repo, branches=("main","master")) as spool:
+        for filename, text in iter_zip_texts(spool, exts):
+            yield make_doc(owner, repo, filename, text)
 
 def read_repo_docs(owner: str, repo: str, exts=(".md", ".mdx")) -> List[Dict]:
-    blob = try_download(owner, repo, branches=("main","master"))
-    zf = zipfile.ZipFile(io.BytesIO(blob))
-    out: List[Dict] = []
-    for info in zf.infolist():
-        if info.is_dir():
-            continue
-        filename = info.filename
-        if not filename.lower().endswith(exts):
-            continue
-        try:
-            with zf.open(info) as f:
-                text = f.read().decode("utf-8", errors="ignore")
-                metadata, content = parse_frontmatter_safely(text)
-                out.append({
-                    "source": f"{owner}/{repo}",
-                    "filename": "/".join(filename.split("/")[1:]),  # strip top folder
-                    "metadata": metadata,
-                    "content": content
-                })
-        except Exception as e:
-            print(f"[WARN] {filename}: {e}")
-    zf.close()
-    return out
+    return list(iter_repo_docs(owner, repo, exts))
 
 # ---------- Chunkers ----------
 def sliding_window(text: str, size: int = 2000, overlap: int = 1000):
@@ -112,10 +90,151 @@ def split_markdown_by_level(text: str, level: int = 2):
     return sections
 
 # ---------- Output ----------
-def write_jsonl(records: List[Dict], path: str) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+def write_jsonl(records: Iterable[Dict], path: str) -> int:
+    """JSONL, or a columnar chunk file when `path` ends in chunk_file.EXT."""
+    with open_writer(path) as w:
+        return w.write_all(records)
+
+# ---------- Chunker registry ----------
+# name -> fn(doc, opts) yielding chunk records. Records carry `doc_id` instead of
+# a copy of the doc's metadata; metadata is written once to the docs file.
+CHUNKERS: Dict[str, Callable[[Dict, Dict], Iterator[Dict]]] = {}
+
+def chunker(name: str):
+    def register(fn):
+        CHUNKERS[name] = fn
+        return fn
+    return register
+
+@chunker("sliding")
+def sliding_records(d: Dict, opts: Dict) -> Iterator[Dict]:
+    for c in sliding_window(d["content"], size=opts["size"], overlap=opts["overlap"]):
+        yield {
+            "split_type": "sliding",
+            "doc_id": d["doc_id"],
+            "source": d["source"],
+            "filename": d["filename"],
+            "start": c["start"],
+            "end": c["end"],
+            "text": c["text"]
+        }
+
+@chunker("paragraph")
+def paragraph_records(d: Dict, opts: Dict) -> Iterator[Dict]:
+    for i, p in enumerate(split_paragraphs(d["content"])):
+        yield {
+            "split_type": "paragraph",
+            "doc_id": d["doc_id"],
+            "source": d["source"],
+            "filename": d["filename"],
+            "paragraph_index": i,
+            "text": p
+        }
+
+@chunker("section")
+def section_records(d: Dict, opts: Dict) -> Iterator[Dict]:
+    for i, s in enumerate(split_markdown_by_level(d["content"], level=opts["section_level"])):
+        yield {
+            "split_type": "section",
+            "doc_id": d["doc_id"],
+            "source": d["source"],
+            "filename": d["filename"],
+            "section_index": i,
+            "text": s
+        }
+
+def doc_record(d: Dict) -> Dict:
+    return {"doc_id": d["doc_id"], "source": d["source"], "filename": d["filename"], "metadata": d["metadata"]}
+
+# ---------- Single-pass pipeline ----------
+def chunk_doc(d: Dict, names: List[str], opts: Dict) -> Dict[str, List[Dict]]:
+    """Run every requested chunker over one doc (also the worker entry point)."""
+    return {name: list(CHUNKERS[name](d, opts)) for name in names}
+
+def _chunk_all(docs: Iterable[Dict], names: List[str], opts: Dict, workers: int) -> Iterator[tuple]:
+    """Yield (doc, {name: records}) in input order; at most workers*4 docs in flight."""
+    if workers <= 1:
+        for d in docs:
+            yield d, chunk_doc(d, names, opts)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for d in docs:
+            pending.append((d, pool.submit(chunk_doc, d, names, opts)))
+            if len(pending) >= workers * 4:
+                d0, fut = pending.popleft()
+                yield d0, fut.result()
+        while pending:
+            d0, fut = pending.popleft()
+            yield d0, fut.result()
+
+def run_pipeline(docs: Iterable[Dict], outputs: Dict[str, str], docs_path: str,
+                 opts: Dict, workers: int = 1) -> Dict[str, int]:
+    """Read `docs` once and stream every strategy in `outputs` (name -> path) to its own file.
+
+    A `.chunks` path stores that strategy as offsets into a ChunkStore instead of
+    JSONL text (records must carry start/end); a chunk_file.EXT path (also for
+    `docs_path`) writes a columnar chunk file. Empty docs are skipped. Returns
+    chunk counts per strategy plus "docs". Traced as one "chunk.pipeline" span
+    (read + chunk + write) and the summed "chunk.write" time, not per doc.
+    """
+    names = list(outputs)
+    counts = {name: 0 for name in names}
+    counts["docs"] = 0
+    stores = {name: ChunkStore(text_field="text") for name, path in outputs.items() if path.endswith(".chunks")}
+    write_s = 0.0
+    # on an error every writer drops its temp file; old outputs stay
+    with span("chunk.pipeline"), ExitStack() as stack:
+        writers = {name: stack.enter_context(open_writer(path))
+                   for name, path in outputs.items() if name not in stores}
+        docs_out = stack.enter_context(open_writer(docs_path))
+        nonempty = (d for d in docs if (d.get("content") or "").strip())
+        for d, per_strategy in _chunk_all(nonempty, names, opts, workers):
+            t0 = time.perf_counter()
+            docs_out.write(doc_record(d))
+            counts["docs"] += 1
+            for name, records in per_strategy.items():
+                counts[name] += len(records)
+                if name in stores:
+                    stores[name].add(d["content"], ((r["start"], r["end"]) for r in records),
+                                     split_type=name, doc_id=d["doc_id"], source=d["source"],
+                                     filename=d["filename"])
+                    continue
+                writers[name].write_all(records)
+            write_s += time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for name, store in stores.items():
+        store.save(outputs[name])
+    record("chunk.write", write_s + time.perf_counter() - t0)
+    return counts
+
+DOCS_PATH = "evidently_docs.jsonl"
+OUTPUTS = {
+    "sliding": "evidently_sliding.jsonl",
+    "paragraph": "evidently_paragraph.jsonl",
+    "section": "evidently_section.jsonl",
+}
+
+def main_incremental(args, opts: Dict, outputs: Dict[str, str] = OUTPUTS, docs_path: str = DOCS_PATH) -> None:
+    """Re-chunk only docs added/changed/deleted since the last run (evidently_manifest.json)."""
+    manifest = IngestManifest("evidently_manifest.json")
+    if not all(os.path.exists(p) for p in [docs_path, *outputs.values()]):
+        manifest.forget(f"{args.owner}/{args.repo}")
+
+    changes = {}
+    for filename, text in iter_changes(manifest, args.owner, args.repo, (".md", ".mdx"), params=opts):
+        changes[filename] = make_doc(args.owner, args.repo, filename, text) if text is not None else None
+    if not changes:
+        print("[OK] Up to date (no changed docs)")
+        return
+    docs = [d for d in changes.values() if d and (d.get("content") or "").strip()]
+    print(f"[INFO] {len(changes)} docs added/changed/deleted, re-chunking {len(docs)}")
+
+    rewrite_jsonl(docs_path, changes.keys(), (doc_record(d) for d in docs))
+    for name, path in outputs.items():
+        n = rewrite_jsonl(path, changes.keys(), (r for d in docs for r in CHUNKERS[name](d, opts)))
+        print(f"[OK] {path} (chunks: {n})")
+    manifest.save()
 
 def main():
     ap = argparse.ArgumentParser()
@@ -124,62 +243,54 @@ def main():
     ap.add_argument("--size", type=int, default=2000)
     ap.add_argument("--overlap", type=int, default=1000)
     ap.add_argument("--section_level", type=int, default=2)
+    ap.add_argument("--incremental", action="store_true",
+                    help="only re-chunk docs that changed since the last run")
+    ap.add_argument("--repos", nargs="+", metavar="OWNER/REPO",
+                    help="batch mode: download these repos concurrently (overrides --owner/--repo)")
+    ap.add_argument("--concurrency", type=int, default=8, help="parallel downloads in batch mode")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="worker processes for decoding + parsing and for chunking; 1 = in-process")
+    ap.add_argument("--offsets", action="store_true",
+                    help="write sliding windows as an offset-based ChunkStore (evidently_sliding.chunks)")
+    ap.add_argument("--columnar", action="store_true",
+                    help=f"write docs and chunks as compressed columnar chunk files (evidently_*{EXT})")
     args = ap.parse_args()
+    opts = {"size": args.size, "overlap": args.overlap, "section_level": args.section_level}
+    outputs, docs_path = dict(OUTPUTS), DOCS_PATH
+    if args.columnar:
+        outputs = {name: os.path.splitext(path)[0] + EXT for name, path in outputs.items()}
+        docs_path = os.path.splitext(DOCS_PATH)[0] + EXT
+    if args.offsets:
+        outputs["sliding"] = "evidently_sliding.chunks"
+
+    if args.incremental:
+        if args.offsets:
+            ap.error("--offsets cannot be combined with --incremental")
+        print(f"[INFO] Checking {args.owner}/{args.repo} for changes ...")
+        main_incremental(args, opts, outputs, docs_path)
+        return
+
+    if args.repos:
+        print(f"[INFO] Downloading {len(args.repos)} repos ...")
+        docs = []
+        repos = [tuple(r.split("/", 1)) for r in args.repos]
+        stats = ingest_many(repos, make_doc, docs.append, concurrency=args.concurrency, workers=args.workers)
+        print(f"[INFO] {format_throughput(stats)}")
+    else:
+        print(f"[INFO] Streaming {args.owner}/{args.repo} ...")
+        docs = iter_repo_docs(args.owner, args.repo, workers=args.workers)
 
-    print(f"[INFO] Downloading {args.owner}/{args.repo} ...")
-    docs = read_repo_docs(args.owner, args.repo)
-    docs = [d for d in docs if (d.get("content") or "").strip()]
-    print(f"[INFO] Parsed {len(docs)} docs with content")
-
-    sliding_out = []
-    for d in docs:
-        for c in sliding_window(d["content"], size=args.size, overlap=args.overlap):
-            sliding_out.append({
-                "split_type": "sliding",
-                "source": d["source"],
-                "filename": d["filename"],
-                "metadata": d["metadata"],
-                "start": c["start"],
-                "end": c["end"],
-                "text": c["text"]
-            })
-    write_jsonl(sliding_out, "evidently_sliding.jsonl")
-    print(f"[OK] sliding -> evidently_sliding.jsonl  (chunks: {len(sliding_out)})")
-
-    para_out = []
-    for d in docs:
-        paras = split_paragraphs(d["content"])
-        for i, p in enumerate(paras):
-            para_out.append({
-                "split_type": "paragraph",
-                "source": d["source"],
-                "filename": d["filename"],
-                "metadata": d["metadata"],
-                "paragraph_index": i,
-                "text": p
-            })
-    write_jsonl(para_out, "evidently_paragraph.jsonl")
-    print(f"[OK] paragraph -> evidently_paragraph.jsonl (chunks: {len(para_out)})")
-
-    sect_out = []
-    for d in docs:
-        secs = split_markdown_by_level(d["content"], level=args.section_level)
-        for i, s in enumerate(secs):
-            sect_out.append({
-                "split_type": "section",
-                "source": d["source"],
-                "filename": d["filename"],
-                "metadata": d["metadata"],
-                "section_index": i,
-                "text": s
-            })
-    write_jsonl(sect_out, "evidently_section.jsonl")
-    print(f"[OK] section -> evidently_section.jsonl (chunks: {len(sect_out)})")
+    counts = run_pipeline(docs, outputs, docs_path, opts, workers=args.workers)
+    print(f"[OK] {counts['docs']} docs with content -> {docs_path}")
+    for name, path in outputs.items():
+        print(f"[OK] {name} -> {path}  (chunks: {counts[name]})")
 
     print("\n[SUMMARY]")
-    print(f"  Sliding chunks : {len(sliding_out)}  (size={args.size}, overlap={args.overlap})")
-    print(f"  Paragraph chunks: {len(para_out)}")
-    print(f"  Section chunks  : {len(sect_out)}  (level={args.section_level})")
+    print(f"  Sliding chunks : {counts['sliding']}  (size={args.size}, overlap={args.overlap})")
+    print(f"  Paragraph chunks: {counts['paragraph']}")
+    print(f"  Section chunks  : {counts['section']}  (level={args.section_level})")
 
 if __name__ == "__main__":
     main()
+    if tracing.ENABLED:   # DERMASCAN_TRACE=0 to skip
+        print(tracing.summary())
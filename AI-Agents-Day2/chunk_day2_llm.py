@@ -1,16 +1,27 @@
-﻿import os, json
-from typing import List, Dict
+﻿import os, json, argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from tqdm.auto import tqdm
 from openai import OpenAI
 from dotenv import load_dotenv
 
-from chunk_day2 import read_repo_docs  # uses safe parser
+from chunk_day2 import iter_repo_docs  # uses safe parser; puts DermaScan-Agent on sys.path
+from ingest_manifest import rewrite_jsonl
+from ratelimit import TokenBucket, with_retries
+from llm_cache import LLMCache
 
 load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("Missing OPENAI_API_KEY in .env")
-client = OpenAI(api_key=api_key)
+_client = None
+
+def get_client() -> OpenAI:
+    """Created on first use so a fake client can be passed in without an API key."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("Missing OPENAI_API_KEY in .env")
+        _client = OpenAI(api_key=api_key)
+    return _client
 
 PROMPT = """
 Split the provided document into logical sections that make sense for a Q&A system.
@@ -30,32 +41,100 @@ Section content with all relevant details
 
 """.strip()
 
-def llm_sections(text: str, model: str = "gpt-4o-mini") -> List[str]:
-    prompt = PROMPT.format(document=text)
-    resp = client.responses.create(model=model, input=[{"role":"user","content":prompt}])
-    out = resp.output_text or ""
+def llm_sections(text: str, model: str = "gpt-4o-mini", client=None, cache: Optional[LLMCache] = None,
+                 before_call: Optional[Callable[[], None]] = None) -> List[str]:
+    def generate() -> str:
+        if before_call:   # e.g. a rate limit: taken only when the model is really called
+            before_call()
+        prompt = PROMPT.format(document=text)
+        resp = (client or get_client()).responses.create(model=model, input=[{"role":"user","content":prompt}])
+        return resp.output_text or ""
+    # unchanged docs are split once; reruns read the cached model output
+    out = cache.cached(model, PROMPT, {"document": text}, generate) if cache else generate()
     return [p.strip() for p in out.split("---") if p.strip()]
 
+# ---------- Checkpointing ----------
+def load_checkpoint(out_path: str) -> Set[str]:
+    """doc_ids fully written to out_path; records of half-written docs are dropped."""
+    ckpt = out_path + ".done"
+    done: Set[str] = set()
+    if os.path.exists(ckpt):
+        with open(ckpt, "r", encoding="utf-8") as f:
+            done = {line.strip() for line in f if line.strip()}
+    if os.path.exists(out_path):
+        with open(out_path, "r", encoding="utf-8") as f:
+            partial = {json.loads(line).get("doc_id") for line in f if line.strip()} - done
+        if partial:
+            rewrite_jsonl(out_path, partial, [], key="doc_id")
+    return done
+
+def run_llm_chunking(docs: Iterable[Dict], out_path: str, client=None, model: str = "gpt-4o-mini",
+                     concurrency: int = 4, rps: float = 2.0, retries: int = 5,
+                     cache: Optional[LLMCache] = None) -> Dict[str, int]:
+    """Chunk docs on a thread pool under a token-bucket limit (cache hits take no
+    token), appending as each doc finishes.
+
+    A rerun skips doc_ids listed in <out_path>.done, so a crash or quota error
+    loses at most the docs that were in flight.
+    """
+    done = load_checkpoint(out_path)
+    todo = [d for d in docs if (d.get("content") or "").strip() and d["doc_id"] not in done]
+    bucket = TokenBucket(rate=rps, capacity=max(1.0, rps))
+    stats = {"skipped": len(done), "done": 0, "failed": 0, "sections": 0}
+
+    def work(d: Dict) -> List[str]:
+        def call():
+            return llm_sections(d["content"], model=model, client=client, cache=cache, before_call=bucket.acquire)
+        return with_retries(call, attempts=retries,
+                            on_retry=lambda n, e, delay: tqdm.write(f"[RETRY {n}] {d['filename']}: {e} (sleep {delay:.1f}s)"))
+
+    with open(out_path, "a", encoding="utf-8") as out, open(out_path + ".done", "a", encoding="utf-8") as ckpt, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(work, d): d for d in todo}
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="LLM chunking"):
+            d = futures[fut]
+            try:
+                sections = fut.result()
+            except Exception as e:
+                tqdm.write(f"[WARN] {d['filename']}: {e}")
+                stats["failed"] += 1
+                continue
+            for i, s in enumerate(sections):
+                out.write(json.dumps({
+                    "split_type": "llm",
+                    "doc_id": d["doc_id"],
+                    "source": d["source"],
+                    "filename": d["filename"],
+                    "metadata": d["metadata"],
+                    "section_index": i,
+                    "text": s
+                }, ensure_ascii=False) + "\n")
+            out.flush()
+            ckpt.write(d["doc_id"] + "\n")
+            ckpt.flush()
+            stats["done"] += 1
+            stats["sections"] += len(sections)
+    return stats
+
 def main():
-    docs = read_repo_docs("evidentlyai", "docs")
-    docs = [d for d in docs if (d.get("content") or "").strip()]
-
-    results: List[Dict] = []
-    for d in tqdm(docs, desc="LLM chunking"):
-        sections = llm_sections(d["content"])
-        for i, s in enumerate(sections):
-            results.append({
-                "split_type": "llm",
-                "source": d["source"],
-                "filename": d["filename"],
-                "metadata": d["metadata"],
-                "section_index": i,
-                "text": s
-            })
-
-    with open("evidently_llm.jsonl", "w", encoding="utf-8") as f:
-        for r in results:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--owner", default="evidentlyai")
+    ap.add_argument("--repo", default="docs")
+    ap.add_argument("--out", default="evidently_llm.jsonl")
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    ap.add_argument("--rps", type=float, default=2.0, help="max requests per second")
+    ap.add_argument("--retries", type=int, default=5, help="attempts per doc on rate-limit/5xx errors")
+    ap.add_argument("--cache", default=".llm_cache.sqlite", help="model-output cache ('' to disable)")
+    args = ap.parse_args()
+
+    cache = LLMCache(args.cache) if args.cache else None
+    stats = run_llm_chunking(iter_repo_docs(args.owner, args.repo), args.out, model=args.model,
+                             concurrency=args.concurrency, rps=args.rps, retries=args.retries, cache=cache)
+    print(f"[OK] {args.out}: {stats['done']} docs chunked ({stats['sections']} sections), "
+          f"{stats['skipped']} already done, {stats['failed']} failed")
+    if cache:
+        print(f"[INFO] LLM cache: {cache.stats()}")
 
 if __name__ == "__main__":
     main()
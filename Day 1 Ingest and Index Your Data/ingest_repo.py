@@ -1,58 +1,98 @@
-﻿import io, os, sys, json, zipfile, requests, frontmatter
-from typing import List, Dict
-
-def zip_url(owner: str, repo: str, branch: str) -> str:
-    return f"https://codeload.github.com/{owner}/{repo}/zip/refs/heads/{branch}"
-
-def try_download(owner: str, repo: str, branches=("main","master")) -> bytes:
-    last_status = None
-    for br in branches:
-        url = zip_url(owner, repo, br)
-        resp = requests.get(url, timeout=60)
-        last_status = resp.status_code
-        if resp.status_code == 200:
-            return resp.content
-    raise RuntimeError(f"Failed to download {owner}/{repo} (tried {branches}, last status={last_status})")
+﻿import os, sys, tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# shared streaming ZIP helpers live next to the Streamlit app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DermaScan-Agent"))
+from repo_zip import try_download, iter_zip_texts
+from ingest_manifest import IngestManifest, iter_changes, rewrite_jsonl
+from batch_ingest import read_repo_list, ingest_many, format_throughput, fetch_zip, parse_zip
+from doc_parse import FrontmatterError, parse_frontmatter
+from chunk_file import EXT, open_writer
+import tracing
+from tracing import count
+
+def to_record(owner: str, repo: str, filename: str, text: str) -> Optional[Dict]:
+    try:
+        metadata, content = parse_frontmatter(text, strict=True)
+    except FrontmatterError as e:
+        count("ingest.parse_errors")
+        print(f"[WARN] Error processing {filename}: {e}")
+        return None
+    return {
+        "source": f"{owner}/{repo}",
+        "filename": filename,
+        "metadata": metadata,
+        "content": content.strip()
+    }
+
+def iter_repo_data(owner: str, repo: str, exts=(".md", ".mdx"), workers: int = 1) -> Iterator[Dict]:
+    """Yield one parsed record per doc; the archive is spooled, never held as bytes.
+    workers > 1 decodes and parses the members across a process pool (same order)."""
+    if workers > 1:
+        with tempfile.TemporaryDirectory() as tmp:
+            path, _ = fetch_zip(owner, repo, tmp)
+            yield from parse_zip(path, owner, repo, to_record, exts, workers=workers)
+        return
+    with try_download(owner, repo, branches=("main","master")) as spool:
+        for filename, text in iter_zip_texts(spool, exts):
+            rec = to_record(owner, repo, filename, text)
+            if rec:
+                yield rec
 
 def read_repo_data(owner: str, repo: str, exts=(".md", ".mdx")) -> List[Dict]:
-    blob = try_download(owner, repo, branches=("main","master"))
-    zf = zipfile.ZipFile(io.BytesIO(blob))
-    out: List[Dict] = []
-    for info in zf.infolist():
-        if info.is_dir(): continue
-        filename = info.filename
-        if not filename.lower().endswith(exts): continue
-        try:
-            with zf.open(info) as f:
-                text = f.read().decode("utf-8", errors="ignore")
-                post = frontmatter.loads(text)
-                out.append({
-                    "source": f"{owner}/{repo}",
-                    "filename": "/".join(filename.split("/")[1:]),
-                    "metadata": post.metadata or {},
-                    "content": post.content or ""
-                })
-        except Exception as e:
-            print(f"[WARN] Error processing {filename}: {e}")
-    zf.close()
-    return out
-
-def save_jsonl(records: List[Dict], out_path: str) -> None:
-    with open(out_path, "w", encoding="utf-8") as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    return list(iter_repo_data(owner, repo, exts))
+
+def save_jsonl(records: Iterable[Dict], out_path: str) -> int:
+    """JSONL, or a columnar chunk file when out_path ends in chunk_file.EXT."""
+    with open_writer(out_path) as w:
+        return w.write_all(records)
+
+def ingest_incremental(owner: str, repo: str, out_file: str, exts=(".md", ".mdx")) -> None:
+    """Re-parse only docs added/changed/deleted since the last run (see <out>.manifest.json)."""
+    manifest = IngestManifest(out_file + ".manifest.json")
+    if not os.path.exists(out_file):
+        manifest.forget(f"{owner}/{repo}")
+    changes = dict(iter_changes(manifest, owner, repo, exts))
+    if not changes:
+        print("[OK] Up to date (no changed docs)")
+        return
+    fresh = (to_record(owner, repo, fn, text) for fn, text in changes.items() if text is not None)
+    n = rewrite_jsonl(out_file, changes.keys(), (r for r in fresh if r))
+    manifest.save()
+    print(f"[INFO] {len(changes)} docs added/changed/deleted, {n} docs total")
+    print(f"[OK] Saved -> {os.path.abspath(out_file)}")
+
+def ingest_batch(repos_file: str, out_file: str) -> None:
+    """Download every owner/repo listed in repos_file concurrently into one JSONL (or chunk file)."""
+    repos = read_repo_list(repos_file)
+    print(f"[INFO] Downloading and parsing {len(repos)} repos ...")
+    with open_writer(out_file) as w:
+        stats = ingest_many(repos, to_record, w.write)
+    print(f"[INFO] {format_throughput(stats)}")
+    print(f"[OK] Saved -> {os.path.abspath(out_file)}")
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: uv run python ingest_repo.py <repo_owner> <repo_name> [output.jsonl]")
+    args = [a for a in sys.argv[1:] if a != "--incremental"]
+    if len(args) >= 2 and args[0] == "--batch":
+        ingest_batch(args[1], args[2] if len(args) > 2 else "batch.jsonl")
+        return
+    if len(args) < 2:
+        print("Usage: uv run python ingest_repo.py <repo_owner> <repo_name> [output.jsonl] [--incremental]")
+        print("       uv run python ingest_repo.py --batch <repos.txt> [output.jsonl]")
+        print(f"       an output ending in {EXT} is written as a compressed columnar chunk file")
         sys.exit(1)
-    owner, name = sys.argv[1], sys.argv[2]
-    out_file = sys.argv[3] if len(sys.argv) > 3 else f"{owner}_{name}.jsonl"
+    owner, name = args[0], args[1]
+    out_file = args[2] if len(args) > 2 else f"{owner}_{name}.jsonl"
+    if "--incremental" in sys.argv:
+        print(f"[INFO] Checking {owner}/{name} for changes ...")
+        ingest_incremental(owner, name, out_file)
+        return
     print(f"[INFO] Downloading and parsing {owner}/{name} ...")
-    records = read_repo_data(owner, name)
-    print(f"[INFO] Parsed {len(records)} docs (.md/.mdx)")
-    save_jsonl(records, out_file)
+    n = save_jsonl(iter_repo_data(owner, name, workers=os.cpu_count() or 1), out_file)
+    print(f"[INFO] Parsed {n} docs (.md/.mdx)")
     print(f"[OK] Saved -> {os.path.abspath(out_file)}")
 
 if __name__ == "__main__":
-    main()
+    main()
+    if tracing.ENABLED:   # DERMASCAN_TRACE=0 to skip
+        print(tracing.summary())
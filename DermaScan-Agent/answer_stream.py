@@ -0,0 +1,91 @@
+# -----------------------------------------------------------
+# Streaming answers: timed token streams (time-to-first-token, total),
+# Gemini streaming pieces and a local fake generator for testing
+# -----------------------------------------------------------
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+class TimedStream:
+    """Iterate text pieces as they arrive, keeping the full text and timings.
+
+    `ttft` (seconds to the first non-empty piece) and `total` are measured from
+    `start`, which should be taken before the model request is sent. Once the
+    stream is drained, `on_done(text)` is called (e.g. to cache the answer).
+    """
+
+    def __init__(self, pieces: Iterable[str], start: Optional[float] = None,
+                 on_done: Optional[Callable[[str], None]] = None):
+        self.pieces = pieces
+        self.start = time.perf_counter() if start is None else start
+        self.on_done = on_done
+        self.parts: List[str] = []
+        self.ttft: Optional[float] = None
+        self.total: Optional[float] = None
+        self.meta: dict = {}   # anything the caller wants to report alongside the answer
+
+    def __iter__(self) -> Iterator[str]:
+        for piece in self.pieces:
+            if not piece:
+                continue
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.start
+            self.parts.append(piece)
+            yield piece
+        self.total = time.perf_counter() - self.start
+        if self.ttft is None:
+            self.ttft = self.total
+        if self.on_done:
+            self.on_done(self.text)
+
+    def drain(self) -> None:
+        """Read the rest without rendering it (e.g. a hedged call that lost), so the
+        model's connection finishes cleanly instead of idling until collected."""
+        for _ in self:
+            pass
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def timings(self) -> dict:
+        return {"ttft_ms": None if self.ttft is None else round(self.ttft * 1000, 1),
+                "total_ms": None if self.total is None else round(self.total * 1000, 1)}
+
+
+def gemini_pieces(model, prompt: str, request_options: Optional[dict] = None) -> Iterator[str]:
+    """Text of each streamed Gemini chunk; chunks without text (e.g. safety stops) are skipped."""
+    for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
+
+
+def fake_pieces(text: str, first_token_s: float = 0.4, per_token_s: float = 0.02) -> Iterator[str]:
+    """Local stand-in for a streaming model: waits like a prefill, then emits word by word."""
+    time.sleep(first_token_s)
+    words = text.split(" ")
+    for i, w in enumerate(words):
+        if i:
+            time.sleep(per_token_s)
+        yield w if i == len(words) - 1 else w + " "
+
+
+def open_stream(pieces: Iterable[str], start: Optional[float] = None,
+                on_done: Optional[Callable[[str], None]] = None) -> Optional[TimedStream]:
+    """Pull the first piece now, so a model that fails or returns nothing can be skipped
+    before anything is rendered; None in that case."""
+    start = time.perf_counter() if start is None else start
+    it = iter(pieces)
+    for first in it:
+        if first:
+            def rest():
+                yield first
+                yield from it
+            stream = TimedStream(rest(), start=start, on_done=on_done)
+            stream.ttft = time.perf_counter() - start   # when it arrived, not when it is rendered
+            return stream
+    return None
@@ -1,56 +1,37 @@
 # -----------------------------------------------------------
 # DermaScan Repo Assistant — Streamlit UI with Gemini + Fallback + BG + Chat Bubbles
+# Thin client of the DermaScan API (service.py); retrieval and answering live in dermascan_core.py
 # -----------------------------------------------------------
-import os, io, json, zipfile, secrets, re, base64
-from datetime import datetime, UTC
+import os, json, time, base64
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import Dict, Any, Optional
 
-import streamlit as st
 import requests
-from minsearch import Index
-
-# Gemini optional
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+import streamlit as st
 
 # ===================== CONFIG =====================
 DEFAULT_REPO_OWNER = "SiriYellu"
 DEFAULT_REPO_NAME  = "DermaScan_AndroidApp"
 
-TEXT_EXTS  = (".md", ".mdx", ".txt", ".java", ".kt", ".xml", ".py", ".rst")
-WINDOW     = 1000
-STRIDE     = 500
-MODEL_TRY  = [
-    "gemini-2.5-flash",
-    "gemini-pro-latest",
-    "gemini-2.0-flash",
-]
+API_URL    = os.environ.get("DERMASCAN_API", "").rstrip("/")   # empty: start the API inside this process
+API_TIMEOUT = 60                  # seconds per API call (streams: between events)
+FAKE_LLM   = os.environ.get("DERMASCAN_FAKE_LLM", "") == "1"   # in-process API: local streaming stand-in for Gemini
+INDEX_POLL = 1.0                  # seconds between sidebar progress updates while a build runs
+REFRESH_CHOICES = {"Off": None, "Every 15 min": 900, "Every hour": 3600, "Every 6 hours": 6 * 3600}
+STREAM_REDRAW = 0.05              # seconds between answer-bubble redraws while streaming
 # ==================================================
 
 # ----------------- Helpers -----------------
-def now_iso() -> str:
-    return datetime.now(UTC).isoformat()
-
-def ts_compact() -> str:
-    return datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-
 def human_file(path: str) -> str:
     return Path(path).name
 
 def badge(text: str) -> str:
     return f"<span class='badge'>{text}</span>"
 
-def sanitize_md(s: str, limit: int = 1200) -> str:
-    s = (s or "").strip()
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    if len(s) > limit:
-        s = s[:limit] + "..."
-    return s
-
+@st.cache_resource(show_spinner=False)
 def get_base64_of_bin_file(bin_file: str) -> str:
+    # encoded once per process, not on every rerun
     with open(bin_file, "rb") as f:
         return base64.b64encode(f.read()).decode()
 # -------------------------------------------
@@ -69,7 +50,7 @@ try:
         background-size: cover;
       }}
     """
-except Exception as e:
+except Exception:
     # no image is okay – we still render the rest
     pass
 
@@ -113,109 +94,35 @@ st.markdown(
 )
 # -------------------------------------------
 
-# ---------------- Ingestion ----------------
-@st.cache_resource(show_spinner=True)
-def ingest_repo(owner: str, name: str, exts: tuple, window: int, stride: int) -> Tuple[Index, List[Dict[str,Any]]]:
-    """Download GitHub repo as ZIP, extract text files, chunk, and build lexical index."""
-    url = f"https://codeload.github.com/{owner}/{name}/zip/refs/heads/main"
-    resp = requests.get(url, timeout=60)
-    resp.raise_for_status()
-
-    docs: List[Dict[str,Any]] = []
-    with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
-        for info in zf.infolist():
-            fn = info.filename
-            if not fn.lower().endswith(exts):
-                continue
-            try:
-                with zf.open(info) as f:
-                    raw = f.read().decode("utf-8", errors="ignore")
-            except Exception:
-                continue
-            try:
-                _, rel = fn.split("/", maxsplit=1)
-            except ValueError:
-                rel = fn
-            docs.append({"filename": rel, "title": Path(rel).stem, "content": raw})
-
-    chunks = []
-    for d in docs:
-        text = d["content"] or ""
-        n = len(text); i = 0
-        if n == 0:
-            continue
-        while i < n:
-            piece = text[i:i+window]
-            chunks.append({"content": piece, "filename": d["filename"], "title": d["title"]})
-            i += stride
-            # tail coverage
-            if i >= n and i - stride + window < n:
-                tail_start = max(0, n - window)
-                tail_piece = text[tail_start:n]
-                if not chunks or chunks[-1]["content"] != tail_piece:
-                    chunks.append({"content": tail_piece, "filename": d["filename"], "title": d["title"]})
-                break
-
-    index = Index(text_fields=["content", "title", "filename"])
-    index.fit(chunks)
-    return index, chunks
-# -------------------------------------------
-
-# --------------- Answering -----------------
-def make_context(results: List[Dict[str,Any]], topk: int) -> str:
-    parts = []
-    for r in results[:topk]:
-        fn = r.get("filename","")
-        body = sanitize_md(r.get("content",""), limit=2000)
-        parts.append(f"[FILE: {fn}]\n{body}")
-    return "\n\n---\n\n".join(parts) if parts else "(no results)"
-
-def try_gemini_answer(question: str, context: str) -> tuple[str | None, str | None]:
-    if genai is None: return None, None
-    key = os.environ.get("GEMINI_API_KEY", "").strip()
-    if not key: return None, None
-    try:
-        genai.configure(api_key=key)
-    except Exception:
-        return None, None
-
-    system_rules = (
-        "Answer ONLY from the provided repo context. "
-        "Cite filenames inline. If not found, reply: 'Not found in repo.'"
-    )
-    prompt = f"{system_rules}\n\n# Context\n{context}\n\n# Q\n{question}"
-
-    last_err = None
-    for model_name in MODEL_TRY:
-        try:
-            model = genai.GenerativeModel(model_name)
-            resp = model.generate_content(prompt)
-            text = (resp.text or "").strip()
-            if text:
-                return text, model_name
-        except Exception as e:
-            last_err = e
-    return None, None
-
-def answer_with_repo(q: str, index: Index, topk: int = 5):
-    results = index.search(q, num_results=max(1, topk))
-    if not results:
-        return "Not found in repo.", [], [], "No results"
-
-    context = make_context(results, topk)
-    ans, model_used = try_gemini_answer(q, context)
-    if ans:
-        used_files = [r.get("filename","") for r in results[:topk]]
-        return ans, used_files, results, f"Gemini ({model_used})"
-
-    # Fallback to lexical: show the best snippet
-    best = results[0]
-    snippet = sanitize_md(best.get("content",""), limit=800)
-    used_files = [r.get("filename","") for r in results[:topk]]
-    return (
-        f"From `{best.get('filename','')}`:\n\n{snippet}\n\n*(LLM unavailable — lexical fallback)*",
-        used_files, results, "Lexical"
-    )
+# ---------------- API client ----------------
+@st.cache_resource
+def get_api_url() -> str:
+    if API_URL:
+        return API_URL
+    # no external service configured: run one on a background thread, shared by all sessions
+    from dermascan_core import DermaScanCore
+    from service import start_background
+    return f"http://127.0.0.1:{start_background(DermaScanCore(fake_llm=FAKE_LLM))}"
+
+@st.cache_resource
+def get_http() -> requests.Session:
+    return requests.Session()
+
+def api(method: str, path: str, **kwargs) -> Dict[str, Any]:
+    """JSON call to the API; a 503 (index still building) comes back as its JSON body."""
+    r = get_http().request(method, get_api_url() + path, timeout=API_TIMEOUT, **kwargs)
+    if r.status_code not in (200, 503):
+        raise RuntimeError(r.json().get("error", r.text))
+    return r.json()
+
+def api_events(path: str, payload: Dict[str, Any]):
+    """NDJSON event stream from the API, one dict per line as the server sends it."""
+    with get_http().post(get_api_url() + path, json=payload, stream=True, timeout=API_TIMEOUT) as r:
+        if r.status_code != 200:
+            raise RuntimeError(r.json().get("error", r.text))
+        for line in r.iter_lines():
+            if line:
+                yield json.loads(line)
 # -------------------------------------------
 
 # ===================== UI =====================
@@ -224,15 +131,64 @@ with st.sidebar:
     repo_owner = st.text_input("Repo owner", value=DEFAULT_REPO_OWNER)
     repo_name  = st.text_input("Repo name",  value=DEFAULT_REPO_NAME)
     topk = st.slider("Results to use for context", 3, 10, 6, 1)
-    gemini_on = bool(os.environ.get("GEMINI_API_KEY","").strip()) and (genai is not None)
+    repo = {"owner": repo_owner, "name": repo_name}
+    refresh = st.selectbox("Auto-refresh index", list(REFRESH_CHOICES))
+    if st.session_state.get("refresh") != refresh:   # only when the choice changes, not on every rerun
+        api("POST", "/schedule", json={"every": REFRESH_CHOICES[refresh]})
+        st.session_state.refresh = refresh
+    if st.button("Refresh index now"):
+        api("POST", "/refresh", json=repo)
+    stats = api("GET", "/stats")
+    gemini_on = stats["llm"] == "gemini"
     st.markdown(f"Gemini key detected: **{'Yes' if gemini_on else 'No'}**")
+    cache_stats = stats["llm_cache"]
+    st.caption(f"LLM cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} stored")
+    qstats = stats["query_cache"]
+    st.caption(f"Query cache: {qstats['hits']} hits · {qstats['misses']} misses · {qstats['entries']} entries")
+    for m in stats["models"]:
+        p95 = f"{m['p95_ms']} ms" if m["p95_ms"] is not None else "–"
+        st.caption(f"{m['model']}: {m['state']} · p95 {p95} · errors {m['error_rate']:.0%} ({m['calls']} calls)")
+    lstats = stats["log"]
+    st.caption(f"Interaction log: {lstats['entries']} entries · {lstats['blobs']} unique contexts/results")
+    with st.expander("Recent questions"):
+        for rec in api("GET", "/logs", params={"n": 5})["logs"]:
+            st.caption(f"{rec['timestamp'][:19]} · {rec['model'] or '–'} · {rec['question'][:80]}")
+    show_timings = st.checkbox("Show stage timings", value=False)
 
 st.title("🩺 DermaScan Repo Assistant")
 st.caption("Grounded answers from your repository — datasets, models, deployment, and more.")
 
-with st.spinner("📥 Indexing repo…"):
-    index, chunks = ingest_repo(repo_owner, repo_name, TEXT_EXTS, WINDOW, STRIDE)
-st.success(f"Indexed {len(chunks)} chunks.")
+def index_panel(served: Optional[str]):
+    # build progress + loaded repos; a newly swapped-in version reruns the app so it is served
+    status = api("GET", "/status", params=repo)
+    if status["version"] != served:
+        st.rerun()
+    p = status["progress"]
+    if status["building"]:
+        if p.get("total"):
+            st.progress(p["done"] / p["total"], text=f"📥 {p['stage']} ({p['done']}/{p['total']})")
+        else:
+            st.caption(f"📥 {p.get('stage', 'indexing')}…")
+    elif status["error"]:
+        st.caption(f"⚠️ Last index build failed: {status['error']}")
+    for e in api("GET", "/stats")["loaded"]:
+        built = datetime.fromtimestamp(e["built"]).strftime("%H:%M")
+        st.caption(f"{e['repo']} · {e['nbytes'] / 2**20:.1f} MB · built {built}")
+
+status = api("GET", "/status", params=repo)   # never blocks; starts the first build of this repo
+with st.sidebar:
+    st.fragment(run_every=INDEX_POLL if status["building"] else None)(index_panel)(status["version"])
+
+if status["version"] is None:
+    if status["error"]:
+        st.error(f"Indexing failed: {status['error']}")
+    else:
+        st.info("📥 Indexing repo in the background — progress is in the sidebar.")
+    st.stop()
+
+st.success(f"Indexed {status['chunks']} chunks.")
+if not status["vector"]:
+    st.caption("Vector search off (sentence-transformers not installed).")
 
 # Chat history store
 if "messages" not in st.session_state:
@@ -254,16 +210,48 @@ if q:
 
     # ASSISTANT BUBBLE
     with st.chat_message("assistant"):
+        events = api_events("/answer", {**repo, "q": q, "topk": topk, "stream": True})
         with st.spinner("🔍 Searching repo…"):
-            answer, used_files, results, model_used = answer_with_repo(q, index=index, topk=topk)
-
-            # Sources badges
-            sources_html = ""
-            if used_files:
-                badges = " ".join(badge(human_file(f)) for f in used_files if f)
-                sources_html = f"<div class='sources-row'><strong>Sources:</strong> {badges}</div>"
-
-            answer_html = f"{answer}{sources_html}"
-            st.markdown(f"<div class='bubble answer'>{answer_html}</div>", unsafe_allow_html=True)
-
-    st.session_state.messages.append({"role":"assistant","content":answer})
+            start = next(events)
+        model_used, used_files = start["model"], start["files"]
+
+        # Sources badges
+        sources_html = ""
+        if used_files:
+            badges = " ".join(badge(human_file(f)) for f in used_files if f)
+            sources_html = f"<div class='sources-row'><strong>Sources:</strong> {badges}</div>"
+
+        # Tokens go into the bubble as they arrive (redrawn at most every STREAM_REDRAW seconds)
+        box = st.empty()
+        drawn, parts, timings, packing = 0.0, [], {}, None
+        try:
+            for ev in events:
+                if ev["event"] == "token":
+                    parts.append(ev["text"])
+                    if time.perf_counter() - drawn >= STREAM_REDRAW:
+                        box.markdown(f"<div class='bubble answer'>{''.join(parts)}▌</div>", unsafe_allow_html=True)
+                        drawn = time.perf_counter()
+                elif ev["event"] == "error":
+                    parts.append("\n\n*(answer interrupted)*")
+                elif ev["event"] == "done":
+                    timings = {k: ev[k] for k in ("ttft_ms", "total_ms")}
+                    packing = ev.get("context")
+                    st.session_state.last_spans = ev.get("spans") or {}
+        except Exception:
+            parts.append("\n\n*(answer interrupted)*")
+        answer = "".join(parts)
+        box.markdown(f"<div class='bubble answer'>{answer}{sources_html}</div>", unsafe_allow_html=True)
+        if packing:
+            timings.update(context_tokens=packing["tokens"], context_tokens_saved=packing["tokens_saved"])
+        st.caption(f"{model_used} · first token {timings.get('ttft_ms') or 0:.0f} ms · total {timings.get('total_ms') or 0:.0f} ms"
+                   + (f" · context {packing['tokens']} tokens ({packing['tokens_saved']} saved)" if packing else ""))
+
+    st.session_state.messages.append({"role":"assistant","content":answer, "model":model_used, **timings})
+
+# Per-stage timings of the last answer and the index build (sidebar, opt-in)
+if show_timings:
+    with st.sidebar, st.expander("Stage timings", expanded=True):
+        for title, spans in (("Last answer", st.session_state.get("last_spans")), ("Index build", status.get("timings"))):
+            if spans:
+                st.caption(f"**{title}**")
+                st.caption("  \n".join(f"{k}: {v:.1f} ms" for k, v in spans.items()))
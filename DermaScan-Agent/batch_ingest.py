@@ -0,0 +1,158 @@
+# -----------------------------------------------------------
+# Batch ingestion: many repos downloaded concurrently over the pooled session,
+# ZIP members decoded + parsed in a process pool
+# -----------------------------------------------------------
+import os, time, zipfile, tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from repo_zip import zip_url, spool_download, strip_top
+
+# parse(owner, repo, filename, text) -> record or None; must be a module-level function
+ParseFn = Callable[[str, str, str, str], Optional[Dict]]
+
+
+def read_repo_list(path: str) -> List[Tuple[str, str]]:
+    """One `owner/repo` per line; blank lines and `#` comments are skipped."""
+    repos = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                owner, repo = line.split("/", 1)
+                repos.append((owner, repo))
+    return repos
+
+
+def fetch_zip(owner: str, repo: str, dest_dir: str, branches=("main", "master")) -> Tuple[str, int]:
+    """Stream the first existing branch archive to a file under dest_dir -> (path, bytes)."""
+    path = os.path.join(dest_dir, f"{owner}__{repo}.zip")
+    last_status = None
+    for br in branches:
+        with open(path, "wb") as f:
+            spool, resp = spool_download(zip_url(owner, repo, br), into=f)
+        last_status = resp.status_code
+        if spool is not None:
+            return path, os.path.getsize(path)
+    os.remove(path)
+    raise RuntimeError(f"Failed to download {owner}/{repo} (tried {branches}, last={last_status})")
+
+
+_open_zip: Dict[str, zipfile.ZipFile] = {}   # per process: the archive the last slice came from
+
+
+def _zip(zip_path: str) -> zipfile.ZipFile:
+    """Reading the central directory costs O(members), so a worker keeps its archive open across slices."""
+    zf = _open_zip.get(zip_path)
+    if zf is None:
+        for old in _open_zip.values():
+            old.close()
+        _open_zip.clear()
+        zf = _open_zip[zip_path] = zipfile.ZipFile(zip_path)
+    return zf
+
+
+def _parse_slice(zip_path: str, names: List[str], owner: str, repo: str, parse: ParseFn) -> List[Dict]:
+    """Worker: decompress, decode and parse a slice of members from one archive."""
+    out = []
+    zf = _zip(zip_path)
+    for name in names:
+        try:
+            text = zf.read(name).decode("utf-8", errors="ignore")
+        except Exception as e:
+            print(f"[WARN] {name}: {e}")
+            continue
+        rec = parse(owner, repo, strip_top(name), text)
+        if rec:
+            out.append(rec)
+    return out
+
+
+def member_names(zip_path: str, exts) -> List[str]:
+    exts = tuple(exts)
+    with zipfile.ZipFile(zip_path) as zf:
+        return [i.filename for i in zf.infolist() if not i.is_dir() and i.filename.lower().endswith(exts)]
+
+
+def parse_zip(zip_path: str, owner: str, repo: str, parse: ParseFn, exts=(".md", ".mdx"),
+              workers: Optional[int] = None, batch: int = 256) -> Iterator[Dict]:
+    """Decode + parse one archive's members across a process pool, yielding records in archive order.
+
+    Members go out in `batch`-sized slices (each worker opens the archive once
+    per slice); at most workers*4 slices are in flight, so a slow consumer
+    does not pile up parsed records. workers=1 parses in-process.
+    """
+    names = member_names(zip_path, exts)
+    slices = [names[i:i + batch] for i in range(0, len(names), batch)]
+    if workers == 1:
+        try:
+            for names in slices:
+                yield from _parse_slice(zip_path, names, owner, repo, parse)
+        finally:
+            zf = _open_zip.pop(zip_path, None)
+            if zf is not None:
+                zf.close()
+        return
+    limit = (workers or os.cpu_count() or 1) * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for names in slices:
+            pending.append(pool.submit(_parse_slice, zip_path, names, owner, repo, parse))
+            if len(pending) >= limit:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def ingest_many(repos: Iterable[Tuple[str, str]], parse: ParseFn, sink: Callable[[Dict], None],
+                exts=(".md", ".mdx"), concurrency: int = 8, workers: Optional[int] = None,
+                batch: int = 64) -> Dict:
+    """Ingest every repo and feed parsed records to `sink` as they complete.
+
+    Downloads overlap (up to `concurrency` at once), and each archive is handed
+    to the process pool in `batch`-member slices as soon as it lands, so wall
+    time tracks the slowest repo rather than the sum. Downloads and parsed
+    slices are waited on together, so a repo's records reach `sink` while
+    other repos are still downloading. Returns throughput stats.
+    """
+    exts = tuple(exts)
+    repos = list(repos)
+    stats = {"repos": 0, "failed": 0, "bytes": 0, "docs": 0}
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp, \
+            ThreadPoolExecutor(max_workers=concurrency) as net, \
+            ProcessPoolExecutor(max_workers=workers) as cpu:
+        downloads = {net.submit(fetch_zip, owner, repo, tmp): (owner, repo) for owner, repo in repos}
+        parsing = set()
+        while downloads or parsing:
+            done, _ = wait(parsing.union(downloads), return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in parsing:
+                    parsing.remove(fut)
+                    for rec in fut.result():
+                        sink(rec)
+                        stats["docs"] += 1
+                    continue
+                owner, repo = downloads.pop(fut)
+                try:
+                    path, size = fut.result()
+                except Exception as e:
+                    print(f"[WARN] {owner}/{repo}: {e}")
+                    stats["failed"] += 1
+                    continue
+                stats["repos"] += 1
+                stats["bytes"] += size
+                names = member_names(path, exts)
+                for i in range(0, len(names), batch):
+                    parsing.add(cpu.submit(_parse_slice, path, names[i:i+batch], owner, repo, parse))
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def format_throughput(stats: Dict) -> str:
+    secs = max(stats["seconds"], 1e-9)
+    return (f"{stats['repos']} repos ({stats['failed']} failed), {stats['docs']} docs, "
+            f"{stats['bytes'] / 2**20:.1f} MB in {secs:.2f}s -> "
+            f"{stats['repos'] / secs:.2f} repos/s, {stats['bytes'] / 2**20 / secs:.2f} MB/s, "
+            f"{stats['docs'] / secs:.1f} docs/s")
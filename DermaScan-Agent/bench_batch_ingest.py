@@ -0,0 +1,83 @@
+# -----------------------------------------------------------
+# Serial vs batch ingestion of N repos from a local codeload stand-in
+#   python bench_batch_ingest.py --repos 12 --latency 0.5 --stagger 0.1
+# Each response is delayed by --latency seconds to mimic a remote server,
+# plus --stagger seconds per repo index so repos land one after another;
+# "first doc" shows records reaching the sink before the last download ends
+# -----------------------------------------------------------
+import os, re, time, zipfile, argparse, tempfile, threading
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+import repo_zip
+from repo_zip import try_download, iter_zip_texts
+from batch_ingest import ingest_many, format_throughput
+from bench_ingest_memory import QuietHandler
+
+
+class SlowHandler(QuietHandler):
+    latency = 0.0
+    stagger = 0.0
+
+    def do_GET(self):
+        m = re.search(r"repo(\d+)", self.path)
+        time.sleep(self.latency + (self.stagger * int(m.group(1)) if m else 0.0))
+        super().do_GET()
+
+
+def parse(owner: str, repo: str, filename: str, text: str) -> dict:
+    return {"source": f"{owner}/{repo}", "filename": filename, "content": text.strip()}
+
+
+def write_repos(root: str, repos: int, docs: int) -> list:
+    names = []
+    for r in range(repos):
+        name = f"repo{r:03d}"
+        path = os.path.join(root, "acme", name, "zip", "refs", "heads", "main")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for i in range(docs):
+                zf.writestr(f"{name}-main/docs/p{i:04d}.md", f"# Page {i}\n\n" + "Body text line.\n" * 300)
+        names.append(("acme", name))
+    return names
+
+
+def serial(repos) -> dict:
+    t0 = time.perf_counter()
+    docs = 0
+    for owner, repo in repos:
+        with try_download(owner, repo, branches=("main",)) as spool:
+            for fn, text in iter_zip_texts(spool, (".md",)):
+                parse(owner, repo, fn, text)
+                docs += 1
+    return {"docs": docs, "seconds": time.perf_counter() - t0}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repos", type=int, default=12)
+    ap.add_argument("--docs", type=int, default=300, help="docs per repo")
+    ap.add_argument("--latency", type=float, default=0.5, help="seconds added per request")
+    ap.add_argument("--stagger", type=float, default=0.1, help="extra seconds per repo index")
+    args = ap.parse_args()
+
+    SlowHandler.latency, SlowHandler.stagger = args.latency, args.stagger
+    with tempfile.TemporaryDirectory() as root:
+        repos = write_repos(root, args.repos, args.docs)
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), partial(SlowHandler, directory=root))
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        repo_zip.CODELOAD = f"http://127.0.0.1:{srv.server_address[1]}"
+
+        s = serial(repos)
+        print(f"serial : {s['docs']} docs in {s['seconds']:.2f}s")
+        first = []
+        t0 = time.perf_counter()
+        stats = ingest_many(repos, parse, lambda r: first or first.append(time.perf_counter() - t0), exts=(".md",))
+        print(f"batch  : {format_throughput(stats)}")
+        print(f"         first doc after {first[0]:.2f}s, last download due after "
+              f"{args.latency + args.stagger * (args.repos - 1):.2f}s")
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
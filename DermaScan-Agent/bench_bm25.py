@@ -0,0 +1,68 @@
+# -----------------------------------------------------------
+# Query latency: minsearch.Index (TF-IDF over every chunk) vs BM25Index
+# (inverted index + MaxScore) on synthetic chunks with a Zipf vocabulary
+#   python bench_bm25.py --sizes 10000 100000 1000000 --queries 200
+# -----------------------------------------------------------
+import time, random, argparse
+
+import numpy as np
+
+from bm25 import BM25Index
+
+FIELDS = ["content", "title", "filename"]
+
+
+def make_chunks(n: int, vocab_size: int = 50000, words: int = 80, seed: int = 0):
+    rnd = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    cum = np.cumsum(1 / np.arange(1, vocab_size + 1))
+    cum /= cum[-1]
+    ids = np.searchsorted(cum, np.random.default_rng(seed).random((n, words)))
+    chunks = []
+    for i in range(n):
+        row = ids[i]
+        chunks.append({"content": " ".join(vocab[j] for j in row),
+                       "title": " ".join(vocab[j] for j in row[:3]),
+                       "filename": f"docs/{vocab[rnd.randrange(vocab_size)]}/page_{i}.md"})
+    queries = [" ".join(vocab[j] for j in ids[rnd.randrange(n), rnd.sample(range(words), rnd.randint(2, 5))])
+               for _ in range(1000)]
+    return chunks, queries
+
+
+def latencies(index, queries, k: int) -> np.ndarray:
+    out = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, num_results=k, boost_dict={"title": 2.0})
+        out.append(time.perf_counter() - t0)
+    return np.array(out) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--skip-minsearch-above", type=int, default=200000,
+                    help="minsearch needs a lot of RAM/time at 1M chunks")
+    args = ap.parse_args()
+
+    print(f"{'chunks':>8} | {'engine':<9} | {'fit s':>7} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for n in args.sizes:
+        chunks, queries = make_chunks(n)
+        queries = queries[:args.queries]
+        engines = [("bm25", lambda: BM25Index(FIELDS).fit(chunks))]
+        if n <= args.skip_minsearch_above:
+            from minsearch import Index
+            engines.insert(0, ("minsearch", lambda: Index(text_fields=FIELDS).fit(chunks)))
+        for name, build in engines:
+            t0 = time.perf_counter()
+            index = build()
+            fit = time.perf_counter() - t0
+            lat = latencies(index, queries, args.k)
+            print(f"{n:>8} | {name:<9} | {fit:>7.2f} | {np.percentile(lat, 50):>8.2f} | {np.percentile(lat, 99):>8.2f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
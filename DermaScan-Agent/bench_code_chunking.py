@@ -0,0 +1,172 @@
+# -----------------------------------------------------------
+# Code-aware chunking vs the 1000/500 sliding window on source files: chunk
+# count, indexed text, saved index size, and whether retrieval lands on the
+# chunk that holds the definition a query asks about
+#   python bench_code_chunking.py [--root ..] [--zip DermaScan_AndroidApp-main.zip]
+# Queries come from the corpus itself: the first docstring line of every
+# documented Python def/class, and the split-up name of every definition
+# the chunker sees (e.g. "load repo index"). A hit is a top-k chunk of the
+# right file containing the definition line; "complete" needs the whole
+# definition in that one chunk. Name queries favour the symbols field by
+# construction, so code chunking is also run with the symbols boost off.
+# -----------------------------------------------------------
+import os, ast, time, argparse, tempfile
+from pathlib import Path
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from bm25 import BM25Index
+from index_store import save_index
+from repo_index import TEXT_FIELDS, add_file
+from repo_zip import iter_zip_texts
+from code_chunking import CODE_EXTS, split_identifier, _units
+from context_pack import estimate_tokens
+
+WINDOW, STRIDE = 1000, 500
+
+
+def load_files(root: str, zip_path: str = None):
+    files = []
+    if zip_path:
+        with open(zip_path, "rb") as f:
+            files += [(fn, text) for fn, text in iter_zip_texts(f, CODE_EXTS)]
+    root = Path(root).resolve()
+    for p in sorted(root.rglob("*")):
+        rel = p.relative_to(root)
+        if p.suffix in CODE_EXTS and p.is_file() and not any(part.startswith(".") for part in rel.parts):
+            try:
+                files.append((str(rel), p.read_text(encoding="utf-8")))
+            except (UnicodeDecodeError, OSError):
+                pass
+    return [(fn, text) for fn, text in files if text.strip()]
+
+
+def python_defs(text: str):
+    """(name, def offset, end offset, docstring first line) per def/class, nested ones included."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return
+    starts = [0] + [i + 1 for i, c in enumerate(text) if c == "\n"]
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            doc = (ast.get_docstring(node) or "").strip().split("\n")[0]
+            end = starts[node.end_lineno] if node.end_lineno < len(starts) else len(text)
+            yield node.name, starts[node.lineno - 1], end, doc
+
+
+def make_queries(files):
+    """-> [(kind, query, filename, def offset, def end or None)]"""
+    queries = []
+    for fn, text in files:
+        if fn.endswith(".py"):
+            for name, pos, end, doc in python_defs(text):
+                if len(doc.split()) >= 4:
+                    queries.append(("docstring", doc, fn, pos, end))
+        for pos, symbols in _units(fn, text) or []:
+            words = split_identifier(symbols[-1])
+            if len(words) >= 2:
+                at = text.find(symbols[-1], pos)   # unit offsets include leading comments: point at the name
+                queries.append(("name", " ".join(words), fn, at if at >= 0 else pos, None))
+    seen, out = set(), []
+    for q in queries:   # a query text asked twice would be ambiguous
+        if (q[0], q[1]) not in seen:
+            seen.add((q[0], q[1]))
+            out.append(q)
+    return out
+
+
+def build(files, chunking: str):
+    t0 = time.perf_counter()
+    store = ChunkStore()
+    for fn, text in files:
+        add_file(store, fn, text, WINDOW, STRIDE, chunking)
+    index = BM25Index(TEXT_FIELDS).fit(store)
+    build_s = time.perf_counter() - t0
+    root = tempfile.mkdtemp()
+    path = save_index(index, root, {"chunking": chunking})
+    size = sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+    return index, store, build_s, size
+
+
+def spans_of(store: ChunkStore, r):
+    """Character offsets of a result within its file (the stored text is ASCII-safe via byte->char)."""
+    doc = store.doc_ids[r.i]
+    base = store.doc_start[doc]
+    raw = bytes(store.blob[base:store.doc_end[doc]])
+    s, e = store.starts[r.i] - base, store.ends[r.i] - base
+    return len(raw[:s].decode("utf-8", "ignore")), len(raw[:e].decode("utf-8", "ignore"))
+
+
+def evaluate(index, store, queries, k: int, boost: float):
+    out = {}
+    for kind in ("docstring", "name"):
+        qs = [q for q in queries if q[0] == kind]
+        hits1 = hitsk = complete = rr = 0
+        tokens = []
+        for _, query, fn, pos, end in qs:
+            results = index.search(query, boost_dict={"symbols": boost}, num_results=k)
+            tokens.append(sum(estimate_tokens(r["content"]) for r in results))
+            for rank, r in enumerate(results):
+                if r["filename"] != fn:
+                    continue
+                s, e = spans_of(store, r)
+                if s <= pos < e:
+                    hits1 += rank == 0
+                    hitsk += 1
+                    rr += 1 / (rank + 1)
+                    complete += end is not None and e >= end
+                    break
+        n = max(1, len(qs))
+        out[kind] = {"n": len(qs), "hit@1": hits1 / n, f"hit@{k}": hitsk / n, "mrr": rr / n,
+                     "complete": complete / n, "tokens": float(np.mean(tokens)) if tokens else 0.0}
+    return out
+
+
+def cut_defs(files, chunking: str) -> float:
+    """Share of Python defs that fit in one window but are not fully inside any single chunk."""
+    total = cut = 0
+    for fn, text in files:
+        if not fn.endswith(".py") or not text.isascii():   # ASCII: byte offsets == character offsets
+            continue
+        probe = ChunkStore()
+        add_file(probe, fn, text, WINDOW, STRIDE, chunking)
+        spans = [(probe.starts[i], probe.ends[i]) for i in range(len(probe))]
+        for _, pos, end, _ in python_defs(text):
+            if end - pos <= WINDOW:
+                total += 1
+                cut += not any(s <= pos and end <= e for s, e in spans)
+    return cut / max(1, total)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    ap.add_argument("--zip", help="also index the source files of a GitHub codeload archive")
+    ap.add_argument("--topk", type=int, default=5)
+    ap.add_argument("--boost", type=float, default=1.5, help="weight of the symbols field")
+    args = ap.parse_args()
+
+    files = load_files(args.root, args.zip)
+    queries = make_queries(files)
+    by_ext = {}
+    for fn, _ in files:
+        by_ext[Path(fn).suffix] = by_ext.get(Path(fn).suffix, 0) + 1
+    print(f"{len(files)} source files {by_ext}, {sum(len(t) for _, t in files) / 1e6:.2f} M chars; "
+          f"{sum(q[0] == 'docstring' for q in queries)} docstring + {sum(q[0] == 'name' for q in queries)} name queries")
+    build(files[:5], "window")   # warm-up: sklearn import
+    print(f"{'chunking':<8} | {'boost':>5} | {'chunks':>6} | {'text MB':>7} | {'index MB':>8} | {'build s':>7} | {'cut defs':>8} | "
+          f"{'queries':<9} | {'hit@1':>5} | {'hit@' + str(args.topk):>5} | {'MRR':>5} | {'complete':>8} | {'tok/q':>6}")
+    for chunking, boost in (("window", args.boost), ("code", 0.0), ("code", args.boost)):
+        index, store, build_s, size = build(files, chunking)
+        text_mb = sum(store.ends[i] - store.starts[i] for i in range(len(store))) / 2**20
+        cut = cut_defs(files, chunking)
+        for kind, m in evaluate(index, store, queries, args.topk, boost).items():
+            print(f"{chunking:<8} | {boost:>5.1f} | {len(store):>6} | {text_mb:>7.2f} | {size / 2**20:>8.2f} | {build_s:>7.2f} | "
+                  f"{cut:>8.1%} | {kind:<9} | {m['hit@1']:>5.2f} | {m[f'hit@{args.topk}']:>5.2f} | {m['mrr']:>5.2f} | "
+                  f"{format(m['complete'], '.2f') if kind == 'docstring' else '-':>8} | {m['tokens']:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
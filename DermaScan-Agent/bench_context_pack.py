@@ -0,0 +1,54 @@
+# -----------------------------------------------------------
+# Context packing on the Evidently docs: prompt tokens of the plain top-k join
+# (each chunk cut to 2000 chars) vs. pack_context, and whether the right file
+# is still in the prompt
+#   python bench_context_pack.py --topk 6 --budget 1200
+# -----------------------------------------------------------
+import os, sys, time, argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI-Agents-Day2"))
+from bench_chunk_pipeline import load_evidently_docs
+from chunk_store import ChunkStore
+from bm25 import BM25Index
+from repo_index import TEXT_FIELDS, window_spans
+from context_pack import pack_context
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topk", type=int, default=6)
+    ap.add_argument("--budget", type=int, nargs="+", default=[800, 1200, 2000])
+    args = ap.parse_args()
+
+    docs = load_evidently_docs()
+    store = ChunkStore()
+    for d in docs:
+        store.add(d["content"], window_spans(len(d["content"]), 1000, 500),
+                  filename=d["filename"], title=Path(d["filename"]).stem)
+    index = BM25Index(TEXT_FIELDS).fit(store)
+    queries = [(d["metadata"]["description"], d["filename"]) for d in docs if d["metadata"].get("description")]
+    ranked = [(index.search(q, num_results=args.topk), fn) for q, fn in queries]
+
+    print(f"{len(queries)} queries, top-{args.topk} chunks each")
+    print(f"{'budget':>7} | naive tok | packed tok | saved | merged spans/q | dupes/q | right file kept | ms/q")
+    for budget in args.budget:
+        naive, packed, spans, dupes, kept, ms = [], [], [], [], 0, []
+        for results, fn in ranked:
+            t0 = time.perf_counter()
+            _, st = pack_context(results, budget=budget)
+            ms.append((time.perf_counter() - t0) * 1000)
+            naive.append(st["naive_tokens"]); packed.append(st["tokens"])
+            spans.append(args.topk - st["spans"]); dupes.append(st["duplicates"])
+            in_naive = any(r["filename"] == fn for r in results)
+            kept += (fn in st["files"]) if in_naive else 0
+        hits = sum(any(r["filename"] == fn for r in results) for results, fn in ranked)
+        print(f"{budget:>7} | {np.mean(naive):>9.0f} | {np.mean(packed):>10.0f} | "
+              f"{1 - np.sum(packed) / np.sum(naive):>5.0%} | {np.mean(spans):>14.2f} | {np.mean(dupes):>7.2f} | "
+              f"{kept:>6}/{hits:<8} | {np.mean(ms):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# -----------------------------------------------------------
+# Embedding store: re-encode cost after a small edit, storage size per dtype,
+# IVF recall@10 and latency vs exact search
+#   python bench_embeddings.py --chunks 50000            (hashed stand-in encoder)
+#   python bench_embeddings.py --chunks 2000 --real      (all-MiniLM-L6-v2 on CPU)
+# -----------------------------------------------------------
+import os, time, zlib, argparse, tempfile
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, StoreRows, IVFIndex, VectorIndex, sentence_encoder
+
+DIM = 384
+
+
+class TopicEncoder:
+    """Deterministic stand-in: texts about the same topic land near the same direction."""
+
+    def __init__(self, topics: int = 200, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.topics = rng.standard_normal((topics, DIM)).astype(np.float32)
+        self.calls = self.encoded = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        self.encoded += len(texts)
+        out = []
+        for t in texts:
+            topic = int(t.split()[1]) % len(self.topics)
+            noise = np.random.default_rng(zlib.crc32(t.encode())).standard_normal(DIM).astype(np.float32)
+            v = self.topics[topic] + 0.8 * noise
+            out.append(v / np.linalg.norm(v))
+        return np.stack(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=50000)
+    ap.add_argument("--edited", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--real", action="store_true")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    texts = [f"topic {rng.integers(200)} chunk {i} about datasets models deployment" for i in range(args.chunks)]
+    for dtype in ("float16", "int8"):
+        with tempfile.TemporaryDirectory() as root:
+            enc = sentence_encoder() if args.real else TopicEncoder()
+            store = EmbeddingStore(root, dtype=dtype, batch_size=256, encoder=enc)
+            t0 = time.perf_counter()
+            rows = store.rows_for(texts)
+            full = time.perf_counter() - t0
+
+            edited = list(texts)
+            for i in range(args.edited):
+                edited[i] += " (edited)"
+            store = EmbeddingStore(root, dtype=dtype, batch_size=256, encoder=enc)   # fresh process
+            before = getattr(enc, "encoded", 0)
+            t0 = time.perf_counter()
+            rows = store.rows_for(edited)
+            incr = time.perf_counter() - t0
+            size = sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root))
+            print(f"[{dtype}] full encode {full:.2f}s; after {args.edited} edits: "
+                  f"{getattr(enc, 'encoded', 0) - before} re-encoded in {incr:.2f}s; {size / 2**20:.1f} MB on disk")
+
+            vectors = StoreRows(store, rows)
+            t0 = time.perf_counter()
+            ivf = IVFIndex.build(vectors)
+            print(f"[{dtype}] IVF build {time.perf_counter() - t0:.2f}s, {len(ivf.centroids)} lists")
+            docs = [{"content": t} for t in edited]
+            exact = store.decode(rows)
+            ann = VectorIndex(nprobe=8).fit(vectors, docs, ivf=ivf)
+            recall, lat_ann, lat_exact = [], [], []
+            for qi in rng.integers(len(texts), size=args.queries):
+                q = store.encode_query(f"topic {qi % 200} question")
+                t0 = time.perf_counter()
+                truth = set(np.argsort(-(exact @ q))[:10].tolist())
+                lat_exact.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                got = [r["_id"] for r in ann.search(q, num_results=10, output_ids=True)]
+                lat_ann.append(time.perf_counter() - t0)
+                recall.append(len(truth & set(got)) / 10)
+            print(f"[{dtype}] recall@10 {np.mean(recall):.3f}; p50 exact {np.median(lat_exact) * 1000:.2f} ms, "
+                  f"IVF {np.median(lat_ann) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -----------------------------------------------------------
+# Evaluation throughput: the Day 5 serial loop (ask, then judge, one question
+# at a time) vs EvalRunner, plus a crash-and-resume run
+#   python bench_eval_runner.py --questions 200 --concurrency 32 --rps 100
+# ask/judge are local stand-ins with injected latency and 429s that log into a
+# real InteractionLog, so only model time is simulated.
+# -----------------------------------------------------------
+import json, time, random, argparse, tempfile, threading
+from pathlib import Path
+
+from interaction_log import InteractionLog
+from eval_runner import EvalRunner, EvalStore
+
+CHECKS = ["instructions_follow", "instructions_avoid", "answer_relevant", "answer_clear",
+          "answer_citations", "completeness", "tool_call_search"]
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeModels:
+    def __init__(self, log: InteractionLog, ask_s: float, judge_s: float, error_rate: float,
+                 fail_after: int = 0, seed: int = 0):
+        self.log, self.ask_s, self.judge_s, self.error_rate = log, ask_s, judge_s, error_rate
+        self.fail_after, self.rnd, self.lock = fail_after, random.Random(seed), threading.Lock()
+        self.calls = {"ask": 0, "judge": 0}
+
+    def _latency(self, kind: str, base: float) -> None:
+        with self.lock:
+            self.calls[kind] += 1
+            n, jitter, err = self.calls[kind], self.rnd.uniform(0.5, 1.5), self.rnd.random() < self.error_rate
+        if self.fail_after and kind == "judge" and n > self.fail_after:
+            raise RuntimeError("quota exhausted")   # not retryable: the run stops making progress
+        time.sleep(base * jitter)
+        if err:
+            raise RateLimited("429 Too Many Requests")
+
+    def ask(self, question: str) -> str:
+        self._latency("ask", self.ask_s)
+        return self.log.log(question, f"Answer to {question} citing README.md", model="gemini-2.0-flash",
+                            system_prompt="Answer from the repo context.", context=f"[FILE: README.md]\n{question}")
+
+    def load(self, log_id: str):
+        self.log.flush()
+        return self.log.entry(log_id)
+
+    def judge(self, entry) -> str:
+        self._latency("judge", self.judge_s)
+        checklist = [{"check_name": c, "justification": "ok", "check_pass": self.rnd.random() < 0.8} for c in CHECKS]
+        return "```json\n" + json.dumps({"checklist": checklist, "summary": "fine"}) + "\n```"
+
+
+def serial(questions, models: FakeModels, store: EvalStore) -> None:
+    """The notebook loop: ask_with_repo per question, then evaluate_log per log, no retries."""
+    ids = []
+    for q in questions:
+        try:
+            ids.append(models.ask(q))
+        except Exception:
+            pass
+    runner = EvalRunner(models.judge, models.load, store, judge_model="judge", concurrency=1, rps=1e6, retries=1)
+    runner.judge_logs(ids)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", type=int, default=200)
+    ap.add_argument("--serial-questions", type=int, default=40, help="the serial loop runs on this many")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--rps", type=float, default=100.0)
+    ap.add_argument("--ask-ms", type=float, default=120.0)
+    ap.add_argument("--judge-ms", type=float, default=180.0)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    args = ap.parse_args()
+    questions = [f"Seed question {i}: how does part {i % 37} of the project work?" for i in range(args.questions)]
+
+    def fresh(fail_after=0, root=None):
+        root = root or Path(tempfile.mkdtemp())
+        log = InteractionLog(str(root / "interactions.sqlite"))
+        return root, FakeModels(log, args.ask_ms / 1000, args.judge_ms / 1000, args.error_rate, fail_after), \
+            EvalStore(str(root / "eval.sqlite"))
+
+    _, models, store = fresh()
+    t0 = time.perf_counter()
+    serial(questions[:args.serial_questions], models, store)
+    t_serial = (time.perf_counter() - t0) / args.serial_questions
+    print(f"serial loop       : {t_serial * 1000:7.1f} ms/question -> 1000 questions in {t_serial * 1000 / 60:5.1f} min "
+          f"({len(store.table())}/{args.serial_questions} judged; 429s are lost)")
+
+    _, models, store = fresh()
+    runner = EvalRunner(models.judge, models.load, store, ask=models.ask, judge_model="judge",
+                        concurrency=args.concurrency, rps=args.rps)
+    t0 = time.perf_counter()
+    stats = runner.run(questions)
+    t_run = (time.perf_counter() - t0) / args.questions
+    print(f"EvalRunner        : {t_run * 1000:7.1f} ms/question -> 1000 questions in {t_run * 1000 / 60:5.1f} min "
+          f"({stats['judged']} judged, {stats['failed']} failed, {models.calls['ask'] + models.calls['judge']} calls)")
+    print("pass rates        :", {k: round(v, 2) for k, v in stats["pass_rates"].items()})
+
+    # crash half-way through the judgements, then resume with the same stores
+    root, models, store = fresh(fail_after=args.questions // 2)
+    runner = EvalRunner(models.judge, models.load, store, ask=models.ask, judge_model="judge",
+                        concurrency=args.concurrency, rps=args.rps, retries=5)
+    first = runner.run(questions)
+    _, models2, store2 = fresh(root=root)
+    runner = EvalRunner(models2.judge, models2.load, store2, ask=models2.ask, judge_model="judge",
+                        concurrency=args.concurrency, rps=args.rps)
+    second = runner.run(questions)
+    print(f"crash + resume    : first run judged {first['judged']} ({first['failed']} failed); "
+          f"resume asked {second['asked']} / judged {second['judged']} more, "
+          f"{len(store2.table())}/{args.questions} judged in total")
+    print("stored pass rates :", {k: round(v["pass_rate"], 2) for k, v in store2.pass_rates("judge").items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -----------------------------------------------------------
+# Frontmatter parsing throughput on a synthetic docs corpus (default 100k
+# markdown files, a few of them very long): the Day 2 parser (regex over the
+# whole document, `import yaml` per call, pure-Python SafeLoader) vs doc_parse
+# cold and warm, then ZIP decode + parse serially vs parse_zip's process pool
+#   python bench_frontmatter.py --docs 100000 --workers 4
+# -----------------------------------------------------------
+import os, re, time, random, zipfile, argparse, tempfile
+
+from doc_parse import CACHE, YAML_LOADER, parse_frontmatter
+from batch_ingest import parse_zip
+from repo_zip import iter_zip_texts
+
+WORDS = ("model monitoring drift report dataset metric preset column test suite dashboard snapshot "
+         "workspace project evaluation regression classification ranking llm judge prompt").split()
+
+_FM_START = re.compile(r"^---\s*$", re.MULTILINE)
+
+
+def legacy_parse(text: str):
+    """parse_frontmatter_safely as it was in chunk_day2.py."""
+    if not text.startswith("---"):
+        return {}, text
+    matches = list(_FM_START.finditer(text))
+    if len(matches) < 2 or matches[0].start() != 0:
+        return {}, text
+    start = matches[0].end()
+    end = matches[1].start()
+    raw_yaml = text[start:end].strip()
+    body = text[matches[1].end():].lstrip("\n")
+    meta = {}
+    try:
+        import yaml  # optional
+        meta = yaml.safe_load(raw_yaml) or {}
+        if not isinstance(meta, dict):
+            meta = {}
+    except Exception:
+        meta = {}
+    return meta, body
+
+
+def make_doc(i: int, rnd: random.Random) -> str:
+    words = lambda n: " ".join(rnd.choices(WORDS, k=n))
+    fm = (f"---\ntitle: \"{words(4).title()} {i}\"\ndescription: \"{words(12)}.\"\n"
+          f"sidebarTitle: \"{words(2).title()}\"\ntags: [{', '.join(rnd.sample(WORDS, 3))}]\n"
+          f"icon: \"{rnd.choice(['chart', 'table', 'gear'])}\"\nmode: \"wide\"\n---\n\n")
+    n_sections = 60 if rnd.random() < 0.02 else rnd.randint(2, 6)   # 2% are long reference pages
+    body = "".join(f"## {words(3).title()}\n\n{words(rnd.randint(30, 90))}\n\n"
+                   f"```python\nreport = Report([{words(2).title().replace(' ', '')}()])\n```\n\n"
+                   for _ in range(n_sections))
+    return fm + body
+
+
+def _record(owner: str, repo: str, filename: str, text: str):
+    meta, body = parse_frontmatter(text)
+    return {"source": f"{owner}/{repo}", "filename": filename, "metadata": meta, "content": body}
+
+
+def timed(fn, texts):
+    t0 = time.perf_counter()
+    out = [fn(t) for t in texts]
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=100000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    texts = [make_doc(i, rnd) for i in range(args.docs)]
+    mb = sum(len(t) for t in texts) / 2**20
+    print(f"{args.docs} docs, {mb:.0f} MB; YAML loader: {YAML_LOADER.__name__}; {os.cpu_count()} CPUs")
+
+    rows = []
+    t_old, old = timed(legacy_parse, texts)
+    rows.append(("legacy (chunk_day2)", t_old))
+    try:
+        import frontmatter   # python-frontmatter, what Day 1 used
+        rows.append(("python-frontmatter", timed(frontmatter.loads, texts)[0]))
+    except ImportError:
+        pass
+    CACHE.entries.clear()
+    CACHE.size = max(CACHE.size, args.docs)   # a rerun over the same corpus, e.g. a refresh in the service
+    t_cold, new = timed(parse_frontmatter, texts)
+    rows.append(("doc_parse, cold cache", t_cold))
+    rows.append(("doc_parse, warm cache", timed(parse_frontmatter, texts)[0]))
+    same = sum(a == b for a, b in zip(old, new))
+    for name, secs in rows:
+        print(f"{name:<24}: {args.docs / secs:>9.0f} docs/s  ({secs:6.2f} s)")
+    print(f"identical (metadata, body) to legacy: {same}/{args.docs}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "docs-main.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for i, t in enumerate(texts):
+                zf.writestr(f"docs-main/docs/section_{i % 50}/page_{i}.mdx", t)
+        del texts, old, new
+        CACHE.entries.clear()
+        t0 = time.perf_counter()
+        with open(path, "rb") as f:
+            n = sum(1 for _, text in iter_zip_texts(f, (".md", ".mdx")) if legacy_parse(text) is not None)
+        t_serial = time.perf_counter() - t0
+        print(f"{'zip, serial + legacy':<24}: {n / t_serial:>9.0f} docs/s  ({t_serial:6.2f} s)")
+        CACHE.entries.clear()
+        t0 = time.perf_counter()
+        n = sum(1 for _ in parse_zip(path, "bench", "docs", _record, workers=args.workers))
+        t_pool = time.perf_counter() - t0
+        print(f"{f'zip, parse_zip x{args.workers}':<24}: {n / t_pool:>9.0f} docs/s  ({t_pool:6.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
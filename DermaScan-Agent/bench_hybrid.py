@@ -0,0 +1,97 @@
+# -----------------------------------------------------------
+# Hybrid retrieval on the Evidently docs: recall@k and latency of the lexical
+# leg, the vector leg, the old sequential hybrid and the concurrent fused one
+#   python bench_hybrid.py --k 1 3 5 10 --encode-ms 15
+#   python bench_hybrid.py --real          (all-MiniLM-L6-v2 instead of the stand-in)
+# Fixed query set: each doc's frontmatter description; relevant = that file's chunks.
+# -----------------------------------------------------------
+import os, sys, time, zlib, argparse, tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI-Agents-Day2"))
+from bench_chunk_pipeline import load_evidently_docs
+from chunk_store import ChunkStore
+from bm25 import BM25Index
+from repo_index import TEXT_FIELDS, window_spans, load_repo_vectors
+from hybrid import HybridRetriever
+
+DIM = 512
+
+
+def hashing_encoder(encode_ms: float = 0.0):
+    """CPU stand-in for a sentence encoder: hashed character 3-grams, L2-normalised.
+
+    `encode_ms` sleeps per call to model a real encoder's latency (which, like
+    torch, does not hold the GIL).
+    """
+    def encode(texts):
+        if encode_ms:
+            time.sleep(encode_ms / 1000)
+        out = np.zeros((len(texts), DIM), np.float32)
+        for i, t in enumerate(texts):
+            t = " " + t.lower() + " "
+            for j in range(len(t) - 2):
+                out[i, zlib.crc32(t[j:j + 3].encode()) % DIM] += 1
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+    return encode
+
+
+def sequential_hybrid(index, vindex, q, k):
+    """The Day 3 hybrid_search: text then vector, concatenated, deduped by filename."""
+    a = index.search(q, num_results=k)
+    b = vindex.search(vindex.encode_query(q), num_results=k)
+    seen, out = set(), []
+    for r in a + b:
+        if r["filename"] not in seen:
+            seen.add(r["filename"])
+            out.append(r)
+    return out[:k]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    ap.add_argument("--encode-ms", type=float, default=15.0)
+    ap.add_argument("--real", action="store_true")
+    args = ap.parse_args()
+
+    docs = load_evidently_docs()
+    store = ChunkStore()
+    for d in docs:
+        store.add(d["content"], window_spans(len(d["content"]), 1000, 500),
+                  filename=d["filename"], title=Path(d["filename"]).stem)
+    index = BM25Index(TEXT_FIELDS).fit(store)
+    queries = [(d["metadata"]["description"], d["filename"]) for d in docs if d["metadata"].get("description")]
+
+    with tempfile.TemporaryDirectory() as cache:
+        encoder = None if args.real else hashing_encoder(args.encode_ms)
+        vindex = load_repo_vectors("evidentlyai", "docs", index, cache, encoder=encoder)
+        runs = {
+            "lexical (bm25)": lambda q, k: index.search(q, num_results=k),
+            "vector": lambda q, k: vindex.search(vindex.encode_query(q), num_results=k),
+            "day3 sequential": lambda q, k: sequential_hybrid(index, vindex, q, k),
+            "hybrid rrf": HybridRetriever(index, vindex, fusion="rrf").search,
+            "hybrid score": HybridRetriever(index, vindex, fusion="score").search,
+        }
+        kmax = max(args.k)
+        print(f"{len(queries)} queries over {len(store)} chunks; vector leg: "
+              f"{'all-MiniLM-L6-v2' if args.real else f'hashed 3-grams + {args.encode_ms:g} ms encode'}")
+        print(f"{'retriever':<16} | " + " | ".join(f"R@{k:<3}" for k in args.k) + " | p50 ms | p99 ms")
+        for name, search in runs.items():
+            hits = {k: 0 for k in args.k}
+            lat = []
+            for q, fn in queries:
+                t0 = time.perf_counter()
+                res = search(q, kmax)
+                lat.append(time.perf_counter() - t0)
+                for k in args.k:
+                    hits[k] += any(r["filename"] == fn for r in res[:k])
+            lat = np.array(lat) * 1000
+            print(f"{name:<16} | " + " | ".join(f"{hits[k] / len(queries):.3f}" for k in args.k)
+                  + f" | {np.percentile(lat, 50):>6.2f} | {np.percentile(lat, 99):>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
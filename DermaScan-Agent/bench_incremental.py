@@ -0,0 +1,68 @@
+# -----------------------------------------------------------
+# Incremental re-ingestion against a local stand-in for codeload.github.com
+#   python bench_incremental.py --docs 5000 --changed 50
+# SimpleHTTPRequestHandler answers If-Modified-Since with 304, like codeload
+# does for a matching ETag, so the whole refresh cycle runs offline.
+# -----------------------------------------------------------
+import os, time, zipfile, argparse, tempfile
+
+import repo_zip
+from ingest_manifest import IngestManifest, iter_changes, rewrite_jsonl
+from bench_ingest_memory import serve
+
+OWNER, REPO = "acme", "docs"
+
+
+def write_fixture(root: str, docs: int, edited: set, deleted: set) -> None:
+    path = os.path.join(root, OWNER, REPO, "zip", "refs", "heads", "main")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(docs):
+            if i in deleted:
+                continue
+            tag = "edited" if i in edited else "original"
+            body = f"---\ntitle: Page {i}\n---\n# Page {i} ({tag})\n\n" + "Some paragraph text.\n" * 200
+            zf.writestr(f"{REPO}-main/docs/page_{i:05d}.md", body)
+    # bump mtime so Last-Modified moves even within the same second
+    stamp = time.time() + 10 * (len(edited) + len(deleted))
+    os.utime(path, (stamp, stamp))
+
+
+def refresh(out: str) -> tuple:
+    manifest = IngestManifest(out + ".manifest.json")
+    t0 = time.perf_counter()
+    changes = dict(iter_changes(manifest, OWNER, REPO, (".md",)))
+    if changes or not os.path.exists(out):
+        fresh = ({"filename": fn, "content": text} for fn, text in changes.items() if text is not None)
+        rewrite_jsonl(out, changes.keys(), fresh)
+        manifest.save()
+    return len(changes), time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--changed", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as work:
+        srv = serve(root)
+        repo_zip.CODELOAD = f"http://127.0.0.1:{srv.server_address[1]}"
+        out = os.path.join(work, "docs.jsonl")
+
+        write_fixture(root, args.docs, set(), set())
+        print(f"{'run':<28} | {'docs re-parsed':>14} | {'seconds':>8}")
+        for label, edited, deleted in [
+            ("full ingest", None, None),
+            ("unchanged (304)", None, None),
+            (f"{args.changed} edited + 1 deleted", set(range(args.changed)), {args.docs - 1}),
+        ]:
+            if edited is not None:
+                write_fixture(root, args.docs, edited, deleted)
+            n, secs = refresh(out)
+            print(f"{label:<28} | {n:>14} | {secs:>8.3f}")
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -----------------------------------------------------------
+# App start-up cost: rebuild-on-every-restart vs the persisted, mmap-ed index
+#   python bench_index_startup.py --docs 2000 --repeat 3
+# Each measurement is a fresh interpreter (like a streamlit restart), timed from
+# process spawn to the first answered query, against a local codeload stand-in.
+# -----------------------------------------------------------
+import os, sys, json, time, random, zipfile, argparse, tempfile, subprocess
+
+OWNER, REPO = "acme", "docs"
+EXTS = (".md",)
+WINDOW, STRIDE = 1000, 500
+
+
+def write_fixture(root: str, docs: int, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    vocab = ["".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(3, 10)))
+             for _ in range(20000)]
+    weights = [1 / (r + 1) for r in range(len(vocab))]   # Zipf-ish term frequencies
+    path = os.path.join(root, OWNER, REPO, "zip", "refs", "heads", "main")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(docs):
+            words = rnd.choices(vocab, weights, k=rnd.randint(200, 1500))
+            zf.writestr(f"{REPO}-main/docs/page_{i:05d}.md", f"# Page {i}\n\n" + " ".join(words))
+        zf.comment = b"0123456789abcdef0123456789abcdef01234567"
+
+
+def child(mode: str, codeload: str, cache_dir: str) -> None:
+    """One 'restart': imports, ingestion/index, then a first query."""
+    t0 = time.perf_counter()
+    import repo_zip
+    repo_zip.CODELOAD = codeload
+    if mode == "before":
+        # what ingest_repo did before: conditional request, then re-chunk and re-fit
+        from repo_index import sync_repo, build_index
+        cache, _ = sync_repo(OWNER, REPO, EXTS, cache_dir, fresh_for=0)
+        index = build_index(str(cache / "docs.jsonl"), WINDOW, STRIDE)
+    else:
+        from repo_index import load_repo_index
+        fresh_for = 0 if mode == "after (304 check)" else 3600
+        index = load_repo_index(OWNER, REPO, EXTS, WINDOW, STRIDE, cache_dir, fresh_for=fresh_for)
+    ready = time.perf_counter()
+    index.search("page documentation example", num_results=5)
+    print(json.dumps({"ready": ready - t0, "query": time.perf_counter() - ready, "chunks": len(index)}))
+
+
+def run(mode: str, codeload: str, cache_dir: str) -> dict:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, codeload, cache_dir],
+                         check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["wall"] = time.perf_counter() - t0
+    return res
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        return child(*sys.argv[2:5])
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from bench_ingest_memory import serve
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_dir:
+        write_fixture(root, args.docs)
+        srv = serve(root)
+        codeload = f"http://127.0.0.1:{srv.server_address[1]}"
+
+        first = run("cold", codeload, cache_dir)
+        print(f"{args.docs} docs -> {first['chunks']} chunks; first ever start (download + build + save): "
+              f"{first['wall']:.2f}s")
+        print(f"{'restart':<22} | {'process wall s':>14} | {'index ready s':>13} | {'1st query ms':>12}")
+        for mode in ("before", "after (304 check)", "after"):
+            runs = [run(mode, codeload, cache_dir) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["wall"])
+            print(f"{mode:<22} | {best['wall']:>14.3f} | {best['ready']:>13.3f} | {best['query'] * 1000:>12.2f}")
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -----------------------------------------------------------
+# Peak memory vs archive size: buffered (.content + BytesIO) vs streaming ingestion
+#   python bench_ingest_memory.py --sizes 8 32 128
+# Serves synthetic ZIPs from a local HTTP server, so no network is needed.
+# -----------------------------------------------------------
+import io, os, json, zipfile, argparse, tempfile, threading, tracemalloc
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import requests
+
+from repo_zip import spool_download, iter_zip_texts
+
+FILE_BYTES = 64 * 1024
+
+
+def make_zip(path: str, size_mb: int) -> None:
+    line = ("Lorem ipsum dolor sit amet, evidently docs paragraph. " * 4 + "\n").encode()
+    body = line * (FILE_BYTES // len(line))
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i in range(size_mb * 1024 * 1024 // len(body)):
+            zf.writestr(f"repo-main/docs/page_{i:06d}.md", body)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(root: str) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=root))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def buffered(url: str, out) -> int:
+    """The pre-streaming code path: whole archive in RAM, records in a list."""
+    blob = requests.get(url, timeout=60).content
+    zf = zipfile.ZipFile(io.BytesIO(blob))
+    records = []
+    for info in zf.infolist():
+        with zf.open(info) as f:
+            records.append({"filename": info.filename, "content": f.read().decode("utf-8", errors="ignore")})
+    for r in records:
+        out.write(json.dumps(r) + "\n")
+    return len(records)
+
+
+def streaming(url: str, out) -> int:
+    spool, _ = spool_download(url)
+    n = 0
+    with spool:
+        for fn, text in iter_zip_texts(spool, (".md",)):
+            out.write(json.dumps({"filename": fn, "content": text}) + "\n")
+            n += 1
+    return n
+
+
+def peak_mb(fn, url: str) -> float:
+    with open(os.devnull, "w") as out:
+        tracemalloc.start()
+        fn(url, out)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128], help="archive sizes in MB")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        srv = serve(root)
+        base = f"http://127.0.0.1:{srv.server_address[1]}"
+        print(f"{'archive MB':>10} | {'buffered peak MB':>16} | {'streaming peak MB':>17}")
+        for mb in args.sizes:
+            name = f"repo_{mb}.zip"
+            make_zip(os.path.join(root, name), mb)
+            url = f"{base}/{name}"
+            print(f"{mb:>10} | {peak_mb(buffered, url):>16.1f} | {peak_mb(streaming, url):>17.1f}")
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -----------------------------------------------------------
+# Interaction logging: one pretty JSON file per question (Day 5 / Day 6) vs the
+# queued, batched SQLite log with content-addressed blobs
+#   python bench_interaction_log.py --entries 1000 5000
+# Reports caller-side latency per logged answer, time until everything is on
+# disk, bytes on disk, and the viewer's "last 10 entries" read.
+# -----------------------------------------------------------
+import os, json, time, random, secrets, argparse, tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from interaction_log import InteractionLog
+
+SYSTEM = "You are a helpful assistant for the DermaScan Android project.\n" * 4
+
+
+def make_entries(n: int, seed: int = 0):
+    """Questions repeat (seed questions, reruns), so do their retrieved contexts."""
+    rnd = random.Random(seed)
+    contexts = [" ".join(rnd.choices("lesion model dataset android tflite segmentation unet".split(), k=900))
+                for _ in range(60)]
+    for i in range(n):
+        j = rnd.randrange(60)
+        results = [{"filename": f"docs/page_{j}_{k}.md", "chunk": contexts[j][k * 500:(k + 1) * 500]} for k in range(5)]
+        yield {"question": f"Question {j} about the project?", "answer": f"Answer {i} " * 40,
+               "model": rnd.choice(["gemini-2.5-flash", "gemini-2.0-flash"]), "context": contexts[j], "results": results}
+
+
+def json_files(root: Path, entries):
+    lat = []
+    t0 = time.perf_counter()
+    for e in entries:
+        t = time.perf_counter()
+        entry = {"agent_name": "dermascan_agent", "system_prompt": SYSTEM, "provider": "gemini", "model": e["model"],
+                 "tools": ["dermascan_search"], "source": "user", "timestamp": datetime.now(timezone.utc).isoformat(),
+                 "messages": [{"kind": "user", "parts": [{"part_kind": "user-prompt", "content": e["question"]}]},
+                              {"kind": "tool", "parts": [{"part_kind": "tool-return", "content": e["context"]}]},
+                              {"kind": "model", "parts": [{"part_kind": "text", "content": e["answer"]}]}],
+                 "search_results": e["results"]}
+        path = root / f"dermascan_agent_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}_{secrets.token_hex(3)}.json"
+        with open(path, "w") as f:   # write_text + fsync: what a durable per-file log pays
+            f.write(json.dumps(entry, indent=2, ensure_ascii=False))
+            f.flush()
+            os.fsync(f.fileno())
+        lat.append(time.perf_counter() - t)
+    durable = time.perf_counter() - t0
+    size = sum(p.stat().st_size for p in root.iterdir())
+
+    t = time.perf_counter()
+    files = sorted(root.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    rows = [json.loads(p.read_text()) for p in files[:10]]
+    view = time.perf_counter() - t
+    t = time.perf_counter()
+    every = [json.loads(p.read_text()) for p in sorted(root.glob("*.json"))]   # Day 5's eval loop
+    scan = time.perf_counter() - t
+    assert len(rows) == 10 and every
+    return lat, durable, size, view, scan
+
+
+def sqlite_log(root: Path, entries):
+    log = InteractionLog(str(root / "interactions.sqlite"))
+    lat = []
+    t0 = time.perf_counter()
+    for e in entries:
+        t = time.perf_counter()
+        log.log(e["question"], e["answer"], model=e["model"], system_prompt=SYSTEM, context=e["context"],
+                results=e["results"], tools=["dermascan_search"])
+        lat.append(time.perf_counter() - t)
+    log.flush()
+    durable = time.perf_counter() - t0
+    log.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = sum(p.stat().st_size for p in root.iterdir())
+
+    t = time.perf_counter()
+    rows = log.recent(10)
+    view = time.perf_counter() - t
+    t = time.perf_counter()
+    every = [log.entry(i) for i in log.ids()]
+    scan = time.perf_counter() - t
+    assert len(rows) == 10 and every
+    log.close()
+    return lat, durable, size, view, scan
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, nargs="+", default=[1000, 5000])
+    args = ap.parse_args()
+
+    print(f"{'entries':>7} | {'store':<13} | {'log p50 us':>10} | {'log p99 us':>10} | {'on disk s':>9} | "
+          f"{'MB':>6} | {'last 10 ms':>10} | {'read all s':>10}")
+    for n in args.entries:
+        entries = list(make_entries(n))
+        for name, fn in (("json files", json_files), ("sqlite queue", sqlite_log)):
+            root = Path(tempfile.mkdtemp())
+            lat, durable, size, view, scan = fn(root, entries)
+            lat = np.array(lat) * 1e6
+            print(f"{n:>7} | {name:<13} | {np.percentile(lat, 50):>10.1f} | {np.percentile(lat, 99):>10.1f} | "
+                  f"{durable:>9.2f} | {size / 2**20:>6.1f} | {view * 1000:>10.2f} | {scan:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
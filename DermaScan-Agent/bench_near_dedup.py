@@ -0,0 +1,108 @@
+# -----------------------------------------------------------
+# Near-duplicate chunk removal on the Evidently docs: chunk count, saved
+# index size, build time and query latency with dedup off and on, plus
+# file-level hit@5 / MRR to show nothing findable was lost. --copies vendors a
+# share of the docs a second time with small edits (a README copied into
+# another folder and touched up), which is where cross-file dedup pays off
+#   python bench_near_dedup.py [--copies 0.3] [--threshold 0.8]
+# A hit counts a kept chunk's recorded locations as well as its own file.
+# -----------------------------------------------------------
+import os, json, time, random, argparse, tempfile
+from pathlib import Path
+
+import numpy as np
+
+from bench_retrieval import DAY2, load_chunks, stitch_docs, default_queries
+from index_store import save_index
+from repo_index import build_index, file_entries
+from near_dup import MinHasher, dedup_entries
+from dermascan_core import WINDOW, STRIDE, CHUNKING
+
+
+def vendored(docs, share: float, rnd: random.Random):
+    """Copies of `share` of the docs under vendor/, each with a sentence or two edited."""
+    out = []
+    for d in rnd.sample(docs, int(len(docs) * share)):
+        lines = d["content"].split("\n")
+        for _ in range(2):
+            i = rnd.randrange(len(lines))
+            lines[i] = lines[i].replace(" the ", " this ", 1) + " (see upstream)"
+        out.append({"filename": "vendor/" + d["filename"], "content": "\n".join(lines)})
+    return out
+
+
+def build(docs_path: str, threshold: float):
+    t0 = time.perf_counter()
+    index = build_index(docs_path, WINDOW, STRIDE, "bm25", CHUNKING, dedup=threshold)
+    build_s = time.perf_counter() - t0
+    root = tempfile.mkdtemp()
+    path = save_index(index, root, {"dedup": threshold})
+    size = sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+    return index, {"chunks": len(index.docs), "bytes": size, "build_s": build_s}
+
+
+def measure(indexes, queries, repeat: int):
+    """Latency and ranking per index; the indexes take turns on every query so drift hits them alike."""
+    lat = [[] for _ in indexes]
+    rr = [[] for _ in indexes]
+    for query, relevant in queries:
+        for n, index in enumerate(indexes):
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                results = index.search(query, num_results=10)
+                best = min(best, time.perf_counter() - t0)
+            lat[n].append(best * 1000)
+            rank = next((i + 1 for i, r in enumerate(results) if r["filename"] in relevant
+                         or any(loc["filename"] in relevant for loc in r.get("locations", ()))), None)
+            rr[n].append(1 / rank if rank else 0.0)
+    return [{"p50": float(np.percentile(l, 50)), "p95": float(np.percentile(l, 95)),
+             "hit@5": float(np.mean([x >= 1 / 5 for x in r])), "mrr": float(np.mean(r))} for l, r in zip(lat, rr)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", default=DAY2, help="directory with evidently_sliding.jsonl")
+    ap.add_argument("--copies", type=float, default=0.3, help="share of docs vendored a second time")
+    ap.add_argument("--threshold", type=float, default=0.8)
+    ap.add_argument("--repeat", type=int, default=20, help="runs per query; the fastest one counts")
+    args = ap.parse_args()
+
+    docs = stitch_docs(load_chunks(os.path.join(args.data_dir, "evidently_sliding.jsonl")))
+    queries = default_queries(docs)
+    corpus = [{"filename": d["filename"], "content": d["content"]} for d in docs]
+    corpus += vendored(corpus, args.copies, random.Random(0))
+    # a query is answered by either copy of its doc
+    queries = [(q, rel + ["vendor/" + rel[0]]) for q, rel in queries]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs_path = os.path.join(tmp, "docs.jsonl")
+        with open(docs_path, "w", encoding="utf-8") as f:
+            for d in corpus:
+                f.write(json.dumps(d, ensure_ascii=False) + "\n")
+        print(f"{len(docs)} docs + {len(corpus) - len(docs)} vendored copies, "
+              f"{sum(len(d['content']) for d in corpus) / 1e6:.2f} M chars; {len(queries)} queries; "
+              f"window {WINDOW}/{STRIDE}, chunking {CHUNKING}")
+
+        entries = [e for d in corpus for e in file_entries(d["filename"], d["content"], WINDOW, STRIDE, CHUNKING)]
+        hasher = MinHasher()
+        t0 = time.perf_counter()
+        _, stats = dedup_entries(entries, args.threshold, hasher)
+        print(f"dedup stage: {time.perf_counter() - t0:.2f} s; {stats}")
+
+        build(docs_path, 0.0)   # warm-up: imports, first allocations
+        built = [build(docs_path, 0.0), build(docs_path, args.threshold)]
+        timed = measure([index for index, _ in built], queries, args.repeat)
+        rows = [(name, {**m, **t}) for name, (_, m), t in zip(("off", f"{args.threshold:g}"), built, timed)]
+    print(f"{'dedup':>5} | {'chunks':>6} | {'index MB':>8} | {'build s':>7} | {'p50 ms':>6} | {'p95 ms':>6} | "
+          f"{'hit@5':>5} | {'MRR':>5}")
+    for name, m in rows:
+        print(f"{name:>5} | {m['chunks']:>6} | {m['bytes'] / 2**20:>8.2f} | {m['build_s']:>7.2f} | {m['p50']:>6.2f} | "
+              f"{m['p95']:>6.2f} | {m['hit@5']:>5.3f} | {m['mrr']:>5.3f}")
+    off, on = rows[0][1], rows[1][1]
+    print(f"index {1 - on['bytes'] / off['bytes']:.0%} smaller, {1 - on['chunks'] / off['chunks']:.0%} fewer chunks, "
+          f"queries {off['p50'] / on['p50']:.2f}x faster (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# -----------------------------------------------------------
+# Offline retrieval benchmark: chunking strategy x retriever on the checked-in
+# Evidently chunk files, with quality (recall@k, MRR, nDCG@k), index build
+# time, peak build memory, index size and query latency
+#   python bench_retrieval.py
+#   python bench_retrieval.py --strategies sliding section window:1000:500 window:2000:500 markdown:3 \
+#                             --retrievers bm25 hybrid --out before.json
+#   python bench_retrieval.py --out after.json --compare before.json
+# Strategies: sliding | paragraph | section | llm     the evidently_<name>.jsonl files
+#             window:W:S      the app's window_spans (WINDOW/STRIDE) over the stitched docs
+#             sliding:S:O     chunk_day2.sliding_window(size, overlap) over the stitched docs
+#             markdown:L      chunk_day2.split_markdown_by_level(level) over the stitched docs
+# Queries: each doc's frontmatter description (relevant = that file), or --queries
+# a JSONL of {"query": ..., "relevant": [filename, ...]}. Frontmatter is not part
+# of the chunk text, so descriptions never match themselves verbatim.
+# Chunk files in either layout are read: metadata inline per record (as checked
+# in) or `doc_id` records plus evidently_docs.jsonl (chunk_day2.run_pipeline).
+# -----------------------------------------------------------
+import os, sys, json, math, time, argparse, tempfile, subprocess, tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DAY2 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI-Agents-Day2")
+sys.path.insert(0, DAY2)
+from chunk_day2 import sliding_window, split_markdown_by_level
+from bench_hybrid import hashing_encoder
+from chunk_store import ChunkStore
+from chunk_file import iter_records
+from bm25 import BM25Index
+from index_store import LexicalIndex, write_index
+from index_manager import index_nbytes
+from repo_index import TEXT_FIELDS, window_spans, load_repo_vectors
+from hybrid import HybridRetriever
+from dermascan_core import WINDOW, STRIDE, FUSION
+
+FILE_STRATEGIES = ("sliding", "paragraph", "section", "llm")
+RETRIEVERS = ("bm25", "tfidf", "hybrid")
+REPORT_VERSION = 1
+
+
+# ---------------- data ----------------
+def load_chunks(path: str, docs_path: Optional[str] = None) -> List[Dict]:
+    """Chunk records as {filename, text, metadata[, start]} from a JSONL, .chunks or chunk_file.EXT file.
+
+    Old records carry `metadata` inline; records written by the single-pass
+    pipeline carry `doc_id`, and the metadata is looked up in `docs_path`.
+    """
+    meta_by_doc: Dict[str, Dict] = {}
+    if docs_path and os.path.exists(docs_path):
+        for d in iter_records(docs_path):
+            meta_by_doc[d["doc_id"]] = d.get("metadata") or {}
+    if path.endswith(".chunks"):
+        rows = [dict(v) for v in ChunkStore.load(path)]
+    else:
+        rows = iter_records(path)
+    out = []
+    for r in rows:
+        text = r.get("text") or r.get("content") or ""
+        if not text.strip():
+            continue
+        rec = {"filename": r["filename"], "text": text,
+               "metadata": r.get("metadata") or meta_by_doc.get(r.get("doc_id"), {})}
+        if "start" in r:
+            rec["start"] = r["start"]
+        out.append(rec)
+    return out
+
+
+def stitch_docs(records: List[Dict]) -> List[Dict]:
+    """Full documents back from overlapping windows (records with `start`)."""
+    docs: Dict[str, Dict] = {}
+    for r in records:
+        d = docs.setdefault(r["filename"], {"filename": r["filename"], "metadata": r["metadata"], "content": ""})
+        d["content"] = d["content"][:r["start"]] + r["text"]
+    return list(docs.values())
+
+
+def strategy_chunks(name: str, data_dir: str, docs: List[Dict]) -> List[Dict]:
+    """(filename, text) chunks for one strategy spec."""
+    kind, *params = name.split(":")
+    if kind in FILE_STRATEGIES and not params:
+        return load_chunks(os.path.join(data_dir, f"evidently_{kind}.jsonl"),
+                           os.path.join(data_dir, "evidently_docs.jsonl"))
+    ints = [int(p) for p in params]
+    out = []
+    for d in docs:
+        text = d["content"]
+        if kind == "window":
+            pieces = [text[a:b] for a, b in window_spans(len(text), *ints)]
+        elif kind == "sliding":
+            pieces = [c["text"] for c in sliding_window(text, size=ints[0], overlap=ints[1])]
+        elif kind == "markdown":
+            pieces = split_markdown_by_level(text, level=ints[0])
+        else:
+            raise ValueError(f"unknown strategy {name!r}")
+        out.extend({"filename": d["filename"], "text": p, "metadata": d["metadata"]} for p in pieces if p.strip())
+    return out
+
+
+def default_queries(docs: List[Dict]) -> List[Tuple[str, List[str]]]:
+    return [(d["metadata"]["description"], [d["filename"]]) for d in docs if d["metadata"].get("description")]
+
+
+def load_queries(path: str) -> List[Tuple[str, List[str]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [(q["query"], list(q["relevant"])) for q in map(json.loads, f) if q.get("query")]
+
+
+# ---------------- metrics ----------------
+def score_ranking(filenames: List[str], relevant: List[str], ks: List[int]) -> Dict[str, float]:
+    """File-level metrics over a chunk ranking: a file counts at the rank of its first chunk."""
+    rel, seen, hits = set(relevant), set(), []
+    for i, fn in enumerate(filenames):
+        if fn in rel and fn not in seen:
+            seen.add(fn)
+            hits.append(i + 1)
+    out = {"mrr": 1.0 / hits[0] if hits else 0.0}
+    for k in ks:
+        found = [r for r in hits if r <= k]
+        out[f"recall@{k}"] = len(found) / len(rel)
+        dcg = sum(1.0 / math.log2(r + 1) for r in found)
+        idcg = sum(1.0 / math.log2(r + 1) for r in range(1, min(k, len(rel)) + 1))
+        out[f"ndcg@{k}"] = dcg / idcg
+    return out
+
+
+# ---------------- indexes ----------------
+def build_store(chunks: List[Dict]) -> ChunkStore:
+    store = ChunkStore()
+    for c in chunks:
+        store.add(c["text"], [(0, len(c["text"]))], filename=c["filename"], title=Path(c["filename"]).stem)
+    return store
+
+
+def build(retriever: str, chunks: List[Dict], workdir: str, strategy: str, encoder, real: bool):
+    """-> (index, vindex or None, search(q, k))"""
+    store = build_store(chunks)
+    if retriever == "tfidf":
+        from minsearch import Index
+        ms = Index(text_fields=TEXT_FIELDS)
+        ms.fit(store.views())
+        index = LexicalIndex.from_minsearch(ms, store)
+    else:
+        index = BM25Index(TEXT_FIELDS).fit(store)
+    if retriever != "hybrid":
+        return index, None, lambda q, k: index.search(q, num_results=k)
+    vindex = load_repo_vectors("bench", strategy.replace(":", "_"), index, workdir,
+                               encoder=None if real else encoder)
+    hybrid = HybridRetriever(index, vindex, fusion=FUSION)
+    return index, vindex, hybrid.search
+
+
+def dir_bytes(path: str) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def run_one(strategy: str, retriever: str, chunks: List[Dict], queries, ks: List[int], args, encoder) -> Dict:
+    # a clean timed build, then the same build under tracemalloc for its peak (tracing slows allocations)
+    with tempfile.TemporaryDirectory() as work:
+        t0 = time.perf_counter()
+        index, vindex, search = build(retriever, chunks, work, strategy, encoder, args.real)
+        build_s = time.perf_counter() - t0
+        write_index(index, os.path.join(work, "lexical"))
+        disk = dir_bytes(work)   # saved lexical index + chunk table (+ embeddings and IVF lists)
+    with tempfile.TemporaryDirectory() as work:
+        tracemalloc.start()
+        build(retriever, chunks, work, strategy, encoder, args.real)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    kmax = max(ks)
+    totals: Dict[str, float] = {}
+    lat = []
+    for q, relevant in queries:
+        for rep in range(args.repeat):
+            t0 = time.perf_counter()
+            res = search(q, kmax)
+            lat.append(time.perf_counter() - t0)
+        for name, v in score_ranking([r["filename"] for r in res], relevant, ks).items():
+            totals[name] = totals.get(name, 0.0) + v
+    lat = np.array(lat) * 1000
+    row = {"strategy": strategy, "retriever": retriever, "chunks": len(chunks),
+           "build_s": round(build_s, 3), "build_peak_mb": round(peak / 2**20, 2),
+           "index_mb": round(index_nbytes(index, vindex) / 2**20, 2), "disk_mb": round(disk / 2**20, 2),
+           "p50_ms": round(float(np.percentile(lat, 50)), 3), "p99_ms": round(float(np.percentile(lat, 99)), 3)}
+    row.update({name: round(v / len(queries), 4) for name, v in totals.items()})
+    return row
+
+
+# ---------------- report ----------------
+def git_state(path: str) -> Dict[str, object]:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], cwd=path, capture_output=True, text=True, timeout=30).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def print_table(rows: List[Dict], ks: List[int]) -> None:
+    cols = ["mrr"] + [f"recall@{k}" for k in ks] + [f"ndcg@{k}" for k in ks]
+    print(f"{'strategy':<18} | {'retriever':<8} | {'chunks':>6} | " + " | ".join(f"{c:>9}" for c in cols)
+          + " | build s | peak MB | index MB | disk MB | p50 ms | p99 ms")
+    for r in rows:
+        print(f"{r['strategy']:<18} | {r['retriever']:<8} | {r['chunks']:>6} | "
+              + " | ".join(f"{r[c]:>9.3f}" for c in cols)
+              + f" | {r['build_s']:>7.2f} | {r['build_peak_mb']:>7.1f} | {r['index_mb']:>8.2f} | "
+                f"{r['disk_mb']:>7.2f} | {r['p50_ms']:>6.2f} | {r['p99_ms']:>6.2f}")
+
+
+def compare(rows: List[Dict], old: Dict, ks: List[int]) -> None:
+    """Deltas against an earlier report for the (strategy, retriever) pairs both have."""
+    before = {(r["strategy"], r["retriever"]): r for r in old["results"]}
+    cols = ["mrr", f"recall@{min(ks)}", f"recall@{max(ks)}", f"ndcg@{max(ks)}", "build_s", "index_mb", "p50_ms", "p99_ms"]
+    print(f"\nvs {old.get('commit') or '?'}{' (dirty)' if old.get('dirty') else ''} ({old.get('created', '')}):")
+    print(f"{'strategy':<18} | {'retriever':<8} | " + " | ".join(f"{c:>10}" for c in cols))
+    for r in rows:
+        o = before.get((r["strategy"], r["retriever"]))
+        if o is None:
+            continue
+        print(f"{r['strategy']:<18} | {r['retriever']:<8} | "
+              + " | ".join(f"{r[c] - o[c]:>+10.3f}" if c in o else f"{'n/a':>10}" for c in cols))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", default=DAY2, help="directory with evidently_*.jsonl")
+    ap.add_argument("--strategies", nargs="+",
+                    default=["sliding", "paragraph", "section", "llm", f"window:{WINDOW}:{STRIDE}", "markdown:3"])
+    ap.add_argument("--retrievers", nargs="+", default=list(RETRIEVERS), choices=RETRIEVERS)
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    ap.add_argument("--queries", default="", help="labeled JSONL {query, relevant: [filenames]}")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per query for the latency percentiles")
+    ap.add_argument("--encode-ms", type=float, default=0.0, help="stand-in encoder latency per batch (hybrid)")
+    ap.add_argument("--real", action="store_true", help="all-MiniLM-L6-v2 instead of the stand-in encoder")
+    ap.add_argument("--out", default="", help="write the machine-readable report here")
+    ap.add_argument("--compare", default="", help="earlier report to diff against")
+    args = ap.parse_args()
+    ks = sorted(set(args.k))
+
+    sliding = os.path.join(args.data_dir, "evidently_sliding.jsonl")
+    docs = stitch_docs(load_chunks(sliding, os.path.join(args.data_dir, "evidently_docs.jsonl")))
+    queries = load_queries(args.queries) if args.queries else default_queries(docs)
+    encoder = hashing_encoder(args.encode_ms)
+    print(f"{len(queries)} queries over {len(docs)} docs; hybrid vector leg: "
+          f"{'all-MiniLM-L6-v2' if args.real else 'hashed 3-grams (stand-in)'}, fusion {FUSION}")
+
+    with tempfile.TemporaryDirectory() as work:   # warm-up: imports and first allocations are not charged to row 1
+        build("bm25", [{"filename": d["filename"], "text": d["content"]} for d in docs[:5]], work, "warmup", encoder, False)
+
+    rows = []
+    for strategy in args.strategies:
+        chunks = strategy_chunks(strategy, args.data_dir, docs)
+        if not chunks:
+            print(f"[SKIP] {strategy}: no chunks")
+            continue
+        for retriever in args.retrievers:
+            rows.append(run_one(strategy, retriever, chunks, queries, ks, args, encoder))
+    print_table(rows, ks)
+
+    report = {"version": REPORT_VERSION, **git_state(os.path.dirname(os.path.abspath(__file__))),
+              "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+              "params": {"k": ks, "queries": args.queries or "frontmatter descriptions", "n_queries": len(queries),
+                         "repeat": args.repeat, "encoder": "all-MiniLM-L6-v2" if args.real else "hashed-3gram",
+                         "fusion": FUSION, "text_fields": TEXT_FIELDS},
+              "results": rows}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] report -> {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(rows, json.load(f), ks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -----------------------------------------------------------
+# Model fallback with heavy-tailed, flaky models: the old sequential MODEL_TRY
+# walk vs ModelRouter (deadlines, hedging, breaker), with fake local models
+#   python bench_router.py --calls 200 --tail 0.03 --tail-s 1
+# The last row sets the deadline below the stall (--miss-deadline), so stalled
+# calls are abandoned at their deadline and the next model answers.
+# -----------------------------------------------------------
+import time, random, argparse
+
+import numpy as np
+
+from model_router import ModelRouter
+
+
+class FakeModel:
+    """generate(prompt) sleeps like a model call; `tail` of calls stall, `fail` of calls raise."""
+
+    def __init__(self, name, base_s, tail=0.0, tail_s=0.0, fail=0.0, seed=0):
+        self.name, self.base_s, self.tail, self.tail_s, self.fail = name, base_s, tail, tail_s, fail
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        r = self.rng.random()
+        time.sleep(self.base_s * (0.8 + 0.4 * self.rng.random()) + (self.tail_s if r < self.tail else 0))
+        if self.rng.random() < self.fail:
+            raise RuntimeError(f"{self.name}: 503")
+        return f"answer from {self.name}"
+
+
+def make_models(args):
+    # every model has the same stall/error profile; the primary is the fastest
+    return {name: FakeModel(name, args.base_s * speed, args.tail, args.tail_s, args.fail, seed)
+            for seed, (name, speed) in enumerate([("gemini-2.5-flash", 1.0), ("gemini-pro-latest", 1.5),
+                                                  ("gemini-2.0-flash", 1.2)])}
+
+
+def sequential(models, prompt):
+    """What try_gemini_answer did: one model after another, no deadline."""
+    for name, m in models.items():
+        try:
+            return m.generate(prompt), name
+        except Exception:
+            pass
+    return None, None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--base-s", type=float, default=0.05)
+    ap.add_argument("--tail", type=float, default=0.03, help="share of calls that stall")
+    ap.add_argument("--tail-s", type=float, default=1.0)
+    ap.add_argument("--fail", type=float, default=0.05, help="share of calls that error")
+    ap.add_argument("--deadline", type=float, default=2.0)
+    ap.add_argument("--miss-deadline", type=float, default=0.3, help="deadline of the last row, under --tail-s")
+    args = ap.parse_args()
+
+    for label in ("sequential", "router, no hedge", "router + hedge", "router, deadline"):
+        models = make_models(args)
+        if label == "sequential":
+            run = lambda p: sequential(models, p)
+        else:
+            router = ModelRouter(list(models), factory=models.__getitem__,
+                                 deadline=args.miss_deadline if label == "router, deadline" else args.deadline,
+                                 hedge=label == "router + hedge", hedge_min=args.base_s)
+            run = lambda p: router.call(lambda client, name: client.generate(p))
+        lat, failed = [], 0
+        for i in range(args.calls):
+            t0 = time.perf_counter()
+            ans, _ = run(f"q{i}")
+            lat.append(time.perf_counter() - t0)
+            failed += ans is None
+        lat = np.array(lat) * 1000
+        calls = sum(m.calls for m in models.values())
+        print(f"{label:<18} p50 {np.percentile(lat, 50):7.1f} ms | p99 {np.percentile(lat, 99):7.1f} ms"
+              f" | max {lat.max():7.1f} ms | model calls {calls / args.calls:.2f}/q | no answer {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# -----------------------------------------------------------
+# Load test for the DermaScan API: QPS and latency percentiles of /search and
+# /answer at several concurrency levels, against the local fake LLM
+#   python bench_service.py --concurrency 1 8 32 --seconds 10
+#   python bench_service.py --url http://127.0.0.1:8765 --owner SiriYellu --name DermaScan_AndroidApp
+# Without --url it serves the Evidently docs as a repo ZIP from a local HTTP
+# server and starts the API in-process with the fake LLM, so no network is needed.
+# -----------------------------------------------------------
+import os, sys, time, zipfile, argparse, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI-Agents-Day2"))
+from bench_chunk_pipeline import load_evidently_docs
+from bench_ingest_memory import serve
+import repo_zip
+
+
+def self_host(args) -> str:
+    docs = load_evidently_docs()
+    root = tempfile.mkdtemp()
+    path = os.path.join(root, args.owner, args.name, "zip", "refs", "heads", "main")
+    os.makedirs(os.path.dirname(path))
+    with zipfile.ZipFile(path, "w") as zf:
+        for d in docs:
+            zf.writestr(f"{args.name}-main/{d['filename']}", d["content"])
+    repo_zip.CODELOAD = f"http://127.0.0.1:{serve(root).server_address[1]}"
+
+    from dermascan_core import DermaScanCore
+    from service import start_background
+    core = DermaScanCore(cache_dir=os.path.join(root, "cache"), fake_llm=True,
+                         fake_first_token_s=args.first_token_ms / 1000, fake_per_token_s=args.per_token_ms / 1000)
+    return f"http://127.0.0.1:{start_background(core, workers=args.workers)}"
+
+
+def wait_ready(url: str, repo: dict, timeout: float = 300) -> dict:
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        status = requests.get(f"{url}/status", params=repo, timeout=30).json()
+        if status.get("version"):
+            return status
+        if status.get("error"):
+            raise RuntimeError(status["error"])
+        time.sleep(0.2)
+    raise TimeoutError("index did not become ready")
+
+
+def run(url: str, path: str, payloads: list, concurrency: int, seconds: float):
+    """Closed loop: `concurrency` clients each send requests back to back for `seconds`."""
+    lat, errors, counter, lock = [], 0, [0], threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        mine = []
+        while time.perf_counter() < stop:
+            with lock:
+                i = counter[0]
+                counter[0] += 1
+            payload = dict(payloads[i % len(payloads)])
+            payload["q"] += f" {i}"   # distinct question: no query-cache hits
+            t0 = time.perf_counter()
+            try:
+                r = session.post(url + path, json=payload, timeout=60)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            mine.append(time.perf_counter() - t0)
+            if not ok:
+                with lock:
+                    errors += 1
+        with lock:
+            lat.extend(mine)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - t0
+    lat = np.array(lat) * 1000
+    return len(lat) / wall, np.percentile(lat, 50), np.percentile(lat, 99), errors, len(lat)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="", help="running API; default: start one in-process")
+    ap.add_argument("--owner", default="evidentlyai")
+    ap.add_argument("--name", default="docs")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--seconds", type=float, default=8.0)
+    ap.add_argument("--workers", type=int, default=64, help="API thread pool (in-process only)")
+    ap.add_argument("--first-token-ms", type=float, default=300.0, help="fake LLM time to first token")
+    ap.add_argument("--per-token-ms", type=float, default=2.0, help="fake LLM time per streamed word")
+    args = ap.parse_args()
+
+    url = args.url.rstrip("/") or self_host(args)
+    repo = {"owner": args.owner, "name": args.name}
+    t0 = time.perf_counter()
+    status = wait_ready(url, repo)
+    print(f"{url}: {status['chunks']} chunks ready in {time.perf_counter() - t0:.1f} s; "
+          f"every request has a distinct question (no query-cache hits)")
+    questions = [d["metadata"]["description"] for d in load_evidently_docs() if d["metadata"].get("description")]
+    payloads = [{**repo, "q": q, "topk": 5} for q in questions]
+
+    print(f"{'endpoint':<8} | {'clients':>7} | {'QPS':>7} | {'p50 ms':>7} | {'p99 ms':>7} | requests | errors")
+    for path in ("/search", "/answer"):
+        for c in args.concurrency:
+            qps, p50, p99, errors, n = run(url, path, payloads, c, args.seconds)
+            print(f"{path:<8} | {c:>7} | {qps:>7.1f} | {p50:>7.1f} | {p99:>7.1f} | {n:>8} | {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -----------------------------------------------------------
+# Tracing overhead: cost of one span (off / on / on inside a per-request
+# trace) and what the instrumented chunk + fit path pays end to end
+#   python bench_tracing.py --spans 200000 --docs 2000
+# -----------------------------------------------------------
+import os, json, time, random, argparse, tempfile
+
+import tracing
+from tracing import span, collect
+from repo_index import build_index
+
+
+def per_span_ns(n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with span("bench"):
+            pass
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def baseline_ns(n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pass
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def make_docs(n: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    words = "lesion model dataset android tflite segmentation unet camera gradle kotlin".split()
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"filename": f"docs/page_{i}.md", "content": " ".join(rnd.choices(words, k=400))}) + "\n")
+    return path
+
+
+def build(docs_path: str) -> float:
+    t0 = time.perf_counter()
+    build_index(docs_path, 1000, 500)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spans", type=int, default=200000)
+    ap.add_argument("--docs", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    base = baseline_ns(args.spans)
+    tracing.set_enabled(False)
+    off = per_span_ns(args.spans)
+    tracing.set_enabled(True)
+    on = per_span_ns(args.spans)
+    with collect():
+        traced = per_span_ns(args.spans)
+    print(f"empty loop        : {base:7.1f} ns/iter")
+    print(f"span, tracing off : {off - base:7.1f} ns/span")
+    print(f"span, tracing on  : {on - base:7.1f} ns/span")
+    print(f"span, in a trace  : {traced - base:7.1f} ns/span")
+
+    docs_path = make_docs(args.docs)
+    build(docs_path)   # warm-up
+    best = {False: float("inf"), True: float("inf")}
+    for _ in range(args.repeat):   # interleaved, so drift hits both settings alike
+        for flag in best:
+            tracing.set_enabled(flag)
+            best[flag] = min(best[flag], build(docs_path))
+    for flag, t in best.items():
+        print(f"chunk + fit {args.docs} docs, tracing {'on ' if flag else 'off'}: {t * 1000:8.1f} ms")
+    os.remove(docs_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# -----------------------------------------------------------
+# BM25 over an inverted index (numpy postings) with MaxScore top-k pruning;
+# fit/search surface of minsearch.Index, saved/loaded through index_store
+# -----------------------------------------------------------
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from index_store import TermLookup, index_kind, pack_terms
+
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"   # same tokens as minsearch's TfidfVectorizer
+
+
+@index_kind("bm25")
+class BM25Index(TermLookup):
+    """Per-field BM25, summed with boosts: score = sum_f boost_f * BM25_f(query, doc).
+
+    Each field is an inverted index: postings (doc ids, precomputed term
+    impacts) laid out term-major in flat arrays, plus each term's maximum
+    impact. Queries walk postings in decreasing upper-bound order; once the
+    bounds of the remaining terms cannot lift an unseen doc into the top k
+    (MaxScore), those lists are only probed for the current candidates
+    instead of being scanned. Results are exact.
+    """
+
+    def __init__(self, text_fields: List[str], keyword_fields: Optional[List[str]] = None,
+                 k1: float = 1.2, b: float = 0.75, token_pattern: str = TOKEN_PATTERN, lowercase: bool = True):
+        self.text_fields = list(text_fields)
+        self.keyword_fields = list(keyword_fields or [])
+        self.k1, self.b = k1, b
+        self.token_pattern, self.lowercase = token_pattern, lowercase
+        self.pattern = re.compile(token_pattern)
+        self.arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        self.keyword_values: Dict[str, list] = {}
+        self.store: Optional[ChunkStore] = None
+        self.key = None
+        self.n = 0
+        self._docs = None
+        self.terms = {}
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def docs(self) -> list:
+        if self._docs is None:
+            self._docs = self.store.views() if self.store is not None else []
+        return self._docs
+
+    def fit(self, docs) -> "BM25Index":
+        """Index a list of dicts, or a ChunkStore (then the index can also be saved)."""
+        from sklearn.feature_extraction.text import CountVectorizer   # build-time only
+
+        if isinstance(docs, ChunkStore):
+            self.store, docs = docs, docs.views()
+        self._docs, self.n = docs, len(docs)
+        for field in self.text_fields:
+            texts = [d.get(field, "") or "" for d in docs]
+            vec = CountVectorizer(token_pattern=self.token_pattern, lowercase=self.lowercase)
+            try:
+                counts = vec.fit_transform(texts)
+                terms = list(vec.get_feature_names_out())
+            except ValueError:   # empty corpus / no tokens at all
+                counts, terms = None, []
+            self.arrays[field] = self._postings(counts, terms)
+        for field in self.keyword_fields:
+            codes: Dict = {}
+            self.arrays[f"kw:{field}"] = {"codes": np.fromiter(
+                (codes.setdefault(d.get(field), len(codes)) for d in docs), np.int32, self.n)}
+            self.keyword_values[field] = list(codes)
+        self._init_terms()
+        return self
+
+    def _postings(self, counts, terms: List[str]) -> Dict[str, np.ndarray]:
+        if counts is None:
+            return {**pack_terms([]), "indptr": np.zeros(1, np.int64), "docs": np.zeros(0, np.int32),
+                    "impacts": np.zeros(0, np.float32), "max_impact": np.zeros(0, np.float32)}
+        lengths = np.asarray(counts.sum(axis=1), np.float64).ravel()
+        avgdl = lengths.mean() or 1.0
+        csc = counts.tocsc()
+        csc.sort_indices()
+        df = np.diff(csc.indptr)
+        idf = np.log1p((self.n - df + 0.5) / (df + 0.5))
+        tf = csc.data.astype(np.float64)
+        norm = self.k1 * (1 - self.b + self.b * lengths[csc.indices] / avgdl)
+        impacts = (np.repeat(idf, df) * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+        return {**pack_terms(terms), "indptr": csc.indptr.astype(np.int64), "docs": csc.indices.astype(np.int32),
+                "impacts": impacts, "max_impact": np.maximum.reduceat(impacts, csc.indptr[:-1])}
+
+    def _filter_mask(self, filter_dict: Dict) -> np.ndarray:
+        """Keyword filters: {"field": value} or {"field": [v1, v2]} (AND across fields)."""
+        ok = np.ones(self.n, bool)
+        for field, value in filter_dict.items():
+            if field not in self.keyword_values:
+                raise ValueError(f"{field!r} is not a keyword field")
+            wanted = value if isinstance(value, (list, tuple, set)) else [value]
+            codes = [i for i, v in enumerate(self.keyword_values[field]) if v in wanted]
+            ok &= np.isin(self.arrays[f"kw:{field}"]["codes"], codes)
+        return ok
+
+    def search(self, query: str, filter_dict: Optional[Dict] = None, boost_dict: Optional[Dict] = None,
+               num_results: int = 10, output_ids: bool = False) -> List:
+        """Top `num_results` docs by BM25; fields with a non-positive boost are skipped."""
+        boost_dict = boost_dict or {}
+        if not self.n or num_results <= 0:
+            return []
+        tokens = Counter(self.pattern.findall(query.lower() if self.lowercase else query))
+        lists = []   # (upper bound, weight, doc ids, impacts) per matched (field, term)
+        for field in self.text_fields:
+            boost = boost_dict.get(field, 1)
+            if boost <= 0:
+                continue
+            a = self.arrays[field]
+            for term, qtf in tokens.items():
+                c = self._column(field, term)
+                if c >= 0:
+                    lo, hi = a["indptr"][c], a["indptr"][c + 1]
+                    w = boost * qtf
+                    lists.append((w * float(a["max_impact"][c]), w, a["docs"][lo:hi], a["impacts"][lo:hi]))
+        if not lists:
+            return []
+        allowed = self._filter_mask(filter_dict) if filter_dict else None
+        top, scores = self._top_k(lists, num_results, allowed)
+        if output_ids:
+            return [{**self.docs[i], "_id": int(i), "_score": float(s)} for i, s in zip(top, scores)]
+        return [self.docs[i] for i in top]
+
+    def _top_k(self, lists: list, k: int, allowed: Optional[np.ndarray]):
+        """-> (doc ids, scores) of the k best docs, best first."""
+        lists.sort(key=lambda l: -l[0])
+        remaining = np.cumsum([l[0] for l in lists][::-1])[::-1]   # sum of bounds of lists i..end
+        scores = np.zeros(self.n, np.float32)
+        seen = np.zeros(0, np.int32)
+        for i, (_, w, docs, impacts) in enumerate(lists):
+            if i:
+                ranked = seen if allowed is None else seen[allowed[seen]]
+                if len(ranked) >= k:
+                    theta = np.partition(scores[ranked], -k)[-k]
+                    if remaining[i] <= theta:
+                        # the rest are non-essential: score only docs that can still reach theta
+                        seen = ranked[scores[ranked] + remaining[i] >= theta]
+                        for _, w2, docs2, impacts2 in lists[i:]:
+                            pos = np.minimum(np.searchsorted(docs2, seen), len(docs2) - 1)
+                            hit = docs2[pos] == seen
+                            scores[seen[hit]] += w2 * impacts2[pos[hit]]
+                        break
+            scores[docs] += w * impacts   # doc ids are unique within a postings list
+            seen = np.union1d(seen, docs)
+        if allowed is not None:
+            seen = seen[allowed[seen]]
+        seen = seen[scores[seen] > 0]
+        top = seen[np.lexsort((seen, -scores[seen]))][:k]
+        return top, scores[top]
+
+    def _meta(self) -> Dict:
+        return {"text_fields": self.text_fields, "keyword_fields": self.keyword_fields,
+                "keyword_values": self.keyword_values, "k1": self.k1, "b": self.b,
+                "token_pattern": self.token_pattern, "lowercase": self.lowercase, "n": self.n}
+
+    @classmethod
+    def from_saved(cls, meta: Dict, arrays: Dict, store: ChunkStore, key: Optional[Dict]) -> "BM25Index":
+        index = cls(meta["text_fields"], meta["keyword_fields"], k1=meta["k1"], b=meta["b"],
+                    token_pattern=meta["token_pattern"], lowercase=meta["lowercase"])
+        index.arrays, index.keyword_values, index.n = arrays, meta["keyword_values"], meta["n"]
+        index.store, index.key = store, key
+        index._init_terms()
+        return index
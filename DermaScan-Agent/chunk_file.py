@@ -0,0 +1,468 @@
+# -----------------------------------------------------------
+# Columnar chunk files (.dsc), the binary stand-in for chunk/doc JSONL:
+# records are written in blocks of columns, repeated values (source,
+# filename, split_type, metadata) live once in a string table, columns are
+# compressed one by one and decoded only when a record field needs them,
+# and a footer indexes blocks and files so one file's chunks can be read
+# without decoding the rest
+#   python chunk_file.py evidently_*.jsonl [--codec zlib|lzma|none]
+# -----------------------------------------------------------
+import os, json, lzma, mmap, zlib, bisect, struct, argparse
+from array import array
+from itertools import accumulate, repeat
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"DSCOLS01"
+EXT = ".dsc"
+CODECS = ("none", "zlib", "lzma")
+TEXT_FIELDS = ("text", "content", "chunk")   # long per-record strings: stored inline, never interned
+BLOCK_CHARS = 64 * 1024    # a block is written once its text columns hold this many characters; smaller
+                           # blocks make one file's records cheaper to reach, larger ones compress better
+BLOCK_RECORDS = 4096
+
+# MAGIC | u8 codec | block* | footer | u64 footer length | MAGIC
+# block  = u32 header length | JSON header | codec(column buffers) per column
+# footer = codec(JSON: block offsets, string table, filename -> record runs)
+# (version 1 files compressed the whole block in one piece; they still read)
+VERSION = 2
+_CODEC = struct.Struct("<B")
+_TAIL = struct.Struct("<Q")
+_U32 = struct.Struct("<I")
+_NONE = 0xFFFFFFFF   # string-table id of a missing value
+_MISSING = object()
+_PROBE = 64          # characters of a text looked up in the previous one to detect window overlap
+
+
+def _array(code: str, buf) -> array:
+    a = array(code)
+    a.frombytes(buf)
+    return a
+
+
+_COMPRESS = {"none": bytes, "zlib": lambda b: zlib.compress(b, 6), "lzma": lambda b: lzma.compress(b, preset=6)}
+_DECOMPRESS = {"none": bytes, "zlib": zlib.decompress, "lzma": lzma.decompress}
+
+
+def _encode_text(values: List[str]) -> List[bytes]:
+    """[new chars per value, chars reused from the end of the previous value, UTF-8 of the new chars].
+    Overlapping sliding windows are stored once; unrelated texts reuse nothing."""
+    lengths, reused, pieces, prev = array("I"), array("I"), [], ""
+    for v in values:
+        k = 0
+        if prev and len(v) >= _PROBE:
+            p = prev.find(v[:_PROBE])
+            if p >= 0 and v.startswith(prev[p:]):
+                k = len(prev) - p
+        lengths.append(len(v) - k)
+        reused.append(k)
+        pieces.append(v[k:] if k else v)
+        prev = v
+    return [lengths.tobytes(), reused.tobytes(), "".join(pieces).encode("utf-8")]
+
+
+def _decode_text(parts: List[memoryview]) -> List[str]:
+    lengths, reused = _array("I", parts[0]), _array("I", parts[1])
+    text = str(parts[2], "utf-8")
+    ends = list(accumulate(lengths))
+    if not any(reused):
+        return [text[e - n:e] for n, e in zip(lengths, ends)]
+    out, prev = [], ""
+    for n, e, k in zip(lengths, ends, reused):
+        prev = (prev[len(prev) - k:] + text[e - n:e]) if k else text[e - n:e]
+        out.append(prev)
+    return out
+
+
+class ChunkWriter:
+    """Streaming writer: records are buffered one block at a time, then encoded per column.
+
+    Column types are chosen per block: TEXT_FIELDS strings are stored inline,
+    ints as int64, other strings and any JSON value (metadata dicts, lists,
+    floats) as ids into the file's string table. The file is written to
+    `<path>.tmp` and moved into place by close(); if the `with` block raises,
+    the temp file is removed and `path` is left as it was.
+    """
+
+    def __init__(self, path: str, codec: str = "zlib", text_fields: Iterable[str] = TEXT_FIELDS,
+                 file_field: str = "filename", block_chars: int = BLOCK_CHARS, block_records: int = BLOCK_RECORDS):
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}, expected one of {CODECS}")
+        self.path, self.codec = path, codec
+        self.text_fields, self.file_field = set(text_fields), file_field
+        self.block_chars, self.block_records = block_chars, block_records
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.blocks: List[List[int]] = []           # [offset, length, records]
+        self.files: Dict[str, List[List[int]]] = {}  # filename -> [[first record, count], ...]
+        self.count = 0
+        self.pending: List[Dict] = []
+        self.pending_chars = 0
+        self.f = open(path + ".tmp", "wb")
+        self.f.write(MAGIC + _CODEC.pack(CODECS.index(codec)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def abort(self) -> None:
+        """Drop everything written so far; `path` is not touched."""
+        if not self.f.closed:
+            self.f.close()
+        if os.path.exists(self.path + ".tmp"):
+            os.remove(self.path + ".tmp")
+
+    def write(self, record: Dict) -> None:
+        fn = record.get(self.file_field)
+        if isinstance(fn, str):
+            runs = self.files.setdefault(fn, [])
+            if runs and runs[-1][0] + runs[-1][1] == self.count:
+                runs[-1][1] += 1
+            else:
+                runs.append([self.count, 1])
+        self.pending.append(record)
+        self.count += 1
+        self.pending_chars += sum(len(v) for k, v in record.items() if k in self.text_fields and isinstance(v, str))
+        if self.pending_chars >= self.block_chars or len(self.pending) >= self.block_records:
+            self._flush()
+
+    def write_all(self, records: Iterable[Dict]) -> int:
+        n = 0
+        for r in records:
+            self.write(r)
+            n += 1
+        return n
+
+    def _intern(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+        records, self.pending, self.pending_chars = self.pending, [], 0
+        columns, bufs = [], []
+        for key in dict.fromkeys(k for r in records for k in r):
+            values = [r.get(key, _MISSING) for r in records]
+            missing = any(v is _MISSING for v in values)
+            if key in self.text_fields and not missing and all(isinstance(v, str) for v in values):
+                kind, parts = "text", _encode_text(values)
+            elif not missing and all(type(v) is int and -2**63 <= v < 2**63 for v in values):
+                kind, parts = "int", [array("q", values).tobytes()]
+            elif all(v is _MISSING or isinstance(v, str) for v in values):
+                kind, parts = "str", [array("I", (_NONE if v is _MISSING else self._intern(v)
+                                                  for v in values)).tobytes()]
+            else:
+                kind, parts = "json", [array("I", (_NONE if v is _MISSING else
+                                                   self._intern(json.dumps(v, ensure_ascii=False))
+                                                   for v in values)).tobytes()]
+            buf = _COMPRESS[self.codec](b"".join(parts))
+            columns.append([key, kind, [len(p) for p in parts], missing, len(buf)])
+            bufs.append(buf)
+        header = json.dumps({"n": len(records), "columns": columns}).encode("utf-8")
+        payload = b"".join([_U32.pack(len(header)), header] + bufs)
+        self.blocks.append([self.f.tell(), len(payload), len(records)])
+        self.f.write(payload)
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        self._flush()
+        footer = _COMPRESS[self.codec](json.dumps(
+            {"version": VERSION, "count": self.count, "blocks": self.blocks, "strings": self.strings,
+             "files": self.files}, ensure_ascii=False).encode("utf-8"))
+        self.f.write(footer)
+        self.f.write(_TAIL.pack(len(footer)) + MAGIC)
+        self.f.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+class _Block:
+    """One block's columns; each is decompressed and decoded the first time a record asks for it.
+    Holds its own copy of the block bytes, so records outlive the reader's mmap."""
+
+    __slots__ = ("reader", "raw", "decompress", "n", "names", "spans", "values")
+
+    def __init__(self, reader: "ChunkReader", raw: bytes, decompress):
+        (hlen,) = _U32.unpack_from(raw, 0)
+        header = json.loads(raw[4:4 + hlen])
+        self.reader, self.raw, self.decompress = reader, raw, decompress
+        self.n, self.names, self.spans, self.values = header["n"], [], {}, {}
+        pos = 4 + hlen
+        for name, kind, sizes, missing, *clen in header["columns"]:
+            end = pos + (clen[0] if clen else sum(sizes))
+            self.names.append(name)
+            self.spans[name] = (kind, sizes, missing, pos, end)
+            pos = end
+
+    def get(self, name: str) -> Optional[List]:
+        """Every record's `name` value in this block (_MISSING where absent), or None without the column."""
+        values = self.values.get(name)
+        if values is None:
+            span = self.spans.get(name)
+            if span is None:
+                return None
+            kind, sizes, missing, start, end = span
+            buf, parts, pos = memoryview(self.decompress(self.raw[start:end])), [], 0
+            for size in sizes:
+                parts.append(buf[pos:pos + size])
+                pos += size
+            values = self.values[name] = self.reader._values(kind, parts, missing)
+        return values
+
+    def dicts(self) -> List[Dict]:
+        names = self.names
+        rows = zip(*map(self.get, names)) if names else iter([()] * self.n)
+        if not any(self.spans[name][2] for name in names):
+            return list(map(dict, map(zip, repeat(names), rows)))
+        return [{k: v for k, v in zip(names, row) if v is not _MISSING} for row in rows]
+
+
+class Record(Mapping):
+    """A read-only record backed by its block's columns: a field is decoded on first
+    access, for every record of the block at once. Compares equal to the dict it was
+    written from; dict(record) gives a plain copy."""
+
+    __slots__ = ("_block", "_i")
+
+    def __init__(self, block: _Block, i: int):
+        self._block, self._i = block, i
+
+    def get(self, key, default=None):
+        values = self._block.get(key)
+        if values is None:
+            return default
+        v = values[self._i]
+        return default if v is _MISSING else v
+
+    def __getitem__(self, key):
+        v = self.get(key, _MISSING)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        b = self._block
+        for name in b.names:
+            if not b.spans[name][2] or b.get(name)[self._i] is not _MISSING:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Record({dict(self)!r})"
+
+
+class ChunkReader:
+    """Memory-mapped reader: iterate records block by block, read one column, or
+    fetch one file's records through the footer's file index.
+
+    Records are lazy (see Record), so iterating a file only touches the columns
+    the caller reads. Values decoded from the same string-table entry share one
+    object (e.g. a doc's metadata dict across its chunks), as ChunkStore views
+    share doc metadata.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        head = len(MAGIC) + _CODEC.size
+        if len(mm) < head + _TAIL.size + len(MAGIC) or mm[:len(MAGIC)] != MAGIC or mm[-len(MAGIC):] != MAGIC:
+            mm.close()
+            raise ValueError(f"{path}: not a chunk file")
+        self.codec = CODECS[_CODEC.unpack_from(mm, len(MAGIC))[0]]
+        end = len(mm) - len(MAGIC) - _TAIL.size
+        (flen,) = _TAIL.unpack_from(mm, end)
+        footer = json.loads(_DECOMPRESS[self.codec](mm[end - flen:end]))
+        self.version = footer.get("version", 1)
+        self.count = footer["count"]
+        self.blocks = footer["blocks"]
+        self.strings: List[str] = footer["strings"]
+        self.files: Dict[str, List[List[int]]] = footer["files"]
+        self.firsts = [0] + list(accumulate(b[2] for b in self.blocks))[:-1]   # first record of each block
+        self._json: Dict[int, Any] = {}
+        self._cached: Tuple[int, Optional[List[Record]]] = (-1, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _block(self, b: int) -> _Block:
+        offset, length, _ = self.blocks[b]
+        raw = self._mm[offset:offset + length]
+        if self.version == 1:
+            return _Block(self, _DECOMPRESS[self.codec](raw), bytes)
+        return _Block(self, raw, _DECOMPRESS[self.codec])
+
+    def _values(self, kind: str, parts: List[memoryview], missing: bool) -> List:
+        if kind == "text":
+            return _decode_text(parts)
+        if kind == "int":
+            return _array("q", parts[0]).tolist()
+        ids = _array("I", parts[0])
+        if kind == "str":
+            strings = self.strings
+            if not missing:
+                return list(map(strings.__getitem__, ids))
+            return [_MISSING if i == _NONE else strings[i] for i in ids]
+        cache, strings = self._json, self.strings
+        for i in set(ids) - cache.keys():
+            cache[i] = _MISSING if i == _NONE else json.loads(strings[i])
+        return [cache[i] for i in ids]
+
+    def block(self, b: int) -> List[Record]:
+        blk = self._block(b)
+        return list(map(Record, [blk] * blk.n, range(blk.n)))
+
+    def __iter__(self) -> Iterator[Record]:
+        for b in range(len(self.blocks)):
+            yield from self.block(b)
+
+    def dicts(self) -> Iterator[Dict]:
+        """Every record as a plain dict, decoding whole blocks (faster than dict() per Record)."""
+        for b in range(len(self.blocks)):
+            yield from self._block(b).dicts()
+
+    def column(self, name: str) -> List:
+        """Every record's `name` value (None where missing), without building records."""
+        out = []
+        for b in range(len(self.blocks)):
+            blk = self._block(b)
+            values = blk.get(name)
+            out.extend([None] * blk.n if values is None else (None if v is _MISSING else v for v in values))
+        return out
+
+    def records_for(self, filename: str) -> List[Record]:
+        """Records of one file, decoding only the blocks that hold them."""
+        out = []
+        for first, count in self.files.get(filename, ()):
+            i = first
+            while i < first + count:
+                b = bisect.bisect_right(self.firsts, i) - 1
+                if self._cached[0] != b:
+                    self._cached = (b, self.block(b))
+                rows = self._cached[1]
+                stop = min(first + count, self.firsts[b] + len(rows))
+                out.extend(rows[i - self.firsts[b]:stop - self.firsts[b]])
+                i = stop
+        return out
+
+
+class JsonlWriter:
+    """ChunkWriter's interface over a plain JSONL file (same temp file and replace)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path + ".tmp", "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    __exit__ = ChunkWriter.__exit__
+    abort = ChunkWriter.abort
+
+    def write(self, record: Dict) -> None:
+        self.f.write(json.dumps(record if type(record) is dict else dict(record), ensure_ascii=False) + "\n")
+
+    def write_all(self, records: Iterable[Dict]) -> int:
+        n = 0
+        for r in records:
+            self.write(r)
+            n += 1
+        return n
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        self.f.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+def open_writer(path: str, codec: str = "zlib"):
+    """Record sink chosen by extension: a chunk file for EXT, JSONL otherwise."""
+    return ChunkWriter(path, codec) if path.endswith(EXT) else JsonlWriter(path)
+
+
+def iter_records(path: str) -> Iterator[Mapping]:
+    """Records of a chunk file (lazy Records) or a JSONL file (dicts), streamed."""
+    if is_chunk_file(path):
+        with ChunkReader(path) as r:
+            yield from r
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def is_chunk_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_chunks(records: Iterable[Dict], path: str, codec: str = "zlib", **kwargs) -> int:
+    with ChunkWriter(path, codec, **kwargs) as w:
+        return w.write_all(records)
+
+
+def read_chunks(path: str, lazy: bool = True) -> List[Mapping]:
+    with ChunkReader(path) as r:
+        return list(r if lazy else r.dicts())
+
+
+def rewrite_chunks(path: str, stale: Iterable[str], fresh: Iterable[Dict], key: str = "filename",
+                   codec: str = "zlib") -> int:
+    """rewrite_jsonl for chunk files: keep records whose `key` is not in `stale`, append `fresh`."""
+    stale = set(stale)
+    with ChunkWriter(path, codec) as w:
+        n = 0
+        if os.path.exists(path):
+            with ChunkReader(path) as old:
+                n = w.write_all(r for r in old if r.get(key) not in stale)
+        return n + w.write_all(fresh)
+
+
+def convert_jsonl(src: str, dst: Optional[str] = None, codec: str = "zlib") -> Tuple[str, int]:
+    """JSONL -> chunk file next to it (same name, EXT suffix) -> (path, records)."""
+    dst = dst or os.path.splitext(src)[0] + EXT
+    with open(src, "r", encoding="utf-8") as f:
+        n = write_chunks((json.loads(line) for line in f if line.strip()), dst, codec)
+    return dst, n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert chunk/doc JSONL files to columnar chunk files.")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--codec", default="zlib", choices=CODECS)
+    args = ap.parse_args()
+    for src in args.paths:
+        dst, n = convert_jsonl(src, codec=args.codec)
+        before, after = os.path.getsize(src), os.path.getsize(dst)
+        print(f"[OK] {src} -> {dst}  ({n} records, {before / 1024:.0f} KB -> {after / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# -----------------------------------------------------------
+# Offset-based chunk store: one deduplicated UTF-8 text blob plus
+# array-backed (start, end, doc) spans; memory-mappable on disk
+# -----------------------------------------------------------
+import json, mmap, struct, hashlib
+from array import array
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+MAGIC = b"DSCHNK01"
+HEADER = struct.Struct("<Q")   # length of the JSON header that follows MAGIC
+
+
+def _char_to_byte(text: str) -> Callable[[int], int]:
+    """Map character offsets to UTF-8 byte offsets; O(1) for ASCII, amortised
+    linear for monotonically increasing positions otherwise."""
+    if text.isascii():
+        return lambda pos: pos
+    state = [0, 0]  # last (char, byte) position
+
+    def convert(pos: int) -> int:
+        if pos < state[0]:
+            state[0] = state[1] = 0
+        state[1] += len(text[state[0]:pos].encode("utf-8"))
+        state[0] = pos
+        return state[1]
+    return convert
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+class ChunkStore:
+    """Chunks stored as byte spans into a blob of deduplicated document texts.
+
+    Overlapping windows share the underlying text, so a sliding window with
+    50% overlap costs one copy of the corpus plus 20 bytes per chunk instead
+    of two copies. Text is decoded only when a consumer asks for it.
+    """
+
+    def __init__(self, text_field: str = "content"):
+        self.text_field = text_field
+        self.blob = bytearray()
+        self.docs = []              # per-doc metadata dicts
+        self.doc_start = array("Q")
+        self.doc_end = array("Q")
+        self.starts = array("Q")    # absolute byte offsets into blob
+        self.ends = array("Q")
+        self.doc_ids = array("I")
+        self._by_hash: Dict[bytes, int] = {}
+        self._mmap = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, text: str, spans: Iterable[Tuple[int, int]], **meta) -> int:
+        """Add one doc and its chunk spans (character offsets). Returns the doc id."""
+        raw = text.encode("utf-8")
+        key = hashlib.sha1(raw).digest()
+        base = self._by_hash.get(key)
+        if base is None:
+            base = self._by_hash[key] = len(self.blob)
+            self.blob += raw
+        doc = len(self.docs)
+        self.docs.append(meta)
+        self.doc_start.append(base)
+        self.doc_end.append(base + len(raw))
+        start_b, end_b = _char_to_byte(text), _char_to_byte(text)
+        for s, e in spans:
+            self.starts.append(base + start_b(s))
+            self.ends.append(base + end_b(e))
+            self.doc_ids.append(doc)
+        return doc
+
+    def text(self, i: int) -> str:
+        return str(self.blob[self.starts[i]:self.ends[i]], "utf-8")
+
+    def doc_text(self, doc: int) -> str:
+        return str(self.blob[self.doc_start[doc]:self.doc_end[doc]], "utf-8")
+
+    def view(self, i: int) -> "ChunkView":
+        return ChunkView(self, i)
+
+    def views(self) -> list:
+        return [ChunkView(self, i) for i in range(len(self))]
+
+    def __iter__(self) -> Iterator["ChunkView"]:
+        return (ChunkView(self, i) for i in range(len(self)))
+
+    # ---- on-disk format ----
+    # MAGIC | u64 header len | JSON header | pad8 |
+    # doc_start u64[D] | doc_end u64[D] | starts u64[N] | ends u64[N] | doc_ids u32[N] | pad8 | blob
+    # Arrays are written in native byte order (little-endian on every supported platform).
+
+    def save(self, path: str) -> None:
+        header = json.dumps({"version": 1, "text_field": self.text_field, "n_docs": len(self.docs),
+                             "n_chunks": len(self), "blob_len": len(self.blob), "docs": self.docs},
+                            ensure_ascii=False).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER.pack(len(header)))
+            f.write(header)
+            f.write(b"\0" * _pad8(len(MAGIC) + HEADER.size + len(header)))
+            for arr in (self.doc_start, self.doc_end, self.starts, self.ends, self.doc_ids):
+                f.write(memoryview(arr).cast("B"))
+            f.write(b"\0" * _pad8(4 * len(self)))
+            f.write(self.blob)
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkStore":
+        """Memory-map a saved store; arrays and blob are zero-copy views (read-only)."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            mm.close()
+            raise ValueError(f"{path}: not a chunk store")
+        (hlen,) = HEADER.unpack_from(mm, len(MAGIC))
+        pos = len(MAGIC) + HEADER.size
+        header = json.loads(mm[pos:pos + hlen].decode("utf-8"))
+        pos += hlen + _pad8(pos + hlen)
+        nd, nc = header["n_docs"], header["n_chunks"]
+
+        store = cls(text_field=header["text_field"])
+        store._mmap = mm
+        mv = memoryview(mm)
+        for name, fmt, n in (("doc_start", "Q", nd), ("doc_end", "Q", nd), ("starts", "Q", nc),
+                             ("ends", "Q", nc), ("doc_ids", "I", nc)):
+            size = struct.calcsize(fmt) * n
+            setattr(store, name, mv[pos:pos + size].cast(fmt))
+            pos += size
+        pos += _pad8(4 * nc)
+        store.blob = mv[pos:pos + header["blob_len"]]
+        store.docs = header["docs"]
+        return store
+
+
+class ChunkView(Mapping):
+    """Read-only dict-like chunk; the text field is decoded from the store on access."""
+    __slots__ = ("store", "i")
+
+    def __init__(self, store: ChunkStore, i: int):
+        self.store = store
+        self.i = i
+
+    def _meta(self) -> Dict:
+        return self.store.docs[self.store.doc_ids[self.i]]
+
+    def __getitem__(self, key):
+        if key == self.store.text_field:
+            return self.store.text(self.i)
+        return self._meta()[key]
+
+    def __iter__(self):
+        yield self.store.text_field
+        yield from self._meta()
+
+    def __len__(self) -> int:
+        return 1 + len(self._meta())
+
+    def __repr__(self) -> str:
+        return f"ChunkView({dict(self)!r})"
@@ -0,0 +1,229 @@
+# -----------------------------------------------------------
+# Syntax-aware chunking for source files: split on class / function /
+# XML-element boundaries, pack small neighbouring units up to a size cap,
+# split oversized units on line breaks, and record the symbols each chunk
+# defines so the lexical index can boost on them
+# -----------------------------------------------------------
+import re, ast, bisect
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CODE_EXTS = (".py", ".java", ".kt", ".kts", ".xml")
+MAX_CHARS = 1500   # a chunk never exceeds this, except a single line longer than it
+MIN_CHARS = 200    # a trailing unit smaller than this joins the chunk before it
+
+Chunk = Tuple[int, int, List[str]]   # (start, end, symbols) in character offsets
+
+_PY_DEF = re.compile(r"^([ \t]*)(?:async[ \t]+)?(def|class)[ \t]+(\w+)", re.MULTILINE)
+_JVM_TYPE = re.compile(r"\b(?:class|interface|enum|object|record)[ \t]+(\w+)")
+_KT_FUN = re.compile(r"\bfun[ \t]+(?:<[^>]*>[ \t]*)?(?:[\w.<>?, ]+\.)?(\w+)[ \t]*\(")
+_JAVA_METHOD = re.compile(r"^[ \t]*(?:@\w+(?:\([^)]*\))?[ \t]+)*(?:(?:public|protected|private|static|final|abstract|"
+                          r"synchronized|native|default|strictfp)[ \t]+)*(?:<[^>]*>[ \t]+)?[\w.$<>\[\],? ]+?[ \t]+"
+                          r"(\w+)[ \t]*\(")
+_NOT_METHOD = {"return", "new", "if", "for", "while", "switch", "catch", "else", "throw", "case", "do", "try",
+               "synchronized", "assert"}
+_LEAD = re.compile(r"^[ \t]*(?:#|//|/\*|\*|@|$)")   # comment / annotation / decorator / blank lines
+_XML_TOKEN = re.compile(r"<!--.*?-->|<\?.*?\?>|<!\[CDATA\[.*?\]\]>|<!.*?>|<(/?)([\w:.-]+)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>",
+                        re.DOTALL)
+_XML_NAME = re.compile(r"\b(?:android:id|android:name|name|tools:context|class)[ \t]*=[ \t]*[\"']([^\"']+)[\"']")
+
+
+def split_identifier(name: str) -> List[str]:
+    """"onCreateView" / "load_repo_index" -> ["on", "create", "view"] / ["load", "repo", "index"]."""
+    return [p.lower() for p in re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", name)]
+
+
+def symbols_text(symbols: List[str]) -> str:
+    """Indexed form of a chunk's symbols: each name plus its word parts."""
+    words = []
+    for s in dict.fromkeys(symbols):
+        parts = split_identifier(s)
+        words.append(s)
+        if len(parts) > 1:
+            words.extend(parts)
+    return " ".join(words)
+
+
+def _line_starts(text: str) -> List[int]:
+    return [0] + [m.end() for m in re.finditer("\n", text)]
+
+
+def _with_leading(text: str, starts: List[int], line: int) -> int:
+    """Offset of `line` moved up over the comments / annotations / decorators directly above it."""
+    while line > 0:
+        prev = text[starts[line - 1]:starts[line]]
+        if not _LEAD.match(prev) or not prev.strip():
+            break
+        line -= 1
+    return starts[line]
+
+
+# ---------------- boundaries: (offset, symbols) per unit ----------------
+def _python_units(text: str) -> List[Tuple[int, List[str]]]:
+    starts = _line_starts(text)
+    units = []
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        # unparsable (py2, templates): fall back to def/class lines at the outer two indent levels
+        for m in _PY_DEF.finditer(text):
+            if len(m.group(1).expandtabs(4)) <= 4:
+                line = bisect.bisect_right(starts, m.start()) - 1
+                units.append((_with_leading(text, starts, line), [m.group(3)]))
+        return units
+    defs = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    for node in tree.body:
+        if not isinstance(node, defs):
+            continue
+        first = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+        units.append((_with_leading(text, starts, first), [node.name]))
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                if isinstance(child, defs):
+                    first = min([child.lineno] + [d.lineno for d in child.decorator_list]) - 1
+                    units.append((_with_leading(text, starts, first), [node.name, child.name]))
+    return units
+
+
+def _brace_depths(text: str, starts: List[int]) -> List[int]:
+    """Brace nesting depth at the start of every line; strings, chars and comments are skipped."""
+    depths, depth, i, n, line = [], 0, 0, len(text), 0
+    while i < n:
+        while line < len(starts) and starts[line] <= i:
+            depths.append(depth)
+            line += 1
+        c = text[i]
+        if c == "/" and text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        if c == "/" and text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            continue
+        if c == '"' and text.startswith('"""', i):
+            j = text.find('"""', i + 3)
+            i = n if j < 0 else j + 3
+            continue
+        if c in "\"'":
+            j = i + 1
+            while j < n and text[j] != c and text[j] != "\n":
+                j += 2 if text[j] == "\\" else 1
+            i = j + 1
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth = max(0, depth - 1)
+        i += 1
+    depths.extend([depth] * (len(starts) - len(depths)))
+    return depths
+
+
+def _jvm_units(text: str, kotlin: bool) -> List[Tuple[int, List[str]]]:
+    """Types and functions declared at depth <= 2 (top level, members, members of nested types)."""
+    starts = _line_starts(text)
+    depths = _brace_depths(text, starts)
+    units, types = [], {}   # depth -> name of the type declared there
+    for line, (pos, depth) in enumerate(zip(starts, depths)):
+        if depth > 2:
+            continue
+        end = starts[line + 1] if line + 1 < len(starts) else len(text)
+        src = text[pos:end]
+        stripped = src.lstrip()
+        if not stripped or stripped.startswith(("//", "/*", "*", "import ", "package ")):
+            continue
+        m = _JVM_TYPE.search(src)
+        if m and "(" not in src[:m.start()] and "=" not in src[:m.start()]:
+            types = {d: t for d, t in types.items() if d < depth}
+            types[depth] = m.group(1)
+            units.append((_with_leading(text, starts, line), [t for _, t in sorted(types.items())]))
+            continue
+        m = _KT_FUN.search(src) if kotlin else _JAVA_METHOD.match(src)
+        if m and m.group(1) not in _NOT_METHOD and (kotlin or not src.rstrip().endswith(";")):
+            owners = [t for d, t in sorted(types.items()) if d < depth]
+            units.append((_with_leading(text, starts, line), owners[-1:] + [m.group(1)]))
+    return units
+
+
+def _xml_units(text: str) -> List[Tuple[int, List[str]]]:
+    """Elements opening at depth 1 and 2 (children and grandchildren of the root)."""
+    starts = _line_starts(text)
+    units, depth, root = [], 0, []
+    for m in _XML_TOKEN.finditer(text):
+        if m.group(2) is None:
+            continue
+        closing, tag, attrs = m.group(1), m.group(2), m.group(3) or ""
+        if closing:
+            depth = max(0, depth - 1)
+            continue
+        names = [tag.split(":")[-1].split(".")[-1]] + [v.split("/")[-1].lstrip(".").split(".")[-1]
+                                                        for v in _XML_NAME.findall(attrs)]
+        if depth == 0:
+            root = names
+        elif depth <= 2:
+            line = bisect.bisect_right(starts, m.start()) - 1
+            units.append((_with_leading(text, starts, line), names))
+        if not attrs.rstrip().endswith("/"):
+            depth += 1
+    if root:
+        units.insert(0, (0, root))
+    return units
+
+
+def _units(filename: str, text: str) -> Optional[List[Tuple[int, List[str]]]]:
+    ext = Path(filename).suffix.lower()
+    if ext == ".py":
+        return _python_units(text)
+    if ext in (".java", ".kt", ".kts"):
+        return _jvm_units(text, kotlin=ext != ".java")
+    if ext == ".xml":
+        return _xml_units(text)
+    return None
+
+
+# ---------------- packing ----------------
+def _split_lines(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """[start, end) cut on line breaks into pieces of at most max_chars (a longer line is cut hard)."""
+    out = []
+    while end - start > max_chars:
+        cut = text.rfind("\n", start, start + max_chars)
+        cut = start + max_chars if cut <= start else cut + 1
+        out.append((start, cut))
+        start = cut
+    if end > start:
+        out.append((start, end))
+    return out
+
+
+def code_chunks(filename: str, text: str, max_chars: int = MAX_CHARS,
+                min_chars: int = MIN_CHARS) -> Optional[List[Chunk]]:
+    """Non-overlapping (start, end, symbols) chunks covering `text`; None if `filename` is not code.
+
+    Units run from one boundary to the next (leading comments and annotations
+    belong to the unit below them). Consecutive units are packed while they
+    fit in max_chars; a unit larger than that is split on line breaks, every
+    piece keeping the unit's symbols.
+    """
+    units = _units(filename, text)
+    if units is None:
+        return None
+    bounds = sorted({0: [], **{pos: syms for pos, syms in reversed(units)}}.items())
+    pieces = []   # (start, end, symbols) per unit, oversized ones already split
+    for i, (pos, syms) in enumerate(bounds):
+        end = bounds[i + 1][0] if i + 1 < len(bounds) else len(text)
+        if end > pos:
+            pieces.extend((s, e, syms) for s, e in _split_lines(text, pos, end, max_chars))
+
+    chunks: List[Chunk] = []
+    for s, e, syms in pieces:
+        if chunks and e - chunks[-1][0] <= max_chars:
+            start, _, prev = chunks[-1]
+            chunks[-1] = (start, e, prev + [x for x in syms if x not in prev])
+        else:
+            chunks.append((s, e, list(syms)))
+    if len(chunks) > 1 and chunks[-1][1] - chunks[-1][0] < min_chars \
+            and chunks[-1][1] - chunks[-2][0] <= max_chars + min_chars:
+        (start, _, prev), (_, end, syms) = chunks[-2], chunks.pop()
+        chunks[-1] = (start, end, prev + [x for x in syms if x not in prev])
+    return [c for c in chunks if text[c[0]:c[1]].strip()]
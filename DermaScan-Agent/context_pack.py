@@ -0,0 +1,147 @@
+# -----------------------------------------------------------
+# Token-budgeted context packing: overlapping/adjacent chunks of a file are
+# merged back into spans, near-duplicates dropped, spans packed greedily by
+# relevance per token; reports the prompt tokens saved vs. plain top-k
+# -----------------------------------------------------------
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chunk_store import ChunkView
+
+SEPARATOR = "\n\n---\n\n"
+RRF_K = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """About 4 characters per token for English prose and code; no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\n{3,}", "\n\n", (text or "").strip())
+
+
+def _shingles(text: str, n: int = 5) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+
+def _join_overlap(a: str, b: str, probe: int = 64) -> Optional[str]:
+    """a + b with b's prefix that repeats a's suffix removed; None if they do not overlap."""
+    if b in a:
+        return a
+    head = b[:probe]
+    pos = a.find(head)
+    while pos >= 0:
+        if b.startswith(a[pos:]):
+            return a + b[len(a) - pos:]
+        pos = a.find(head, pos + 1)
+    return None
+
+
+def _spans(results: List, text_field: str) -> List[Dict[str, Any]]:
+    """One entry per result: file, text, rank-based relevance and, for ChunkStore views,
+    the byte span in the shared blob (so overlaps are exact, not textual)."""
+    out = []
+    for rank, r in enumerate(results):
+        span = {"filename": r.get("filename", ""), "rel": 1.0 / (RRF_K + rank + 1), "rank": rank, "chunks": 1}
+        if isinstance(r, ChunkView):
+            s = r.store
+            # grouped by the text's blob offset: code chunks of one file are separate entries over the same text
+            span.update(store=s, doc=(s.doc_start[s.doc_ids[r.i]], span["filename"]),
+                        start=s.starts[r.i], end=s.ends[r.i])
+        else:
+            span["text"] = r.get(text_field, "") or ""
+        out.append(span)
+    return out
+
+
+def _merge(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged: List[Dict[str, Any]] = []
+    by_file: Dict[Any, List[Dict[str, Any]]] = {}
+    for sp in spans:
+        by_file.setdefault(("doc", id(sp["store"]), sp["doc"]) if "store" in sp else ("file", sp["filename"]),
+                           []).append(sp)
+    for key, group in by_file.items():
+        if key[0] == "doc":   # byte intervals of one document: sort, merge overlapping/adjacent
+            group.sort(key=lambda sp: sp["start"])
+            cur = None
+            for sp in group:
+                if cur is not None and sp["start"] <= cur["end"]:
+                    cur["end"] = max(cur["end"], sp["end"])
+                    cur["rel"] += sp["rel"]
+                    cur["rank"] = min(cur["rank"], sp["rank"])
+                    cur["chunks"] += 1
+                else:
+                    cur = dict(sp)
+                    merged.append(cur)
+        else:                 # plain dicts: stitch chunks whose text overlaps (merely adjacent ones stay apart)
+            pending = [dict(sp) for sp in group]
+            while pending:
+                cur = pending.pop(0)
+                joined = True
+                while joined:
+                    joined = False
+                    for other in pending:
+                        text = _join_overlap(cur["text"], other["text"]) or _join_overlap(other["text"], cur["text"])
+                        if text is not None:
+                            cur.update(text=text, rel=cur["rel"] + other["rel"], rank=min(cur["rank"], other["rank"]),
+                                       chunks=cur["chunks"] + other["chunks"])
+                            pending.remove(other)
+                            joined = True
+                            break
+                merged.append(cur)
+    for sp in merged:
+        if "store" in sp:
+            sp["text"] = str(sp.pop("store").blob[sp["start"]:sp["end"]], "utf-8")
+        sp["text"] = _clean(sp["text"])
+    return merged
+
+
+def pack_context(results: List, budget: int = 1200, text_field: str = "content",
+                 count_tokens: Callable[[str], int] = estimate_tokens, dup_threshold: float = 0.9,
+                 naive_limit: int = 2000) -> Tuple[str, Dict[str, Any]]:
+    """Build the prompt context from ranked `results` within `budget` tokens.
+
+    -> (context, stats). Spans appear in order of their best-ranked chunk, in the
+    same "[FILE: name]" format as before. stats["tokens_saved"] is measured
+    against joining the same results one by one, each cut to `naive_limit` chars.
+    """
+    naive = SEPARATOR.join(f"[FILE: {r.get('filename', '')}]\n{_clean(r.get(text_field, ''))[:naive_limit]}"
+                           for r in results)
+    spans = _merge(_spans(results, text_field))
+
+    # near-duplicates (copied READMEs, vendored files): keep the more relevant one
+    spans.sort(key=lambda sp: -sp["rel"])
+    kept, dupes = [], 0
+    for sp in spans:
+        sp["shingles"] = _shingles(sp["text"])
+        if any(len(sp["shingles"] & k["shingles"]) / max(1, len(sp["shingles"] | k["shingles"])) >= dup_threshold
+               for k in kept):
+            dupes += 1
+            continue
+        kept.append(sp)
+
+    # greedy knapsack by relevance per token; the best span is cut to fit rather than dropped
+    sep = count_tokens(SEPARATOR)
+    for sp in kept:
+        sp["block"] = f"[FILE: {sp['filename']}]\n{sp['text']}"
+        sp["tokens"] = count_tokens(sp["block"]) + sep
+    packed, used = [], 0
+    for sp in sorted(kept, key=lambda sp: -sp["rel"] / sp["tokens"]):
+        if used + sp["tokens"] <= budget:
+            packed.append(sp)
+            used += sp["tokens"]
+    if not packed and kept:
+        best = kept[0]
+        chars = max(0, len(best["block"]) * budget // best["tokens"])
+        best["block"], best["tokens"] = best["block"][:chars], min(best["tokens"], budget)
+        packed, used = [best], best["tokens"]
+    packed.sort(key=lambda sp: sp["rank"])
+
+    context = SEPARATOR.join(sp["block"] for sp in packed) if packed else "(no results)"
+    naive_tokens, tokens = count_tokens(naive), count_tokens(context)
+    stats = {"chunks": len(results), "spans": len(spans), "duplicates": dupes, "packed": len(packed),
+             "tokens": tokens, "naive_tokens": naive_tokens, "tokens_saved": naive_tokens - tokens,
+             "files": [sp["filename"] for sp in packed]}
+    return context, stats
@@ -0,0 +1,304 @@
+# -----------------------------------------------------------
+# DermaScan core: repo indexes (background builds), hybrid retrieval,
+# context packing, streamed Gemini answers and the interaction log — no UI;
+# served by service.py
+# -----------------------------------------------------------
+import os, re, time, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from repo_index import FRESH_FOR, SearchIndex, load_repo_index, load_repo_vectors
+from index_manager import IndexManager
+from embedding_store import VectorIndex
+from hybrid import HybridRetriever
+from query_cache import QueryCache, normalize_question, index_version
+from llm_cache import LLMCache
+from answer_stream import TimedStream, gemini_pieces, fake_pieces, open_stream
+from model_router import ModelRouter
+from context_pack import pack_context
+from interaction_log import InteractionLog
+from tracing import REGISTRY, collect, current, record, span
+
+# Gemini optional
+try:
+    import google.generativeai as genai
+except Exception:
+    genai = None
+
+# ===================== CONFIG =====================
+TEXT_EXTS  = (".md", ".mdx", ".txt", ".java", ".kt", ".xml", ".py", ".rst")
+WINDOW     = 1000
+STRIDE     = 500
+ENGINE     = "bm25"               # lexical ranking: "bm25" or "tfidf" (minsearch scoring)
+CHUNKING   = "code"               # "code": source files split on class/function/element boundaries; "window"
+SYMBOL_BOOST = 1.5                # weight of a chunk's defined symbols (class/function/element names) in ranking
+DEDUP      = 0.8                  # near-duplicate chunks (Jaccard >= this) are indexed once; 0 keeps every chunk
+EMBED_MODEL = "all-MiniLM-L6-v2"  # CPU sentence-transformers model for the vector index
+EMBED_DTYPE = "float16"           # on-disk embedding precision: "float16" or "int8"
+FUSION     = "rrf"                # hybrid fusion: "rrf" (reciprocal rank) or "score" (min-max normalised)
+CACHE_DIR  = ".dermascan_cache"   # per-repo files + manifest + saved index, LLM cache, interaction log
+LLM_CACHE_TTL = 7 * 24 * 3600     # seconds a cached answer stays valid
+INDEX_MEM_CAP = 512 << 20         # bytes of loaded indexes kept across repos (LRU beyond that)
+QUERY_CACHE_SIZE = 512            # in-process search results + answers (LRU)
+QUERY_CACHE_TTL  = 3600           # seconds
+CONTEXT_BUDGET = 1500             # prompt tokens for repo context (overlapping chunks are merged first)
+MODEL_TRY  = [
+    "gemini-2.5-flash",
+    "gemini-pro-latest",
+    "gemini-2.0-flash",
+]                                 # preferred order; reordered at runtime by observed latency/errors
+MODEL_DEADLINE = 20.0             # seconds to the first token before the next model is tried
+HEDGE      = True                 # also start the next model once one runs past its p95
+
+ANSWER_PROMPT = (
+    "Answer ONLY from the provided repo context. "
+    "Cite filenames inline. If not found, reply: 'Not found in repo.'"
+    "\n\n# Context\n{context}\n\n# Q\n{question}"
+)
+# ==================================================
+
+
+def sanitize_md(s: str, limit: int = 1200) -> str:
+    s = (s or "").strip()
+    s = re.sub(r"\n{3,}", "\n\n", s)
+    if len(s) > limit:
+        s = s[:limit] + "..."
+    return s
+
+
+class IndexNotReady(RuntimeError):
+    """The repo's first index build has not finished (or failed); `status` says which."""
+
+    def __init__(self, status: Dict[str, Any]):
+        super().__init__(status.get("error") or "index is building")
+        self.status = status
+
+
+class DermaScanCore:
+    """Everything a frontend needs, shared by all requests of the process.
+
+    One IndexManager (indexes build in the background and are hot-swapped),
+    one query cache, one LLM cache, one model router and one interaction log
+    (every answer is queued there once streamed). Methods are blocking
+    and thread-safe; the HTTP service runs them on a thread pool.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, fake_llm: bool = False,
+                 fake_first_token_s: float = 0.4, fake_per_token_s: float = 0.02):
+        self.cache_dir = cache_dir
+        self.fake_llm, self.fake_first_token_s, self.fake_per_token_s = fake_llm, fake_first_token_s, fake_per_token_s
+        os.makedirs(cache_dir, exist_ok=True)
+        self.query_cache = QueryCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+        self.llm_cache = LLMCache(os.path.join(cache_dir, "llm_cache.sqlite"), ttl=LLM_CACHE_TTL)
+        self.log = InteractionLog(os.path.join(cache_dir, "interactions.sqlite"))
+        self.indexes = IndexManager(self._build, mem_cap=INDEX_MEM_CAP, on_swap=self._forget, on_evict=self._forget)
+        self.routers: Dict[str, ModelRouter] = {}
+        self.build_timings: Dict[tuple, Dict[str, float]] = {}   # stage -> ms of each repo's last build
+        self.lock = threading.Lock()
+
+    # ---------------- Ingestion ----------------
+    @staticmethod
+    def repo_key(owner: str, name: str) -> tuple:
+        return (owner, name, TEXT_EXTS, WINDOW, STRIDE)
+
+    def _build(self, key: tuple, progress, force: bool) -> Tuple[str, Tuple[SearchIndex, Optional[VectorIndex]]]:
+        """Download GitHub repo as ZIP, extract text files, chunk, and build lexical + vector indexes.
+
+        Runs on the index manager's worker thread. The built index is saved under cache_dir keyed by
+        repo + commit + chunk params, so a restart memory-maps it instead of re-downloading,
+        re-chunking and re-fitting; `force` re-checks the repo's commit even if it was checked recently.
+        """
+        owner, name, exts, window, stride = key
+        with collect() as trace:
+            index = load_repo_index(owner, name, exts, window, stride, cache_dir=self.cache_dir, engine=ENGINE,
+                                    chunking=CHUNKING, dedup=DEDUP, fresh_for=0 if force else FRESH_FOR,
+                                    on_stage=progress)
+            try:
+                # embeddings are cached per chunk content, so only new or edited chunks are encoded
+                progress("embedding chunks")
+                vindex = load_repo_vectors(owner, name, index, cache_dir=self.cache_dir, model_name=EMBED_MODEL,
+                                           dtype=EMBED_DTYPE,
+                                           on_batch=lambda done, total: progress("embedding chunks", done, total))
+            except ImportError:
+                vindex = None   # sentence-transformers not installed
+        self.build_timings[key] = trace.timings()
+        return index_version(index), (index, vindex)
+
+    def _forget(self, key: tuple, live: Optional[Dict] = None) -> None:
+        # answers computed against an older build (or an evicted repo) are stale now
+        repo, version = f"{key[0]}/{key[1]}", live["version"] if live else None
+        self.query_cache.invalidate(lambda k: k[2] == repo and k[3] != version)
+
+    def status(self, owner: str, name: str) -> Dict[str, Any]:
+        """Index state for the repo; starts its first build if there is none yet."""
+        key = self.repo_key(owner, name)
+        live = self.indexes.get(key)
+        status = self.indexes.status(key)
+        if live is not None:
+            index, vindex = live["payload"]
+            status.update(chunks=len(index.docs), vector=vindex is not None)
+        status["timings"] = self.build_timings.get(key, {})
+        return status
+
+    def live(self, owner: str, name: str) -> Tuple[str, SearchIndex, Optional[VectorIndex]]:
+        key = self.repo_key(owner, name)
+        live = self.indexes.get(key)
+        if live is None:
+            raise IndexNotReady(self.indexes.status(key))
+        index, vindex = live["payload"]
+        return live["version"], index, vindex
+
+    def refresh(self, owner: str, name: str) -> bool:
+        return self.indexes.request(self.repo_key(owner, name), force=True)
+
+    # --------------- Retrieval -----------------
+    def search(self, owner: str, name: str, q: str, topk: int = 5) -> List:
+        """Hybrid top-k chunks (ChunkStore views) for the repo's live index."""
+        _, index, vindex = self.live(owner, name)
+        return self._search(q, f"{owner}/{name}", index, vindex, topk)[1]
+
+    def _search(self, q: str, repo: str, index: SearchIndex, vindex: Optional[VectorIndex], topk: int):
+        # key: (kind, normalized question, repo, index version, topk, retrieval setup)
+        key = (normalize_question(q), repo, index_version(index), topk, vindex is not None, FUSION)
+        def retrieve():
+            # lexical and vector legs run concurrently and are fused per chunk
+            with span("search.retrieve"):
+                retriever = HybridRetriever(index, vindex, fusion=FUSION, boost_dict={"symbols": SYMBOL_BOOST})
+                return retriever.search(q, num_results=max(1, topk))
+        with span("search"):
+            results = self.query_cache.cached(("search",) + key, retrieve)
+        return key, results
+
+    # --------------- Answering -----------------
+    def router(self, api_key: str) -> ModelRouter:
+        # configured once per key; model objects and per-model latency/error stats live for the process
+        with self.lock:
+            if api_key not in self.routers:
+                genai.configure(api_key=api_key)
+                self.routers[api_key] = ModelRouter(MODEL_TRY, factory=genai.GenerativeModel,
+                                                    deadline=MODEL_DEADLINE, hedge=HEDGE)
+            return self.routers[api_key]
+
+    def _llm_stream(self, question: str, context: str) -> Tuple[Optional[TimedStream], Optional[str]]:
+        if self.fake_llm:   # local stand-in: streams the top of the context, nothing is stored
+            with span("llm.first_token"):
+                return open_stream(fake_pieces(f"(fake model) {sanitize_md(context, limit=400)}",
+                                               self.fake_first_token_s, self.fake_per_token_s)), "fake"
+
+        # Same question over the same context -> replay the stored answer, no model call
+        cache = self.llm_cache
+        inputs = {"question": question, "context": context}
+        with span("llm.cache"):
+            for model_name in MODEL_TRY:
+                hit = cache.get(cache.key(model_name, ANSWER_PROMPT, inputs))
+                if hit:
+                    return TimedStream([hit]), model_name
+
+        if genai is None: return None, None
+        key = os.environ.get("GEMINI_API_KEY", "").strip()
+        if not key: return None, None
+        try:
+            router = self.router(key)
+        except Exception:
+            return None, None
+
+        prompt = ANSWER_PROMPT.format(context=context, question=question)
+
+        def store(model_name: str):
+            # only a fully streamed answer is cached; an interrupted one never calls this
+            def put(text: str):
+                if text.strip():
+                    cache.put(cache.key(model_name, ANSWER_PROMPT, inputs), text.strip(), model=model_name)
+            return put
+
+        def first_token(model, model_name: str):
+            # the router's deadline and hedging cover the wait for the first token
+            start = time.perf_counter()
+            return open_stream(gemini_pieces(model, prompt, request_options={"timeout": MODEL_DEADLINE}),
+                               start=start, on_done=store(model_name))
+
+        with span("llm.first_token"):
+            return router.call(first_token, discard=TimedStream.drain)
+
+    def answer_stream(self, owner: str, name: str, q: str,
+                      topk: int = 5) -> Tuple[TimedStream, List[str], List[Any], str]:
+        """-> (answer stream, source files, results, label); the stream's .text is the answer once drained.
+
+        Stage timings (search, context packing, model) end up in stream.meta["spans"] and the log entry.
+        """
+        with collect(), span("answer.prepare"):
+            return self._answer_stream(owner, name, q, topk)
+
+    def _answer_stream(self, owner: str, name: str, q: str, topk: int):
+        _, index, vindex = self.live(owner, name)
+        repo = f"{owner}/{name}"
+        key, results = self._search(q, repo, index, vindex, topk)
+        hit = self.query_cache.get(("answer",) + key)
+        if hit is not None:
+            ans, used_files, results, label, model_used, context = hit
+            return self._logged(TimedStream([ans]), repo, q, model_used, context, results, cached=True), \
+                used_files, results, label
+        if not results:
+            return self._logged(TimedStream(["Not found in repo."]), repo, q, ""), [], [], "No results"
+
+        # overlapping windows are merged back into spans and packed within the token budget
+        with span("context.pack"):
+            context, packing = pack_context(results[:topk], budget=CONTEXT_BUDGET)
+        used_files = packing["files"]
+        stream, model_used = self._llm_stream(q, context)
+        if stream:
+            stream.meta["context"] = packing
+            label = "Fake LLM" if model_used == "fake" else f"Gemini ({model_used})"
+            inner, trace = stream.on_done, current()
+            def done(text: str):
+                if inner: inner(text)
+                if trace is not None and stream.ttft is not None:
+                    with collect(trace):
+                        record("llm.stream", stream.total - stream.ttft)
+                # fallbacks are not cached, so a later LLM answer can replace them
+                self.query_cache.put(("answer",) + key, (text, used_files, results, label, model_used, context))
+            stream.on_done = done
+            return self._logged(stream, repo, q, model_used, context, results[:topk]), used_files, results, label
+
+        # Fallback to lexical: show the best snippet
+        best = results[0]
+        snippet = sanitize_md(best.get("content",""), limit=800)
+        fallback = TimedStream([f"From `{best.get('filename','')}`:\n\n{snippet}\n\n*(LLM unavailable — lexical fallback)*"])
+        return self._logged(fallback, repo, q, "lexical", context, results[:topk]), used_files, results, "Lexical"
+
+    def _logged(self, stream: TimedStream, repo: str, q: str, model: str, context: str = "",
+                results: List[Any] = (), **meta) -> TimedStream:
+        # queued once the stream is drained, with its timings; an interrupted stream is not logged
+        inner, trace = stream.on_done, current()
+        sources = [{k: v for k, v in dict(r).items() if not k.startswith("_")} for r in results]
+        def done(text: str):
+            if inner: inner(text)
+            stream.meta["spans"] = trace.timings() if trace is not None else {}
+            self.log.log(q, text, model=model, system_prompt=ANSWER_PROMPT, context=context, results=sources,
+                         provider="gemini" if model.startswith("gemini") else "local", repo=repo,
+                         spans=stream.meta["spans"], **stream.timings(), **meta)
+        stream.on_done = done
+        return stream
+
+    def answer(self, owner: str, name: str, q: str, topk: int = 5):
+        # blocking form: drains the stream
+        stream, used_files, results, model_used = self.answer_stream(owner, name, q, topk)
+        return "".join(stream), used_files, results, model_used
+
+    def recent_logs(self, n: int = 10, **filters) -> List[Dict[str, Any]]:
+        self.log.flush()   # include answers still waiting in the queue
+        return self.log.recent(n, **filters)
+
+    def interaction(self, uid: str) -> Optional[Dict[str, Any]]:
+        self.log.flush()
+        return self.log.entry(uid)
+
+    def stats(self) -> Dict[str, Any]:
+        models = []
+        key = os.environ.get("GEMINI_API_KEY", "").strip()
+        if key and key in self.routers:
+            models = self.routers[key].snapshot()
+        return {"llm_cache": self.llm_cache.stats(), "query_cache": self.query_cache.stats(), "models": models,
+                "log": self.log.stats(), "tracing": REGISTRY.snapshot(),
+                "loaded": [{"repo": f"{e['key'][0]}/{e['key'][1]}", **{k: v for k, v in e.items() if k != "key"}}
+                           for e in self.indexes.loaded()],
+                "llm": "fake" if self.fake_llm else ("gemini" if genai is not None and key else "none")}
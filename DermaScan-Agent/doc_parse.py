@@ -0,0 +1,89 @@
+# -----------------------------------------------------------
+# Markdown frontmatter: only the document head is scanned for the `---`
+# block, parsed metadata is cached by the block's hash (docs generated from
+# one template share it), and YAML goes through libyaml's CSafeLoader when
+# PyYAML was built with it
+# -----------------------------------------------------------
+import re, hashlib, threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import yaml   # optional: without it metadata is {} and the body is still split off
+    YAML_LOADER = getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader
+except ImportError:
+    yaml = YAML_LOADER = None
+
+MAX_HEAD   = 64 * 1024   # characters searched for the closing `---`; a longer block is not frontmatter
+CACHE_SIZE = 8192        # parsed frontmatter blocks kept (LRU)
+
+_FENCE = re.compile(r"^---\s*$", re.MULTILINE)
+
+
+class FrontmatterError(ValueError):
+    """The `---` block is there but is not valid YAML (raised with strict=True)."""
+
+
+def split_frontmatter(text: str) -> Tuple[Optional[str], str]:
+    """-> (raw YAML block or None, body). The first line must be `---`; the block
+    ends at the next `---` line within MAX_HEAD characters. Nothing past that is read."""
+    if not text.startswith("---"):
+        return None, text
+    nl = text.find("\n")
+    if nl < 0 or text[3:nl].strip():
+        return None, text
+    end = _FENCE.search(text, nl + 1, min(len(text), MAX_HEAD))
+    if end is None or (end.end() < len(text) and text[end.end()] != "\n"):   # cut off by the head limit
+        return None, text
+    return text[nl + 1:end.start()].strip(), text[end.end():].lstrip("\n")
+
+
+class _MetaCache:
+    """Thread-safe LRU: digest of the raw block -> parsed metadata (or the YAML error)."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[bytes, object]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def parse(self, raw: str):
+        key = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+        with self.lock:
+            hit = self.entries.get(key)
+            if hit is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return hit
+            self.misses += 1
+        try:
+            meta = yaml.load(raw, Loader=YAML_LOADER) if raw else {}
+            value = meta if isinstance(meta, dict) else {}
+        except yaml.YAMLError as e:
+            value = FrontmatterError(str(e))
+        with self.lock:
+            self.entries[key] = value
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+CACHE = _MetaCache()
+
+
+def parse_frontmatter(text: str, strict: bool = False) -> Tuple[Dict, str]:
+    """-> (metadata, body). No frontmatter: ({}, text). Invalid YAML: ({}, body), or
+    FrontmatterError with strict=True. The returned dict is a fresh shallow copy."""
+    raw, body = split_frontmatter(text)
+    if raw is None or yaml is None:
+        return {}, body
+    meta = CACHE.parse(raw)
+    if isinstance(meta, FrontmatterError):
+        if strict:
+            raise FrontmatterError(str(meta))
+        return {}, body
+    return dict(meta), body
@@ -0,0 +1,321 @@
+# -----------------------------------------------------------
+# Embedding store: per-chunk content-hash cache, batched CPU encoding,
+# float16/int8 memory-mapped vectors, IVF approximate nearest neighbours
+# -----------------------------------------------------------
+import os, json, hashlib, threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl   # advisory lock so several processes can share one store directory
+except ImportError:
+    fcntl = None
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+STORE_VERSION = 1
+DTYPES = ("float16", "int8")
+
+# encoder(texts) -> float32 array (len(texts), dim), rows L2-normalised
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+_ENCODERS: Dict[tuple, Encoder] = {}
+_STORES: Dict[tuple, "EmbeddingStore"] = {}
+_shared_lock = threading.Lock()
+
+
+def sentence_encoder(model_name: str = DEFAULT_MODEL, batch_size: int = 64) -> Encoder:
+    """SentenceTransformer on CPU, imported and loaded on first use. One encoder (and
+    one loaded model) per (model, batch size) per process, whichever repo asks."""
+    with _shared_lock:
+        enc = _ENCODERS.get((model_name, batch_size))
+        if enc is not None:
+            return enc
+        model, load_lock = None, threading.Lock()
+
+        def encode(texts: List[str]) -> np.ndarray:
+            nonlocal model
+            with load_lock:
+                if model is None:
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(model_name, device="cpu")
+            return np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True,
+                                           convert_to_numpy=True), np.float32)
+        enc = _ENCODERS[(model_name, batch_size)] = encode
+        return enc
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """Content-addressed vectors: sha1(text) -> row of an append-only quantized matrix.
+
+    One directory per model: meta.json (count is the commit point), hashes.bin
+    (20 bytes per row), vectors.bin (float16 or int8) and, for int8, scales.bin
+    (one float32 per row). Only texts whose hash is not stored yet are encoded,
+    `batch_size` at a time, so editing one chunk re-encodes one chunk.
+
+    Appends hold the instance lock plus an flock on `<path>/lock`, and first pick
+    up rows committed by other instances or processes. Use open_store() to share
+    one instance per directory.
+    """
+
+    def __init__(self, path: str, model_name: str = DEFAULT_MODEL, dtype: str = "float16",
+                 batch_size: int = 64, encoder: Optional[Encoder] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.path, self.model_name, self.batch_size = path, model_name, batch_size
+        self.encoder = encoder or sentence_encoder(model_name, batch_size)
+        os.makedirs(path, exist_ok=True)
+        self.lock = threading.RLock()
+        self.meta = {"version": STORE_VERSION, "model": model_name, "dtype": dtype, "dim": 0, "count": 0}
+        with self._locked():
+            self._load_meta()
+            self._truncate()   # drop rows appended after the last committed count
+            self._map()
+
+    @property
+    def dtype(self) -> str:
+        return self.meta["dtype"]
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _locked(self):
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._file("lock"), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_meta(self) -> None:
+        meta_path = self._file("meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if loaded.get("version") == STORE_VERSION and loaded.get("model") == self.model_name \
+                    and loaded.get("dtype") == self.dtype:
+                self.meta = loaded
+
+    def _truncate(self) -> None:
+        n, dim = self.meta["count"], self.meta["dim"]
+        for name, size in (("hashes.bin", 20 * n), ("vectors.bin", n * dim * np.dtype(self.dtype).itemsize),
+                           ("scales.bin", 4 * n if self.dtype == "int8" else 0)):
+            p = self._file(name)
+            if os.path.exists(p) and os.path.getsize(p) != size:
+                with open(p, "r+b") as f:
+                    f.truncate(size)
+
+    def _map(self) -> None:
+        n, dim = len(self), self.dim
+        self.rows: Dict[bytes, int] = {}
+        self.vectors = self.scales = None
+        if not n:
+            return
+        with open(self._file("hashes.bin"), "rb") as f:
+            raw = f.read(20 * n)
+        self.rows = {raw[i * 20:(i + 1) * 20]: i for i in range(n)}
+        self.vectors = np.memmap(self._file("vectors.bin"), dtype=self.dtype, mode="r", shape=(n, dim))
+        if self.dtype == "int8":
+            self.scales = np.memmap(self._file("scales.bin"), dtype=np.float32, mode="r", shape=(n,))
+
+    def _quantize(self, E: np.ndarray):
+        if self.dtype == "float16":
+            return E.astype(np.float16), None
+        scale = np.maximum(np.abs(E).max(axis=1), 1e-12) / 127.0
+        return np.round(E / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+    def _append(self, hashes: List[bytes], E: np.ndarray) -> None:
+        if not self.dim:
+            self.meta["dim"] = int(E.shape[1])
+        elif E.shape[1] != self.dim:
+            raise ValueError(f"encoder returned dim {E.shape[1]}, store has {self.dim}")
+        q, scale = self._quantize(E)
+        with open(self._file("hashes.bin"), "ab") as f:
+            f.write(b"".join(hashes))
+        with open(self._file("vectors.bin"), "ab") as f:
+            f.write(q.tobytes())
+        if scale is not None:
+            with open(self._file("scales.bin"), "ab") as f:
+                f.write(scale.tobytes())
+        self.meta["count"] += len(hashes)
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    def rows_for(self, texts: Iterable[str], on_batch: Optional[Callable[[int, int], None]] = None) -> np.ndarray:
+        """Row id per text, encoding (in batches) only texts not stored yet.
+
+        Runs under the store lock, so concurrent builds encode one at a time and
+        a text two builds both need is encoded once."""
+        texts = list(texts)
+        hashes = [text_hash(t) for t in texts]
+        with self._locked():
+            count = self.meta["count"]
+            self._load_meta()
+            if self.meta["count"] != count:   # another instance or process appended
+                self._map()
+            missing: Dict[bytes, str] = {}
+            for h, t in zip(hashes, texts):
+                if h not in self.rows and h not in missing:
+                    missing[h] = t
+            todo = list(missing.items())
+            for i in range(0, len(todo), self.batch_size):
+                batch = todo[i:i + self.batch_size]
+                E = np.asarray(self.encoder([t for _, t in batch]), np.float32)
+                self._append([h for h, _ in batch], E)
+                if on_batch:
+                    on_batch(min(i + self.batch_size, len(todo)), len(todo))
+            if todo:
+                self._map()
+            rows = self.rows
+        return np.array([rows[h] for h in hashes], np.int64)
+
+    def decode(self, rows) -> np.ndarray:
+        """float32 vectors for the given row ids."""
+        v = np.asarray(self.vectors[rows], np.float32)
+        if self.scales is not None:
+            v *= np.asarray(self.scales[rows])[:, None]
+        return v
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Queries are encoded fresh and not stored."""
+        return np.asarray(self.encoder([text]), np.float32)[0]
+
+
+def open_store(path: str, model_name: str = DEFAULT_MODEL, dtype: str = "float16", batch_size: int = 64,
+               encoder: Optional[Encoder] = None) -> EmbeddingStore:
+    """The process-wide EmbeddingStore for `path` (one per explicit encoder, e.g. in benchmarks)."""
+    key = (os.path.realpath(path), model_name, dtype, encoder)
+    with _shared_lock:
+        store = _STORES.get(key)
+    if store is None:
+        store = EmbeddingStore(path, model_name, dtype=dtype, batch_size=batch_size, encoder=encoder)
+        with _shared_lock:
+            store = _STORES.setdefault(key, store)
+    return store
+
+
+class StoreRows:
+    """A subset of store rows (e.g. one repo's chunks) addressed 0..n-1."""
+
+    def __init__(self, store: EmbeddingStore, rows: np.ndarray):
+        self.store, self.rows = store, rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def take(self, ids) -> np.ndarray:
+        return self.store.decode(self.rows[ids])
+
+
+def _take(vectors, ids) -> np.ndarray:
+    return vectors.take(ids) if isinstance(vectors, StoreRows) else np.asarray(vectors[ids], np.float32)
+
+
+class IVFIndex:
+    """Inverted-file ANN: k-means centroids; a query scans only its `nprobe` closest lists.
+
+    Below `min_size` vectors it keeps no lists and searches exactly.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids, self.order, self.offsets = centroids, order, offsets
+
+    @classmethod
+    def build(cls, vectors, nlist: Optional[int] = None, iters: int = 10, min_size: int = 2000,
+              seed: int = 0) -> "IVFIndex":
+        n = len(vectors)
+        if n < min_size:
+            return cls(np.zeros((0, 0), np.float32), np.zeros(0, np.int64), np.zeros(1, np.int64))
+        X = _take(vectors, np.arange(n))
+        nlist = nlist or int(np.sqrt(n))
+        rng = np.random.default_rng(seed)
+        train = X[rng.choice(n, min(n, 64 * nlist), replace=False)]
+        C = train[rng.choice(len(train), nlist, replace=False)].copy()
+        for _ in range(iters):   # spherical k-means
+            assign = np.argmax(train @ C.T, axis=1)
+            for j in range(nlist):
+                members = train[assign == j]
+                if len(members):
+                    c = members.sum(axis=0)
+                    C[j] = c / max(np.linalg.norm(c), 1e-12)
+        assign = np.concatenate([np.argmax(X[i:i + 65536] @ C.T, axis=1) for i in range(0, n, 65536)])
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return cls(C.astype(np.float32), order.astype(np.int64), offsets.astype(np.int64))
+
+    def candidates(self, q: np.ndarray, n: int, nprobe: int) -> np.ndarray:
+        if not len(self.centroids):
+            return np.arange(n)
+        lists = np.argsort(-(self.centroids @ q))[:nprobe]
+        return np.concatenate([self.order[self.offsets[j]:self.offsets[j + 1]] for j in lists])
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in ("centroids", "order", "offsets"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        return cls(*(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                     for name in ("centroids", "order", "offsets")))
+
+
+class VectorIndex:
+    """Drop-in for minsearch.VectorSearch (fit / search) backed by IVF.
+
+    `vectors` may be a float array or StoreRows over an EmbeddingStore, in which
+    case only the probed rows are read from the memory-mapped matrix.
+    """
+
+    def __init__(self, keyword_fields: Optional[List[str]] = None, nprobe: int = 8,
+                 encode_query: Optional[Callable[[str], np.ndarray]] = None):
+        self.keyword_fields = keyword_fields or []
+        self.nprobe = nprobe
+        self.encode_query = encode_query   # text -> query vector, used by hybrid retrieval
+        self.vectors, self.docs, self.ivf = None, [], None
+
+    def fit(self, vectors, payload: List, ivf: Optional[IVFIndex] = None) -> "VectorIndex":
+        if len(vectors) != len(payload):
+            raise ValueError("vectors and payload differ in length")
+        self.vectors, self.docs = vectors, payload
+        self.ivf = ivf or IVFIndex.build(vectors)
+        return self
+
+    def search(self, query_vector, filter_dict: Optional[Dict] = None, num_results: int = 10,
+               output_ids: bool = False) -> List:
+        if not len(self.docs):
+            return []
+        q = np.asarray(query_vector, np.float32).ravel()
+        q /= max(np.linalg.norm(q), 1e-12)
+        if filter_dict:   # exact search over the docs that pass the filter
+            ids = np.array([i for i, d in enumerate(self.docs)
+                            if all(d.get(f) == v for f, v in filter_dict.items())], np.int64)
+        else:
+            ids = self.ivf.candidates(q, len(self.docs), self.nprobe)
+        if not len(ids):
+            return []
+        scores = _take(self.vectors, ids) @ q
+        top = np.argsort(-scores)[:num_results]
+        if output_ids:
+            return [{**self.docs[ids[i]], "_id": int(ids[i]), "_score": float(scores[i])} for i in top]
+        return [self.docs[ids[i]] for i in top]
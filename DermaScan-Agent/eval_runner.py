@@ -0,0 +1,229 @@
+# -----------------------------------------------------------
+# LLM-as-judge evaluation engine: asks and judgements run concurrently under
+# a shared rate limit, each result is written as soon as it arrives (keyed by
+# a hash of the judged log), reruns skip what is already stored, and per-check
+# pass rates are kept up to date while the run progresses
+# -----------------------------------------------------------
+import json, time, sqlite3, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ratelimit import TokenBucket, with_retries
+
+DEFAULT_PATH = "eval_results.sqlite"
+
+
+def log_hash(entry: Dict[str, Any]) -> str:
+    """Digest of what the judge sees; the same log logged twice is judged once."""
+    judged = {k: entry.get(k) for k in ("system_prompt", "messages", "model", "source")}
+    return hashlib.sha256(json.dumps(judged, sort_keys=True, ensure_ascii=False, default=str)
+                          .encode("utf-8")).hexdigest()
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(question.strip().encode("utf-8")).hexdigest()
+
+
+def parse_judgement(raw: Any) -> Dict[str, Any]:
+    """Judge output -> {"checklist": [...], "summary": ...}; tolerates code fences and preface text."""
+    if isinstance(raw, dict):
+        return raw
+    text = (raw or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        cleaned = text.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+        try:
+            return json.loads(cleaned)
+        except ValueError:
+            start, end = cleaned.find("{"), cleaned.rfind("}")
+            if start < 0 or end <= start:
+                raise
+            return json.loads(cleaned[start:end + 1])
+
+
+class EvalStore:
+    """Results table (SQLite): one row per (log hash, judge model) plus one row per
+    check, and the questions already asked. Safe to share across threads."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS results (
+            log_hash TEXT, judge TEXT, log_id TEXT, question TEXT, summary TEXT, raw TEXT, created REAL,
+            PRIMARY KEY (log_hash, judge))""")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS checks (
+            log_hash TEXT, judge TEXT, check_name TEXT, check_pass INTEGER, justification TEXT,
+            PRIMARY KEY (log_hash, judge, check_name))""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS checks_name ON checks(judge, check_name)")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS asks (
+            question_hash TEXT PRIMARY KEY, question TEXT, log_id TEXT, created REAL)""")
+
+    # ---------------- asks ----------------
+    def asked(self) -> Dict[str, str]:
+        with self.lock:
+            return dict(self.db.execute("SELECT question_hash, log_id FROM asks").fetchall())
+
+    def put_ask(self, question: str, log_id: str) -> None:
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO asks VALUES (?,?,?,?)",
+                            (question_hash(question), question, log_id, time.time()))
+
+    # ---------------- judgements ----------------
+    def judged(self, judge: str) -> set:
+        with self.lock:
+            return {r[0] for r in self.db.execute("SELECT log_hash FROM results WHERE judge=?", (judge,))}
+
+    def put_result(self, h: str, judge: str, log_id: str, question: str, result: Dict[str, Any]) -> None:
+        checks = [(h, judge, c["check_name"], int(bool(c.get("check_pass"))), c.get("justification", ""))
+                  for c in result.get("checklist", []) if isinstance(c, dict) and "check_name" in c]
+        with self.lock:   # result and its checks land together or not at all
+            self.db.execute("BEGIN")
+            try:
+                self.db.execute("INSERT OR REPLACE INTO results VALUES (?,?,?,?,?,?,?)",
+                                (h, judge, log_id, question, result.get("summary", ""),
+                                 json.dumps(result, ensure_ascii=False), time.time()))
+                self.db.execute("DELETE FROM checks WHERE log_hash=? AND judge=?", (h, judge))
+                self.db.executemany("INSERT INTO checks VALUES (?,?,?,?,?)", checks)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def pass_rates(self, judge: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """check_name -> {"pass_rate", "n"} over everything stored (one judge, or all)."""
+        sql = "SELECT check_name, AVG(check_pass), COUNT(*) FROM checks"
+        args: Tuple = ()
+        if judge is not None:
+            sql, args = sql + " WHERE judge=?", (judge,)
+        with self.lock:
+            rows = self.db.execute(sql + " GROUP BY check_name ORDER BY check_name", args).fetchall()
+        return {name: {"pass_rate": rate, "n": n} for name, rate, n in rows}
+
+    def table(self, judge: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One dict per judged log: log_id, question, summary and a bool column per check."""
+        where, args = ("WHERE r.judge=?", (judge,)) if judge is not None else ("", ())
+        with self.lock:
+            rows = self.db.execute(f"""SELECT r.log_hash, r.judge, r.log_id, r.question, r.summary,
+                                              c.check_name, c.check_pass
+                                       FROM results r LEFT JOIN checks c
+                                         ON c.log_hash = r.log_hash AND c.judge = r.judge
+                                       {where} ORDER BY r.created""", args).fetchall()
+        out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for h, j, log_id, question, summary, name, passed in rows:
+            row = out.setdefault((h, j), {"log_id": log_id, "judge": j, "question": question, "summary": summary})
+            if name is not None:
+                row[name] = bool(passed)
+        return list(out.values())
+
+
+class EvalRunner:
+    """Runs `ask(question) -> log_id` and `judge(entry) -> raw judge output` on a
+    thread pool. Every call first takes a token from one shared bucket (`rps`),
+    rate-limit/5xx errors are retried with backoff, and each finished item is
+    written to the store right away, so an interrupted run resumes where it
+    stopped. `load(log_id) -> entry` reads a logged interaction.
+    """
+
+    def __init__(self, judge: Callable[[Dict[str, Any]], Any], load: Callable[[str], Optional[Dict[str, Any]]],
+                 store: EvalStore, ask: Optional[Callable[[str], str]] = None, judge_model: str = "",
+                 concurrency: int = 8, rps: float = 2.0, retries: int = 5,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.judge, self.load, self.ask, self.store = judge, load, ask, store
+        self.judge_model, self.concurrency, self.retries = judge_model, concurrency, retries
+        self.bucket = TokenBucket(rate=rps, capacity=max(1.0, rps))
+        self.on_progress = on_progress
+        self.counts: Dict[str, List[int]] = {}   # check_name -> [passed, total] for this run
+        self.stats = {"asked": 0, "judged": 0, "skipped": 0, "failed": 0}
+        self.done: set = set()   # log hashes judged (stored or in flight)
+        self.lock = threading.Lock()
+
+    def _call(self, fn: Callable, *args):
+        def call():
+            self.bucket.acquire()
+            return fn(*args)
+        return with_retries(call, attempts=self.retries)
+
+    def _ask(self, question: str) -> str:
+        log_id = self._call(self.ask, question)
+        self.store.put_ask(question, log_id)
+        with self.lock:
+            self.stats["asked"] += 1
+        return log_id
+
+    def _judge(self, log_id: str, entry: Dict[str, Any], h: str) -> Dict[str, Any]:
+        try:
+            result = parse_judgement(self._call(self.judge, entry))
+        except Exception:
+            with self.lock:
+                self.done.discard(h)   # not stored: a later run judges it again
+            raise
+        question = entry["messages"][0]["parts"][0]["content"]
+        self.store.put_result(h, self.judge_model, log_id, question, result)
+        with self.lock:
+            self.stats["judged"] += 1
+            for c in result.get("checklist", []):
+                if isinstance(c, dict) and "check_name" in c:
+                    passed, total = self.counts.setdefault(c["check_name"], [0, 0])
+                    self.counts[c["check_name"]] = [passed + bool(c.get("check_pass")), total + 1]
+        return result
+
+    def _ask_and_judge(self, question: str, log_id: Optional[str]) -> Dict[str, Any]:
+        log_id = log_id or self._ask(question)
+        entry = self.load(log_id)
+        if entry is None:
+            raise KeyError(f"no logged interaction {log_id}")
+        h = log_hash(entry)
+        with self.lock:
+            skip = h in self.done
+            self.done.add(h)
+            if skip:
+                self.stats["skipped"] += 1
+        return {} if skip else self._judge(log_id, entry, h)
+
+    def pass_rates(self) -> Dict[str, float]:
+        """Per-check pass rate over the judgements of this run so far."""
+        with self.lock:
+            return {name: passed / total for name, (passed, total) in sorted(self.counts.items()) if total}
+
+    def _drain(self, futures: Dict, label: Callable[[Any], str]) -> Dict[str, Any]:
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                with self.lock:
+                    self.stats["failed"] += 1
+                    self.stats["last_error"] = f"{label(futures[fut])}: {type(e).__name__}: {e}"
+            if self.on_progress:
+                self.on_progress({**self.stats, "pass_rates": self.pass_rates()})
+        return {**self.stats, "pass_rates": self.pass_rates()}
+
+    def run(self, questions: Iterable[str]) -> Dict[str, Any]:
+        """Ask every question not asked before, then judge its log; a question is judged
+        as soon as its answer is logged, so asks and judgements overlap."""
+        asked = self.store.asked()
+        self.done |= self.store.judged(self.judge_model)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._ask_and_judge, q, asked.get(question_hash(q))): q
+                       for q in dict.fromkeys(q.strip() for q in questions if q.strip())}
+            return self._drain(futures, label=lambda q: q[:60])
+
+    def judge_logs(self, log_ids: Iterable[str]) -> Dict[str, Any]:
+        """Judge already-logged interactions; logs whose hash is stored are skipped."""
+        self.done |= self.store.judged(self.judge_model)
+        todo = []
+        for log_id in log_ids:
+            entry = self.load(log_id)
+            if entry is None:
+                continue
+            h = log_hash(entry)
+            if h in self.done:
+                self.stats["skipped"] += 1
+                continue
+            self.done.add(h)
+            todo.append((log_id, entry, h))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._judge, *item): item[0] for item in todo}
+            return self._drain(futures, label=str)
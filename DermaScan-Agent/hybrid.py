@@ -0,0 +1,93 @@
+# -----------------------------------------------------------
+# Hybrid retrieval: lexical and vector legs run concurrently, over-fetch a
+# candidate pool, fuse (reciprocal rank or normalised score), dedupe per chunk
+# -----------------------------------------------------------
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+FUSIONS = ("rrf", "score")
+RRF_K = 60
+
+# shared by every retriever: two legs per query, a few queries in flight
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid")
+
+
+def chunk_key(doc) -> str:
+    """Identity of a chunk across indexes built over different doc lists."""
+    return doc.get("filename", "") + ":" + hashlib.sha1((doc.get("content") or doc.get("chunk") or "")
+                                                        .encode("utf-8")).hexdigest()
+
+
+def fuse(legs: List[List[Dict]], method: str = "rrf", weights: Optional[List[float]] = None,
+         key: Callable[[Dict], object] = lambda r: r["_id"], k: int = RRF_K) -> List[Dict]:
+    """Merge ranked legs (dicts with `_score`) into one list, best first, one entry per key.
+
+    rrf:   sum_w  w / (k + rank)
+    score: sum_w  w * min-max normalised score within the leg
+    """
+    if method not in FUSIONS:
+        raise ValueError(f"fusion must be one of {FUSIONS}")
+    weights = weights or [1.0] * len(legs)
+    fused: Dict[object, Dict] = {}
+    for leg, w in zip(legs, weights):
+        if not leg:
+            continue
+        if method == "score":
+            s = np.array([r["_score"] for r in leg], np.float64)
+            span = s.max() - s.min()
+            norm = (s - s.min()) / span if span > 0 else np.ones_like(s)
+        for rank, r in enumerate(leg):
+            gain = w / (k + rank + 1) if method == "rrf" else w * norm[rank]
+            entry = fused.setdefault(key(r), {"doc": r, "score": 0.0, "legs": 0})
+            entry["score"] += gain
+            entry["legs"] += 1
+    ranked = sorted(fused.values(), key=lambda e: -e["score"])
+    return [{**e["doc"], "_score": e["score"], "_legs": e["legs"]} for e in ranked]
+
+
+class HybridRetriever:
+    """Lexical + vector search over the same chunks.
+
+    Each leg over-fetches `pool` candidates (at least 4x what is asked for);
+    both run on a shared thread pool, so latency is about max(lexical, vector)
+    rather than the sum (BM25 and the vector dot products release the GIL in
+    numpy; query encoding does in torch). Without a vector index it is plain
+    lexical search.
+    """
+
+    def __init__(self, lexical, vector=None, encode_query: Optional[Callable[[str], np.ndarray]] = None,
+                 fusion: str = "rrf", weights: Optional[List[float]] = None, pool: int = 50,
+                 boost_dict: Optional[Dict] = None, key: Optional[Callable[[Dict], object]] = None):
+        if fusion not in FUSIONS:
+            raise ValueError(f"fusion must be one of {FUSIONS}")
+        self.lexical, self.vector = lexical, vector
+        self.encode_query = encode_query or getattr(vector, "encode_query", None)
+        self.fusion, self.weights, self.pool = fusion, weights or [1.0, 1.0], pool
+        self.boost_dict = boost_dict
+        # same doc list on both sides -> positions identify chunks; otherwise hash filename + text
+        self.shared = vector is None or getattr(lexical, "docs", None) is getattr(vector, "docs", None)
+        self.key = key or ((lambda r: r["_id"]) if self.shared else chunk_key)
+
+    def _lexical(self, query: str, n: int) -> List[Dict]:
+        return self.lexical.search(query, boost_dict=self.boost_dict, num_results=n, output_ids=True)
+
+    def _vector(self, query: str, n: int) -> List[Dict]:
+        return self.vector.search(self.encode_query(query), num_results=n, output_ids=True)
+
+    def search(self, query: str, num_results: int = 10, output_ids: bool = False) -> List:
+        n = max(self.pool, 4 * num_results)
+        if self.vector is None or self.encode_query is None:
+            legs = [self._lexical(query, n)]
+        else:
+            vec = _POOL.submit(self._vector, query, n)
+            lex = self._lexical(query, n)   # this thread runs the lexical leg meanwhile
+            legs = [lex, vec.result()]
+        results = fuse(legs, self.fusion, self.weights, key=self.key)[:num_results]
+        if output_ids:
+            return results
+        if self.shared:
+            return [self.lexical.docs[r["_id"]] for r in results]
+        return [{k: v for k, v in r.items() if not k.startswith("_")} for r in results]
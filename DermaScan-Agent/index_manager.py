@@ -0,0 +1,186 @@
+# -----------------------------------------------------------
+# Background index builds: one build at a time on a worker thread, atomic
+# hot swap of the served version, progress for the UI, scheduled refresh,
+# retry of failed builds with backoff, and several repos kept loaded under a
+# memory cap (LRU eviction)
+# -----------------------------------------------------------
+import time, queue, threading
+from array import array
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+# build(key, progress, force) -> (version, payload); progress(stage, done=None, total=None)
+Builder = Callable[[Hashable, Callable[..., None], bool], tuple]
+
+RETRY_BASE = 30.0    # seconds before a failed key is rebuilt on the next get(); doubles per failure
+RETRY_MAX  = 900.0
+
+
+def index_nbytes(*objs) -> int:
+    """Rough footprint of loaded indexes: numpy arrays (incl. memory-mapped ones) and chunk text blobs."""
+    seen, total = set(), 0
+
+    def walk(o, depth=0):
+        nonlocal total
+        if o is None or id(o) in seen or depth > 4:
+            return
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            total += o.nbytes
+        elif isinstance(o, (bytes, bytearray, memoryview)):
+            total += len(o)
+        elif isinstance(o, array):
+            total += o.itemsize * len(o)
+        elif isinstance(o, dict):
+            for v in o.values():
+                walk(v, depth + 1)
+        elif isinstance(o, (list, tuple)) and (len(o) <= 8 or isinstance(o[0], np.ndarray)):   # not doc lists
+            for v in o:
+                walk(v, depth + 1)
+        elif hasattr(o, "__dict__"):
+            for v in vars(o).values():
+                walk(v, depth + 1)
+    for o in objs:
+        walk(o)
+    return total
+
+
+class RepoSlot:
+    """What is served for one key, plus the state of its latest build."""
+
+    def __init__(self):
+        self.live: Optional[Dict[str, Any]] = None   # {"version", "payload", "built", "nbytes"}; replaced whole
+        self.building = False
+        self.progress: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.retry_at = 0.0   # monotonic time after which get() rebuilds a failed key
+        self.used = time.monotonic()
+
+
+class IndexManager:
+    """Serves the last good index per key while a newer one builds in the background.
+
+    `get(key)` never blocks: it returns the live entry (or None before the first
+    build finishes) and starts a build when there is none. Builds run one at a
+    time, in request order, on a single worker thread, so concurrent requests
+    for several keys never embed or write caches side by side; a failed key is
+    retried by get() after RETRY_BASE seconds, doubling up to RETRY_MAX. A finished build
+    replaces the live entry in one assignment, so a request that already holds
+    the old entry keeps using it. If the loaded entries exceed `mem_cap` bytes,
+    the least recently used keys (never the one just built or still building)
+    are dropped. `on_swap(key, live)` / `on_evict(key)` let callers drop
+    derived state such as cached answers.
+    """
+
+    def __init__(self, build: Builder, mem_cap: int = 512 << 20, refresh_every: Optional[float] = None,
+                 sizeof: Callable[[Any], int] = index_nbytes,
+                 on_swap: Optional[Callable[[Hashable, Dict], None]] = None,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
+        self.build, self.mem_cap, self.sizeof = build, mem_cap, sizeof
+        self.on_swap, self.on_evict = on_swap, on_evict
+        self.slots: Dict[Hashable, RepoSlot] = {}
+        self.lock = threading.Lock()
+        self.refresh_every = refresh_every
+        self._wake = threading.Event()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        threading.Thread(target=self._worker, name="index-build", daemon=True).start()
+        threading.Thread(target=self._schedule, name="index-refresh", daemon=True).start()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            slot = self.slots.setdefault(key, RepoSlot())
+            slot.used = time.monotonic()
+            live = slot.live
+            idle = not slot.building and (slot.error is None or time.monotonic() >= slot.retry_at)
+        if live is None and idle:
+            self.request(key)
+        return live
+
+    def status(self, key: Hashable) -> Dict[str, Any]:
+        with self.lock:
+            slot = self.slots.get(key) or RepoSlot()
+            return {"building": slot.building, "progress": dict(slot.progress), "error": slot.error,
+                    "version": slot.live and slot.live["version"], "built": slot.live and slot.live["built"]}
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        """Loaded keys, most recently used first."""
+        with self.lock:
+            items = sorted(self.slots.items(), key=lambda kv: -kv[1].used)
+            return [{"key": k, "version": s.live["version"], "nbytes": s.live["nbytes"], "built": s.live["built"],
+                     "building": s.building} for k, s in items if s.live is not None]
+
+    def request(self, key: Hashable, force: bool = False) -> bool:
+        """Queue a background build unless one is already queued or running; True if queued."""
+        with self.lock:
+            slot = self.slots.setdefault(key, RepoSlot())
+            if slot.building:
+                return False
+            slot.building, slot.error = True, None
+            slot.progress = {"stage": "queued", "started": time.time()}
+        self._queue.put((key, slot, force))
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            self._run(*self._queue.get())
+
+    def _run(self, key: Hashable, slot: RepoSlot, force: bool) -> None:
+        def progress(stage: str, done: Optional[int] = None, total: Optional[int] = None):
+            with self.lock:
+                slot.progress.update(stage=stage, done=done, total=total)
+        try:
+            version, payload = self.build(key, progress, force)
+            live = {"version": version, "payload": payload, "built": time.time(), "nbytes": self.sizeof(payload)}
+            with self.lock:
+                same = slot.live is not None and slot.live["version"] == version
+                # the swap: one assignment; an unchanged version keeps the loaded objects
+                slot.live = {**slot.live, "built": live["built"]} if same else live
+                slot.building, slot.failures = False, 0
+                slot.progress = {"stage": "up to date" if same else "swapped in", "finished": time.time()}
+            if not same:
+                if self.on_swap:
+                    self.on_swap(key, live)
+                self._evict(keep=key)
+        except Exception as e:
+            with self.lock:
+                slot.building, slot.error = False, f"{type(e).__name__}: {e}"
+                slot.failures += 1
+                slot.retry_at = time.monotonic() + min(RETRY_MAX, RETRY_BASE * 2 ** (slot.failures - 1))
+                slot.progress = {"stage": "failed", "finished": time.time()}
+
+    def _evict(self, keep: Hashable) -> None:
+        dropped = []
+        with self.lock:
+            total = sum(s.live["nbytes"] for s in self.slots.values() if s.live)
+            for k, s in sorted(self.slots.items(), key=lambda kv: kv[1].used):
+                if total <= self.mem_cap:
+                    break
+                if k == keep or s.live is None or s.building:
+                    continue
+                total -= s.live["nbytes"]
+                del self.slots[k]
+                dropped.append(k)
+        for k in dropped:
+            if self.on_evict:
+                self.on_evict(k)
+
+    def set_refresh(self, every: Optional[float]) -> None:
+        if every != self.refresh_every:
+            self.refresh_every = every
+            self._wake.set()
+
+    def _schedule(self) -> None:
+        # rebuild every loaded key once its live entry is older than refresh_every
+        while True:
+            self._wake.wait(timeout=min(self.refresh_every or 60.0, 60.0))
+            self._wake.clear()
+            if not self.refresh_every:
+                continue
+            now = time.time()
+            with self.lock:
+                due = [k for k, s in self.slots.items()
+                       if s.live and not s.building and now - s.live["built"] >= self.refresh_every]
+            for k in due:
+                self.request(k, force=True)
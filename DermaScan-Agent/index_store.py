@@ -0,0 +1,266 @@
+# -----------------------------------------------------------
+# Persistent lexical indexes: vocabulary + term-major postings in one
+# versioned, memory-mappable file next to the ChunkStore they index
+# -----------------------------------------------------------
+import os, re, json, mmap, bisect, shutil, struct, hashlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from chunk_store import ChunkStore
+
+MAGIC = b"DSLEX001"
+HEADER = struct.Struct("<Q")   # length of the JSON header that follows MAGIC
+INDEX_VERSION = 1
+
+# kind -> index class with .store, ._meta(), .arrays and a from_saved(meta, arrays, store, key) classmethod
+KINDS: Dict[str, type] = {}
+
+
+def index_kind(name: str):
+    """Register an index class under the `kind` recorded in saved files."""
+    def register(cls):
+        cls.kind = name
+        KINDS[name] = cls
+        return cls
+    return register
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def key_digest(key: Dict) -> str:
+    blob = json.dumps([INDEX_VERSION, key], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class _Terms:
+    """Sorted UTF-8 terms packed in one byte array; indexable so bisect can search it."""
+    __slots__ = ("blob", "off")
+
+    def __init__(self, blob: np.ndarray, off: np.ndarray):
+        self.blob, self.off = blob, off
+
+    def __len__(self) -> int:
+        return len(self.off) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.off[i]:self.off[i + 1]].tobytes()
+
+
+def pack_terms(terms: List[str]) -> Dict[str, np.ndarray]:
+    """Vocabulary (column i = terms[i]) as a sorted byte blob + offsets + column ids."""
+    raw = [t.encode("utf-8") for t in terms]
+    order = sorted(range(len(raw)), key=raw.__getitem__)   # UTF-8 byte order == code point order
+    off = np.zeros(len(raw) + 1, np.int64)
+    np.cumsum([len(raw[c]) for c in order], out=off[1:])
+    return {"terms": np.frombuffer(b"".join(raw[c] for c in order), np.uint8),
+            "term_off": off, "term_col": np.array(order, np.int32)}
+
+
+class TermLookup:
+    """Mixin: term -> column per field over pack_terms() arrays held in self.arrays[field]."""
+
+    def _init_terms(self) -> None:
+        self.terms = {f: _Terms(a["terms"], a["term_off"]) for f, a in self.arrays.items() if "terms" in a}
+
+    def _column(self, field: str, term: str) -> int:
+        terms, raw = self.terms[field], term.encode("utf-8")
+        i = bisect.bisect_left(terms, raw)
+        if i < len(terms) and terms[i] == raw:
+            return int(self.arrays[field]["term_col"][i])
+        return -1
+
+
+@index_kind("tfidf")
+class LexicalIndex(TermLookup):
+    """TF-IDF search over a ChunkStore with the same scoring as minsearch.Index.
+
+    Rows are L2-normalised at fit time, so cosine similarity is a sparse dot
+    product. Matrices are kept term-major (CSC): a query touches only the
+    postings of its own terms. Everything is plain numpy, so a saved index is
+    opened with mmap and no sklearn/pandas import.
+    """
+
+    def __init__(self, store: ChunkStore, fields: List[str], token_pattern: str, lowercase: bool,
+                 arrays: Dict[str, Dict[str, np.ndarray]], key: Optional[Dict] = None):
+        self.store, self.fields, self.key = store, fields, key
+        self.token_pattern, self.lowercase = token_pattern, lowercase
+        self.pattern = re.compile(token_pattern)
+        self.arrays = arrays
+        self._init_terms()
+        self.doc_ids = np.frombuffer(store.doc_ids, dtype=np.uint32) if len(store) else np.zeros(0, np.uint32)
+        self._docs = None
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    @property
+    def docs(self) -> list:
+        if self._docs is None:
+            self._docs = self.store.views()
+        return self._docs
+
+    @classmethod
+    def from_minsearch(cls, index, store: ChunkStore) -> "LexicalIndex":
+        """Export a fitted minsearch.Index whose docs are `store.views()`."""
+        n = len(store)
+        arrays = {}
+        pattern, lowercase = r"(?u)\b\w\w+\b", True
+        for field in index.text_fields:
+            vec = index.vectorizers[field]
+            p = vec.get_params()
+            if (p["analyzer"] != "word" or tuple(p["ngram_range"]) != (1, 1) or p["tokenizer"] or p["preprocessor"]
+                    or p["strip_accents"] or p["norm"] != "l2" or not p["use_idf"] or p["sublinear_tf"] or p["binary"]):
+                raise ValueError(f"{field}: unsupported vectorizer settings")
+            pattern, lowercase = p["token_pattern"], p["lowercase"]
+            matrix = index.text_matrices.get(field)
+            if matrix is None or matrix.shape[0] != n:
+                # empty corpus / minsearch's dummy vocabulary: nothing can match
+                arrays[field] = cls._pack([], np.zeros(0), np.zeros(1, np.int64), np.zeros(0, np.int32), np.zeros(0))
+                continue
+            csc = matrix.tocsc()
+            csc.sort_indices()
+            arrays[field] = cls._pack(list(vec.get_feature_names_out()), vec.idf_,
+                                      csc.indptr, csc.indices, csc.data)
+        return cls(store, list(index.text_fields), pattern, lowercase, arrays)
+
+    @staticmethod
+    def _pack(terms: List[str], idf, indptr, indices, data) -> Dict[str, np.ndarray]:
+        return {**pack_terms(terms), "idf": np.asarray(idf, np.float64), "indptr": np.asarray(indptr, np.int64),
+                "indices": np.asarray(indices, np.int32), "data": np.asarray(data, np.float64)}
+
+    def _query_vec(self, field: str, query: str):
+        """(columns, weights) of the L2-normalised tf-idf query vector for one field."""
+        idf = self.arrays[field]["idf"]
+        cols, weights = [], []
+        for term, n in Counter(self.pattern.findall(query.lower() if self.lowercase else query)).items():
+            c = self._column(field, term)
+            if c >= 0:
+                cols.append(c)
+                weights.append(n * idf[c])
+        if not cols:
+            return cols, weights
+        w = np.asarray(weights)
+        return cols, w / np.linalg.norm(w)
+
+    def _filter_mask(self, filter_dict: Dict) -> np.ndarray:
+        """Keyword filters on chunk metadata: {"field": value} or {"field": [v1, v2]}."""
+        docs = self.store.docs
+        ok = np.ones(len(docs), bool)
+        for field, value in filter_dict.items():
+            allowed = set(value) if isinstance(value, (list, tuple, set)) else {value}
+            ok &= np.fromiter((d.get(field) in allowed for d in docs), bool, len(docs))
+        return ok[self.doc_ids]
+
+    def search(self, query: str, filter_dict: Optional[Dict] = None, boost_dict: Optional[Dict] = None,
+               num_results: int = 10, output_ids: bool = False) -> List:
+        """Same surface and ranking as minsearch.Index.search."""
+        boost_dict = boost_dict or {}
+        if not len(self):
+            return []
+        scores = np.zeros(len(self))
+        for field in self.fields:
+            cols, weights = self._query_vec(field, query)
+            a, boost = self.arrays[field], boost_dict.get(field, 1)
+            for c, w in zip(cols, weights):
+                lo, hi = a["indptr"][c], a["indptr"][c + 1]
+                scores[a["indices"][lo:hi]] += a["data"][lo:hi] * (w * boost)
+        if filter_dict:
+            scores *= self._filter_mask(filter_dict)
+
+        nz = np.where(scores > 0)[0]
+        if not len(nz):
+            return []
+        top = nz[np.argsort(-scores[nz])][:num_results]
+        if output_ids:
+            return [{**self.docs[i], "_id": int(i), "_score": float(scores[i])} for i in top]
+        return [self.docs[i] for i in top]
+
+    def _meta(self) -> Dict:
+        return {"fields": self.fields, "token_pattern": self.token_pattern, "lowercase": self.lowercase}
+
+    @classmethod
+    def from_saved(cls, meta: Dict, arrays: Dict, store: ChunkStore, key: Optional[Dict]) -> "LexicalIndex":
+        return cls(store, meta["fields"], meta["token_pattern"], meta["lowercase"], arrays, key=key)
+
+
+# ---- on-disk format: <dir>/chunks.bin (ChunkStore) + <dir>/lexical.bin ----
+# MAGIC | u64 header len | JSON header | pad8 | arrays (each 8-aligned, native byte order)
+
+def write_index(index, path: str, key: Optional[Dict] = None) -> None:
+    if index.store is None:
+        raise ValueError("only an index fitted on a ChunkStore can be saved")
+    os.makedirs(path, exist_ok=True)
+    index.store.save(os.path.join(path, "chunks.bin"))
+    layout, pos = [], 0
+    for group, named in index.arrays.items():
+        for name, arr in named.items():
+            layout.append([group, name, arr.dtype.str, pos, len(arr)])
+            pos += arr.nbytes + _pad8(arr.nbytes)
+    header = json.dumps({"version": INDEX_VERSION, "kind": index.kind, "key": key, "n_chunks": len(index.store),
+                         "meta": index._meta(), "arrays": layout}, ensure_ascii=False).encode("utf-8")
+    with open(os.path.join(path, "lexical.bin"), "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(len(header)))
+        f.write(header)
+        f.write(b"\0" * _pad8(len(MAGIC) + HEADER.size + len(header)))
+        for group, name, _, _, _ in layout:
+            arr = index.arrays[group][name]
+            f.write(arr.tobytes())
+            f.write(b"\0" * _pad8(arr.nbytes))
+    index.key = key
+
+
+def read_index(path: str):
+    """Memory-map a saved index of any registered kind; every array is a zero-copy read-only view."""
+    with open(os.path.join(path, "lexical.bin"), "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        mm.close()
+        raise ValueError(f"{path}: not a lexical index")
+    (hlen,) = HEADER.unpack_from(mm, len(MAGIC))
+    pos = len(MAGIC) + HEADER.size
+    header = json.loads(mm[pos:pos + hlen].decode("utf-8"))
+    if header["version"] != INDEX_VERSION or header["kind"] not in KINDS:
+        raise ValueError(f"{path}: unsupported index (version {header['version']}, kind {header['kind']!r})")
+    base = pos + hlen + _pad8(pos + hlen)
+    arrays: Dict[str, Dict[str, np.ndarray]] = {}
+    for group, name, dtype, offset, count in header["arrays"]:
+        arrays.setdefault(group, {})[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=base + offset)
+    store = ChunkStore.load(os.path.join(path, "chunks.bin"))
+    if len(store) != header["n_chunks"]:
+        raise ValueError(f"{path}: chunk table does not match the index")
+    return KINDS[header["kind"]].from_saved(header["meta"], arrays, store, header["key"])
+
+
+def open_index(root: str, key: Dict):
+    """Load the index saved under `root` for exactly this key, or None (missing, stale, corrupt)."""
+    path = os.path.join(root, key_digest(key))
+    if not os.path.isdir(path):
+        return None
+    try:
+        index = read_index(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARN] {path}: {e}")
+        return None
+    return index if index.key == key else None
+
+
+def save_index(index, root: str, key: Dict) -> str:
+    """Write to a temp dir, rename it into place, then drop indexes saved under older keys."""
+    os.makedirs(root, exist_ok=True)
+    digest = key_digest(key)
+    final = os.path.join(root, digest)
+    tmp = os.path.join(root, f".tmp-{digest}-{os.getpid()}")
+    write_index(index, tmp, key)
+    try:
+        os.rename(tmp, final)
+    except OSError:   # another process got there first; its copy is equivalent
+        shutil.rmtree(tmp, ignore_errors=True)
+    for name in os.listdir(root):
+        if name != digest and not name.startswith(".tmp-"):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return final
@@ -0,0 +1,132 @@
+# -----------------------------------------------------------
+# Incremental re-ingestion: per-repo ETag/Last-Modified + per-member CRC manifest
+# -----------------------------------------------------------
+import os, json, time, zipfile
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from repo_zip import zip_url, spool_download, iter_zip_texts
+from chunk_file import EXT, rewrite_chunks
+
+MANIFEST_VERSION = 1
+
+
+class IngestManifest:
+    """JSON manifest: {"repos": {"owner/repo": {url, etag, last_modified, commit, checked, params, files}}}.
+
+    `files` maps repo-relative filename -> "<crc32>:<size>" taken from the ZIP
+    central directory, so unchanged members are detected without decompressing.
+    `commit` is the SHA GitHub writes into the archive comment (ETag if absent);
+    `checked` is when the remote was last asked.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"version": MANIFEST_VERSION, "repos": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if loaded.get("version") == MANIFEST_VERSION:
+                self.data = loaded
+
+    def repo(self, key: str) -> Dict:
+        return self.data["repos"].setdefault(key, {"files": {}})
+
+    def forget(self, key: str) -> None:
+        """Drop a repo's state, forcing a full re-ingest (e.g. the output file is gone)."""
+        self.data["repos"].pop(key, None)
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+
+def iter_changes(manifest: IngestManifest, owner: str, repo: str, exts,
+                 branches=("main", "master"), params: Optional[Dict] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (filename, text) for added/changed files and (filename, None) for deleted ones.
+
+    Sends If-None-Match / If-Modified-Since, so an unchanged repo costs one 304
+    and yields nothing. A change in `params` (e.g. chunk size) invalidates every
+    file; files deleted meanwhile are still yielded as deletions. A file's new
+    fingerprint is recorded only once it has been decoded, so one that failed
+    is tried again next run. The manifest is updated in memory once the
+    generator is exhausted; call `manifest.save()` after the outputs have been written.
+    """
+    state = manifest.repo(f"{owner}/{repo}")
+    known = state.get("files", {})   # what the outputs hold, for deletions
+    if state.get("params") != params:
+        state.clear()
+        state["files"] = {}
+    old = state["files"]
+
+    last_status = None
+    for br in branches:
+        url = zip_url(owner, repo, br)
+        headers = {}
+        if state.get("url") == url:
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+        spool, resp = spool_download(url, headers=headers)
+        last_status = resp.status_code
+        if last_status == 304:
+            state["checked"] = time.time()
+            return
+        if spool is not None:
+            break
+    else:
+        raise RuntimeError(f"Failed to download {owner}/{repo} (tried {branches}, last={last_status})")
+
+    new: Dict[str, str] = {}
+    pending: Dict[str, str] = {}   # changed, not decoded yet
+
+    def want(rel, info) -> bool:
+        fp = f"{info.CRC:08x}:{info.file_size}"
+        if old.get(rel) == fp:
+            new[rel] = fp
+            return False
+        pending[rel] = fp
+        return True
+
+    with spool:
+        with zipfile.ZipFile(spool) as zf:
+            commit = zf.comment.decode("ascii", "ignore").strip()
+        for rel, text in iter_zip_texts(spool, exts, want=want):
+            new[rel] = pending.pop(rel)
+            yield rel, text
+    for rel in pending:   # failed to decode: keep the old fingerprint (or none), so it is retried
+        if rel in old:
+            new[rel] = old[rel]
+    for rel in sorted(known.keys() - new.keys()):
+        yield rel, None
+
+    state.update(url=url, etag=resp.headers.get("ETag"),
+                 last_modified=resp.headers.get("Last-Modified"),
+                 commit=commit or resp.headers.get("ETag"), checked=time.time(), params=params, files=new)
+
+
+def rewrite_jsonl(path: str, stale: Iterable[str], fresh: Iterable[Dict], key: str = "filename") -> int:
+    """Copy `path` minus records whose `key` is in `stale`, append `fresh`, swap atomically.
+
+    Only the fresh records are parsed/chunked by the caller; old lines are copied as-is.
+    A chunk file path (chunk_file.EXT) is rewritten in that format.
+    """
+    if path.endswith(EXT):
+        return rewrite_chunks(path, stale, fresh, key)
+    stale = set(stale)
+    tmp = path + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip() and (not stale or json.loads(line).get(key) not in stale):
+                        out.write(line)
+                        n += 1
+        for r in fresh:
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+    os.replace(tmp, path)
+    return n
@@ -0,0 +1,212 @@
+# -----------------------------------------------------------
+# Interaction log: non-blocking in-process queue, batched writes to SQLite,
+# large blobs (context, search results, system prompt) stored once by
+# content hash, indexed reads by time / model / question
+# -----------------------------------------------------------
+import json, time, queue, sqlite3, hashlib, secrets, threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from query_cache import normalize_question
+
+DEFAULT_PATH = "interactions.sqlite"
+
+_STOP, _FLUSH = object(), object()
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class InteractionLog:
+    """One row per question/answer; the caller only pays for a queue put.
+
+    `log(...)` stamps the entry and hands it to a writer thread, which drains
+    the queue in batches (up to `batch_size` entries, or whatever arrived within
+    `flush_interval` seconds) and commits each batch in one transaction. Texts
+    that repeat across entries — the system prompt, the packed context, the
+    search results — go to a `blobs` table keyed by sha256 and are written once.
+    If the queue is full (`max_queue`), new entries are dropped and counted
+    rather than blocking the request.
+
+    `readonly=True` is for viewers of a log another process writes: the file is
+    opened with a `mode=ro` URI, no schema or pragmas are touched, no writer
+    thread starts, and log() raises.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, batch_size: int = 256, flush_interval: float = 0.5,
+                 max_queue: int = 10000, readonly: bool = False):
+        self.path, self.batch_size, self.flush_interval = path, batch_size, flush_interval
+        self.readonly = readonly
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.written = self.batches = self.dropped = 0
+        self.lock = threading.Lock()
+        if readonly:
+            self.db = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True,
+                                      check_same_thread=False, isolation_level=None)
+            self.writer = None
+            return
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")   # WAL: durable on checkpoint, one fsync per batch at most
+        self.db.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data TEXT, size INTEGER)")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS interactions (
+            id TEXT PRIMARY KEY, ts REAL, agent TEXT, provider TEXT, model TEXT, source TEXT,
+            question TEXT, qnorm TEXT, answer TEXT, n_results INTEGER,
+            system_hash TEXT, context_hash TEXT, results_hash TEXT, meta TEXT)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS interactions_ts ON interactions(ts)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS interactions_model ON interactions(model, ts)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS interactions_question ON interactions(qnorm, ts)")
+        self.writer = threading.Thread(target=self._drain, name="interaction-log", daemon=True)
+        self.writer.start()
+
+    # ---------------- write ----------------
+    def log(self, question: str, answer: str, model: str = "", agent: str = "dermascan_agent",
+            system_prompt: str = "", context: str = "", results: Optional[List[Any]] = None,
+            source: str = "user", provider: str = "gemini", **meta) -> str:
+        """Queue one interaction; returns its id right away (the row lands with the next batch)."""
+        if self.readonly:
+            raise RuntimeError(f"{self.path} is open read-only")
+        uid = f"{datetime.now(timezone.utc):%Y%m%d_%H%M%S}_{secrets.token_hex(6)}"
+        entry = {"id": uid, "ts": time.time(), "agent": agent, "provider": provider, "model": model,
+                 "source": source, "question": question, "answer": answer, "system_prompt": system_prompt,
+                 "context": context, "results": results or [], "meta": meta}
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+        return uid
+
+    def _drain(self) -> None:
+        while True:
+            item = self.queue.get()
+            batch, markers, stop = [], 0, item is _STOP
+            if item is _STOP or item is _FLUSH:
+                markers += 1
+            else:
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_interval
+            while not markers and len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP or item is _FLUSH:   # write what we have now
+                    markers, stop = 1, item is _STOP
+                else:
+                    batch.append(item)
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception:
+                with self.lock:
+                    self.dropped += len(batch)
+            finally:
+                for _ in range(len(batch) + markers):
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # serialising and hashing happen here, off the request thread
+        blobs: Dict[str, tuple] = {}
+
+        def blob(data: str) -> Optional[str]:
+            if not data:
+                return None
+            h = hashlib.sha256(data.encode("utf-8")).hexdigest()
+            blobs.setdefault(h, (h, data, len(data)))
+            return h
+
+        rows = [(e["id"], e["ts"], e["agent"], e["provider"], e["model"], e["source"], e["question"],
+                 normalize_question(e["question"]), e["answer"], len(e["results"]), blob(e["system_prompt"]),
+                 blob(e["context"]), blob(_dumps(e["results"]) if e["results"] else ""),
+                 _dumps(e["meta"]) if e["meta"] else None) for e in batch]
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany("INSERT OR IGNORE INTO blobs VALUES (?,?,?)", list(blobs.values()))
+                self.db.executemany("INSERT OR REPLACE INTO interactions VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.written += len(rows)
+            self.batches += 1
+
+    def flush(self) -> None:
+        """Block until everything queued so far is committed (the pending batch is written now)."""
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+
+    def close(self) -> None:
+        if self.writer is None:
+            self.db.close()
+        elif self.writer.is_alive():
+            self.queue.put(_STOP)
+            self.writer.join()
+
+    # ---------------- read ----------------
+    def recent(self, n: int = 10, model: Optional[str] = None, question: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Newest `n` interactions (no blobs), optionally for one model, one question
+        (compared normalised) and/or a time window; each filter is served by an index."""
+        where, args = [], []
+        for clause, value in (("model = ?", model), ("qnorm = ?", question and normalize_question(question)),
+                              ("ts >= ?", since), ("ts < ?", until)):
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        sql = ("SELECT id, ts, agent, model, source, question, answer, n_results, meta FROM interactions"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY ts DESC LIMIT ?")
+        with self.lock:
+            rows = self.db.execute(sql, args + [int(n)]).fetchall()
+        return [{"id": r[0], "timestamp": _iso(r[1]), "agent": r[2], "model": r[3], "source": r[4],
+                 "question": r[5], "answer": r[6], "results_used": r[7], **json.loads(r[8] or "{}")} for r in rows]
+
+    def entry(self, uid: str) -> Optional[Dict[str, Any]]:
+        """The full interaction in the per-file JSON log layout (system prompt, messages
+        with the tool context, search results), as the evaluation code reads it."""
+        with self.lock:
+            row = self.db.execute(
+                """SELECT i.id, i.ts, i.agent, i.provider, i.model, i.source, i.question, i.answer, i.meta,
+                          s.data, c.data, r.data
+                   FROM interactions i LEFT JOIN blobs s ON s.hash = i.system_hash
+                   LEFT JOIN blobs c ON c.hash = i.context_hash LEFT JOIN blobs r ON r.hash = i.results_hash
+                   WHERE i.id = ?""", (uid,)).fetchone()
+        if row is None:
+            return None
+        uid, ts, agent, provider, model, source, question, answer, meta, system, context, results = row
+        meta = json.loads(meta or "{}")
+        return {
+            "id": uid, "agent_name": agent, "system_prompt": system or "", "provider": provider, "model": model,
+            "tools": meta.pop("tools", ["dermascan_search"]), "source": source, "timestamp": _iso(ts),
+            "messages": [
+                {"kind": "user", "parts": [{"part_kind": "user-prompt", "content": question}]},
+                {"kind": "tool", "parts": [{"part_kind": "tool-return", "content": context or ""}]},
+                {"kind": "model", "parts": [{"part_kind": "text", "content": answer}]},
+            ],
+            "search_results": json.loads(results) if results else [],
+            "question": question, "answer": answer, **meta,
+        }
+
+    def ids(self, since: Optional[float] = None) -> List[str]:
+        """All interaction ids, oldest first."""
+        with self.lock:
+            rows = self.db.execute("SELECT id FROM interactions WHERE ts >= ? ORDER BY ts",
+                                   (since or 0.0,)).fetchall()
+        return [r[0] for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+            blobs, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            return {"entries": entries, "blobs": blobs, "blob_bytes": size, "queued": self.queue.qsize(),
+                    "written": self.written, "batches": self.batches, "dropped": self.dropped}
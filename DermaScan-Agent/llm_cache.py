@@ -0,0 +1,103 @@
+# -----------------------------------------------------------
+# Content-addressed on-disk cache for model calls (SQLite)
+# key = sha256(model, prompt template, inputs); TTL + size-bounded LRU eviction
+# -----------------------------------------------------------
+import json, time, sqlite3, hashlib, threading
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_PATH = ".llm_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class LLMCache:
+    """Shared cache for chunking, answering and evaluation calls.
+
+    Values are strings (the raw model output). Entries older than `ttl` seconds
+    are treated as misses; once the stored values exceed `max_bytes`, the least
+    recently used entries are evicted. Safe to share across threads.
+
+    The stored size is kept as a running total, so a put costs no table scan;
+    it is recounted only when it says the budget is exceeded (another process
+    sharing the file may have changed it).
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: Optional[float] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path, self.ttl, self.max_bytes = path, ttl, max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER,
+            created REAL, accessed REAL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+        self.total = self._size()
+
+    def _size(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, template: str, inputs: Dict[str, Any]) -> str:
+        blob = json.dumps([model, template, inputs], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT value, created, size FROM cache WHERE key=?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self.db.execute("DELETE FROM cache WHERE key=?", (key,))
+                    self.total -= row[2]
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE cache SET accessed=? WHERE key=?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str, model: str = "") -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self.lock:
+            old = self.db.execute("SELECT size FROM cache WHERE key=?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO cache VALUES (?,?,?,?,?,?)",
+                            (key, model, value, size, now, now))
+            self.total += size - (old[0] if old else 0)
+            if self.total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        total = self._size()
+        # drop least-recently-used rows until we are back under budget
+        while total > self.max_bytes:
+            batch = self.db.execute("SELECT key, size FROM cache ORDER BY accessed LIMIT 256").fetchall()
+            if not batch:
+                break
+            for key, size in batch:
+                self.db.execute("DELETE FROM cache WHERE key=?", (key,))
+                self.evictions += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self.total = total
+
+    def cached(self, model: str, template: str, inputs: Dict[str, Any], compute: Callable[[], str]) -> str:
+        """Return the cached output for (model, template, inputs) or compute and store it.
+
+        Empty outputs are not stored, so a failed/blank generation is retried next time.
+        """
+        k = self.key(model, template, inputs)
+        hit = self.get(k)
+        if hit is not None:
+            return hit
+        value = compute()
+        if value:
+            self.put(k, value, model=model)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": entries, "bytes": size}
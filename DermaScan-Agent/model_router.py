@@ -0,0 +1,217 @@
+# -----------------------------------------------------------
+# Model router: clients built once, per-model deadlines, hedged requests
+# after a p95-based delay, latency/error-aware ordering, circuit breakers
+# -----------------------------------------------------------
+import time, threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+DEFAULT_DEADLINE = 30.0   # seconds
+
+
+class ModelStats:
+    """Rolling latency/outcome window for one model, plus its circuit breaker.
+
+    The breaker opens after `fail_threshold` consecutive failures and stays open
+    for `cooldown` seconds; then one trial call is let through (half-open): the
+    first caller of allow() takes it and later ones are refused until that call
+    is recorded. A success closes it, another failure reopens it.
+    """
+
+    def __init__(self, window: int = 50, fail_threshold: int = 3, cooldown: float = 60.0):
+        self.latencies = deque(maxlen=window)   # seconds, successful calls only
+        self.outcomes = deque(maxlen=window)    # True = success
+        self.elapsed = deque(maxlen=window)     # seconds, every call (timeouts count their deadline)
+        self.fail_threshold, self.cooldown = fail_threshold, cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial = False   # the half-open trial call is in flight
+        self.last_error: Optional[str] = None
+
+    def record(self, ok: bool, latency: float, error: Optional[BaseException] = None) -> None:
+        self.trial = False
+        self.outcomes.append(ok)
+        self.elapsed.append(latency)
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures, self.open_until = 0, 0.0
+        else:
+            self.last_error = repr(error) if error is not None else "failed"
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.fail_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+
+    def state(self, now: Optional[float] = None) -> str:
+        if self.consecutive_failures < self.fail_threshold:
+            return "closed"
+        return "open" if (now or time.monotonic()) < self.open_until else "half-open"
+
+    def blocked(self, now: Optional[float] = None) -> bool:
+        """Open, or half-open with the trial call already taken."""
+        state = self.state(now)
+        return state == "open" or (state == "half-open" and self.trial)
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """May a call go to this model now? Takes the half-open trial; caller holds the lock."""
+        if self.blocked(now):
+            return False
+        if self.state(now) == "half-open":
+            self.trial = True
+        return True
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        lat = sorted(self.latencies)
+        return lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+
+    def error_rate(self) -> float:
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def expected_cost(self) -> float:
+        """Seconds spent per successful answer: mean time per call / success rate."""
+        return (sum(self.elapsed) / len(self.elapsed)) / max(1 - self.error_rate(), 0.05)
+
+
+class ModelRouter:
+    """Calls `fn(client, model_name)` on the best available model.
+
+    - clients come from `factory(model_name)`, once per model for the router's life
+    - each attempt has a deadline (seconds; one value or a dict per model); a model
+      that misses it counts as failed and the next one is started
+    - with `hedge`, the next model is also started once the current one has run
+      longer than its p95 (clamped to [hedge_min, deadline]); first good answer wins
+    - models are tried in order of expected cost (mean call time / success rate);
+      models with too few samples keep their configured order behind measured ones
+    - models whose breaker is open (or half-open with its one trial call already
+      running) are not hedged to and only tried as a last resort
+
+    The losing or timed-out calls cannot be cancelled; they finish on the pool
+    and their outcome still feeds the stats. An accepted result that lost is
+    handed to `discard` on the pool (e.g. to drain an open stream).
+    """
+
+    def __init__(self, models: List[str], factory: Callable[[str], Any],
+                 deadline: Union[float, Dict[str, float]] = DEFAULT_DEADLINE, hedge: bool = True, hedge_min: float = 1.0,
+                 min_samples: int = 5, window: int = 50, fail_threshold: int = 3, cooldown: float = 60.0,
+                 max_workers: int = 8):
+        self.models, self.factory = list(models), factory
+        self.deadline, self.hedge, self.hedge_min, self.min_samples = deadline, hedge, hedge_min, min_samples
+        self.stats = {m: ModelStats(window, fail_threshold, cooldown) for m in self.models}
+        self.clients: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router")
+
+    def deadline_for(self, model: str) -> float:
+        return self.deadline.get(model, DEFAULT_DEADLINE) if isinstance(self.deadline, dict) else self.deadline
+
+    def client(self, model: str):
+        with self.lock:
+            if model not in self.clients:
+                self.clients[model] = self.factory(model)
+            return self.clients[model]
+
+    def order(self) -> List[str]:
+        """Models to try, best first."""
+        now = time.monotonic()
+        with self.lock:
+            def cost(m):
+                s = self.stats[m]
+                if len(s.outcomes) < self.min_samples:
+                    return float("inf")
+                return s.expected_cost()
+            ranked = sorted(self.models, key=lambda m: (cost(m), self.models.index(m)))
+            shut = [m for m in ranked if self.stats[m].blocked(now)]
+        # open breakers go last: only called once every other model has failed this request
+        return [m for m in ranked if m not in shut] + sorted(shut, key=lambda m: self.stats[m].open_until)
+
+    def hedge_delay(self, model: str) -> float:
+        deadline = self.deadline_for(model)
+        if not self.hedge:
+            return deadline
+        with self.lock:
+            s = self.stats[model]
+            p95 = s.p95() if len(s.latencies) >= self.min_samples else None
+        return deadline if p95 is None else min(max(p95, self.hedge_min), deadline)
+
+    def _record(self, attempt: Dict, ok: bool, error: Optional[BaseException] = None) -> None:
+        with self.lock:
+            if attempt["settled"]:
+                return
+            attempt["settled"] = True
+            self.stats[attempt["model"]].record(ok, time.monotonic() - attempt["start"], error)
+
+    def _run(self, attempt: Dict, fn: Callable, accept: Callable[[Any], bool]):
+        try:
+            result = fn(self.client(attempt["model"]), attempt["model"])
+        except Exception as e:
+            self._record(attempt, False, e)
+            raise
+        ok = accept(result)
+        self._record(attempt, ok, None if ok else ValueError("rejected result"))
+        return result
+
+    def _discard_loser(self, fut, accept: Callable[[Any], bool], discard: Optional[Callable[[Any], None]]) -> None:
+        if discard is not None and fut.exception() is None and accept(fut.result()):
+            self.pool.submit(discard, fut.result())
+
+    def call(self, fn: Callable[[Any, str], Any], accept: Callable[[Any], bool] = lambda r: r is not None,
+             discard: Optional[Callable[[Any], None]] = None) -> Tuple[Any, Optional[str]]:
+        """-> (result, model name) of the first accepted result, or (None, None)."""
+        queue = self.order()
+        with self.lock:
+            shut = {m for m in queue if self.stats[m].blocked()}
+        running: Dict[Any, Dict] = {}   # future -> attempt
+        next_at = 0.0
+
+        def lose(fut) -> None:
+            fut.add_done_callback(lambda f: self._discard_loser(f, accept, discard))
+
+        def launch():
+            while True:
+                model = queue.pop(0)
+                if model in shut and running:   # never hedge to a last resort
+                    queue.insert(0, model)
+                    return next_at
+                with self.lock:
+                    allowed = self.stats[model].allow()
+                if allowed or model in shut or not queue:
+                    break
+                # another request took this model's half-open trial meanwhile: keep it as a last resort
+                shut.add(model)
+                queue.append(model)
+            attempt = {"model": model, "start": time.monotonic(), "settled": False}
+            running[self.pool.submit(self._run, attempt, fn, accept)] = attempt
+            return attempt["start"] + self.hedge_delay(attempt["model"])
+
+        while queue or running:
+            now = time.monotonic()
+            if queue and (not running or (now >= next_at and queue[0] not in shut)):
+                next_at = launch()
+                continue
+            expiry = min(a["start"] + self.deadline_for(a["model"]) for a in running.values())
+            wake = min(expiry, next_at) if queue and queue[0] not in shut else expiry
+            done, _ = wait(list(running), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                attempt = running.pop(fut)
+                if fut.exception() is None and accept(fut.result()):
+                    for other in running:
+                        lose(other)   # losers keep running, feed the stats, then go to discard
+                    return fut.result(), attempt["model"]
+            now = time.monotonic()
+            for fut, a in list(running.items()):
+                if now >= a["start"] + self.deadline_for(a["model"]):
+                    self._record(a, False, TimeoutError(f"{a['model']} missed its {self.deadline_for(a['model'])}s deadline"))
+                    running.pop(fut)
+                    lose(fut)
+        return None, None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-model stats in current routing order (for display)."""
+        order = self.order()
+        with self.lock:
+            return [{"model": m, "state": self.stats[m].state(), "calls": len(self.stats[m].outcomes),
+                     "p95_ms": None if self.stats[m].p95() is None else round(self.stats[m].p95() * 1000),
+                     "error_rate": round(self.stats[m].error_rate(), 3), "last_error": self.stats[m].last_error}
+                    for m in order]
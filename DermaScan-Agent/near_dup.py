@@ -0,0 +1,147 @@
+# -----------------------------------------------------------
+# Near-duplicate chunk removal between chunking and the index fit: MinHash
+# signatures over word shingles, LSH banding to find candidate pairs in
+# near-linear time, and one kept chunk per group that records where the
+# dropped copies were
+# -----------------------------------------------------------
+import re, zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM  = 64     # MinHash signature length
+BANDS     = 16     # 16 bands x 4 rows: a pair at Jaccard 0.8 shares a band with p > 0.999, at 0.3 with p ~0.12
+SHINGLE   = 5      # words per shingle (same as context_pack)
+THRESHOLD = 0.8    # estimated Jaccard at which two chunks are duplicates
+PROBES    = 8      # earlier bucket members a chunk is checked against
+
+Span = Tuple[int, int]
+Entry = Tuple[str, List[Span], Dict]   # (text, chunk spans in character offsets, metadata) as for ChunkStore.add
+
+_WORD = re.compile(r"\w+")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class MinHasher:
+    """Fixed random hash family (seeded, so signatures are stable across runs)."""
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle: int = SHINGLE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.shingle = shingle
+        self.words: Dict[str, int] = {}   # word -> crc32, shared by every chunk
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 64-bit hashes of the text's word n-grams (one for texts shorter than n words)."""
+        cache = self.words
+        ids = [cache[w] if w in cache else cache.setdefault(w, zlib.crc32(w.encode("utf-8")))
+               for w in _WORD.findall(text.lower())]
+        h = np.array(ids or [0], dtype=np.uint64)
+        k = min(self.shingle, len(h))
+        n = len(h) - k + 1
+        out = h[:n].copy()
+        for j in range(1, k):
+            out = out * _MIX + h[j:n + j]
+        return np.unique(out)
+
+    def signatures(self, texts: List[str], batch: int = 256) -> np.ndarray:
+        """[len(texts), num_perm] uint32 signatures, hashed `batch` texts per numpy call."""
+        out = np.zeros((len(texts), len(self.a)), np.uint32)
+        for b in range(0, len(texts), batch):
+            sh = [self.shingles(t) for t in texts[b:b + batch]]
+            x = np.concatenate(sh)[None, :]
+            # multiply-shift hashing: the high 32 bits of a*x + b (mod 2**64), min per text;
+            # one row per hash function keeps the reduction over contiguous memory
+            h = (self.a[:, None] * x + self.b[:, None]) >> np.uint64(32)
+            offsets = np.cumsum([0] + [len(v) for v in sh[:-1]])
+            out[b:b + len(sh)] = np.minimum.reduceat(h, offsets, axis=1).T
+        return out
+
+
+def duplicate_groups(sigs: np.ndarray, threshold: float = THRESHOLD, bands: int = BANDS) -> List[List[int]]:
+    """Rows whose signatures agree on >= `threshold` of positions, linked transitively.
+
+    -> groups of ascending row ids, only those with two or more members. Rows
+    sharing a band land in one bucket; a row is compared only with up to
+    PROBES earlier rows of its buckets, so the cost stays near-linear even
+    when many chunks share boilerplate.
+    """
+    n, num_perm = sigs.shape
+    rows = num_perm // bands
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    mult = np.random.default_rng(2).integers(1, 2**63, rows, dtype=np.uint64) | np.uint64(1)
+    need = int(np.ceil(threshold * num_perm))
+    for b in range(bands):
+        keys = (sigs[:, b * rows:(b + 1) * rows].astype(np.uint64) * mult).sum(axis=1).tolist()
+        buckets: Dict[int, List[int]] = {}
+        for i, key in enumerate(keys):
+            members = buckets.setdefault(key, [])
+            for j in members[-PROBES:]:
+                if find(i) == find(j):
+                    break
+                if int((sigs[i] == sigs[j]).sum()) >= need:
+                    parent[find(i)] = find(j)
+                    break
+            members.append(i)
+    groups: Dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def _uncontained(spans: List[Span]) -> List[Span]:
+    """Spans minus those lying inside another span of the same text (e.g. a window's last
+    stride, which the window before it already covers). Order is kept."""
+    kept, reach = set(), -1
+    for s, e in sorted(set(spans), key=lambda sp: (sp[0], -sp[1])):
+        if e > reach:
+            kept.add((s, e))
+            reach = e
+    return [sp for sp in dict.fromkeys(spans) if sp in kept]
+
+
+def dedup_entries(entries: List[Entry], threshold: float = THRESHOLD,
+                  hasher: Optional[MinHasher] = None) -> Tuple[List[Entry], Dict[str, int]]:
+    """Drop chunks that repeat others, before they are indexed.
+
+    A span inside another span of the same entry goes first; then near-duplicate
+    chunks across all entries are grouped and the first chunk of each group is
+    kept. A kept chunk with dropped copies moves to an entry of its own whose
+    metadata adds "locations": every {"filename", "start", "end"} the text was
+    found at, its own first. -> (entries, stats)
+    """
+    hasher = hasher or MinHasher()
+    flat = []   # (entry index, span)
+    for ei, (_, spans, _) in enumerate(entries):
+        flat.extend((ei, sp) for sp in _uncontained(spans))
+    contained = sum(len(spans) for _, spans, _ in entries) - len(flat)
+
+    texts = [entries[ei][0][s:e] for ei, (s, e) in flat]
+    groups = duplicate_groups(hasher.signatures(texts), threshold)
+    dropped, locations = set(), {}
+    for g in groups:
+        dropped.update(g[1:])
+        locations[g[0]] = [{"filename": entries[flat[i][0]][2].get("filename", ""),
+                            "start": flat[i][1][0], "end": flat[i][1][1]} for i in g]
+
+    out: List[Entry] = []
+    by_entry: Dict[int, List[int]] = {}
+    for i, (ei, _) in enumerate(flat):
+        by_entry.setdefault(ei, []).append(i)
+    for ei, (text, _, meta) in enumerate(entries):
+        ids = by_entry.get(ei, [])
+        plain = [flat[i][1] for i in ids if i not in dropped and i not in locations]
+        if plain:
+            out.append((text, plain, meta))
+        out.extend((text, [flat[i][1]], {**meta, "locations": locations[i]}) for i in ids if i in locations)
+    stats = {"chunks": len(flat) + contained, "kept": len(flat) - len(dropped), "contained": contained,
+             "near_duplicates": len(dropped), "groups": len(groups)}
+    return out, stats
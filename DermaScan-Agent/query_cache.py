@@ -0,0 +1,73 @@
+# -----------------------------------------------------------
+# Process-wide query cache: bounded LRU + TTL for search results and answers,
+# keyed on (normalised question, repo, index version, topk)
+# -----------------------------------------------------------
+import re, time, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from index_store import key_digest
+
+_MISSING = object()
+
+
+def normalize_question(q: str) -> str:
+    """Case, surrounding/duplicate whitespace and trailing punctuation do not change the answer."""
+    return re.sub(r"\s+", " ", q).strip().rstrip("?!. ").lower()
+
+
+def index_version(index) -> str:
+    """Digest of the key a saved index was built under; a rebuild gets a new version."""
+    key = getattr(index, "key", None)
+    return key_digest(key) if key is not None else f"mem-{id(index):x}"
+
+
+class QueryCache:
+    """Thread-safe LRU with per-entry TTL. Values are returned as stored (not copied)."""
+
+    def __init__(self, maxsize: int = 512, ttl: Optional[float] = 3600):
+        self.maxsize, self.ttl = maxsize, ttl
+        self.data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        now = time.monotonic()
+        with self.lock:
+            item = self.data.get(key, _MISSING)
+            if item is _MISSING or (item[0] is not None and item[0] < now):
+                if item is not _MISSING:
+                    del self.data[key]
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            self.data[key] = (expires, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def cached(self, key: Hashable, compute: Callable[[], Any], store_if: Callable[[Any], bool] = lambda v: True):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if store_if(value):
+                self.put(key, value)
+        return value
+
+    def invalidate(self, match: Callable[[Hashable], bool] = lambda k: True) -> int:
+        """Drop matching keys (all by default); returns how many were removed."""
+        with self.lock:
+            stale = [k for k in self.data if match(k)]
+            for k in stale:
+                del self.data[k]
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.data)}
@@ -0,0 +1,66 @@
+# -----------------------------------------------------------
+# Token-bucket rate limiting + retry with exponential backoff for model calls
+# -----------------------------------------------------------
+import time, random, threading
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens/s up to `capacity` (burst)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_retryable(e: Exception) -> bool:
+    """Rate limits, timeouts, dropped connections and 5xx are worth another try."""
+    status = getattr(e, "status_code", None) or getattr(e, "code", None)
+    if status in RETRY_STATUS:
+        return True
+    name = type(e).__name__
+    return isinstance(e, (TimeoutError, ConnectionError)) or name in (
+        "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+        "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded")
+
+
+def with_retries(fn: Callable[[], T], attempts: int = 5, base: float = 1.0, cap: float = 30.0,
+                 retry_on: Callable[[Exception], bool] = is_retryable,
+                 on_retry: Optional[Callable[[int, Exception, float], None]] = None) -> T:
+    """Call fn(); on a retryable error sleep base*2^n (capped, with jitter) and try again."""
+    if attempts < 1:
+        raise ValueError("attempts must be >= 1")
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not retry_on(e):
+                raise
+            delay = min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
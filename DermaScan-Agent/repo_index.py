@@ -0,0 +1,179 @@
+# -----------------------------------------------------------
+# Repo -> cached files -> chunks -> lexical index, persisted per
+# (repo, commit, chunk params) so a restart skips download, chunking and fit
+# -----------------------------------------------------------
+import os, json, time, shutil, hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from ingest_manifest import IngestManifest, iter_changes, rewrite_jsonl
+from chunk_store import ChunkStore
+from index_store import LexicalIndex, open_index, save_index
+from bm25 import BM25Index
+from code_chunking import code_chunks, symbols_text
+from near_dup import Entry, dedup_entries
+from embedding_store import DEFAULT_MODEL, Encoder, IVFIndex, StoreRows, VectorIndex, open_store
+from tracing import count, span
+
+SearchIndex = Union[BM25Index, LexicalIndex]
+
+TEXT_FIELDS = ["content", "title", "filename", "symbols"]
+ENGINES     = ("bm25", "tfidf")   # tfidf = minsearch's scoring
+CHUNKINGS   = ("window", "code")  # code = syntax-aware chunks for source files, windows for prose
+FRESH_FOR   = 3600   # seconds a recorded commit is trusted before asking GitHub again
+
+
+def window_spans(n: int, window: int, stride: int) -> List[Tuple[int,int]]:
+    """Sliding window (start, end) offsets, plus a tail span so the end is always covered."""
+    spans = []
+    i = 0
+    while i < n:
+        spans.append((i, min(i + window, n)))
+        i += stride
+        # tail coverage
+        if i >= n and i - stride + window < n:
+            tail = (max(0, n - window), n)
+            if spans[-1] != tail:
+                spans.append(tail)
+            break
+    return spans
+
+
+def sync_repo(owner: str, name: str, exts: tuple, cache_dir: str, fresh_for: float = FRESH_FOR) -> Tuple[Path, Dict]:
+    """Bring <cache_dir>/<owner>__<name>/docs.jsonl up to date -> (repo cache dir, manifest state).
+
+    Within `fresh_for` seconds of the last check the remote is not contacted at
+    all; after that it costs one conditional request (304 when unchanged).
+    """
+    cache = Path(cache_dir) / f"{owner}__{name}"
+    cache.mkdir(parents=True, exist_ok=True)
+    docs_path = str(cache / "docs.jsonl")
+    manifest = IngestManifest(str(cache / "manifest.json"))
+    key, params = f"{owner}/{name}", {"exts": list(exts)}
+    if not os.path.exists(docs_path):
+        manifest.forget(key)
+    state = manifest.repo(key)
+    if state.get("params") == params and time.time() - state.get("checked", 0) < fresh_for:
+        return cache, state
+
+    changes = dict(iter_changes(manifest, owner, name, exts, branches=("main",), params=params))
+    if changes or not os.path.exists(docs_path):
+        fresh = ({"filename": rel, "content": text} for rel, text in changes.items() if text)
+        rewrite_jsonl(docs_path, changes.keys(), fresh)
+    manifest.save()
+    return cache, state
+
+
+def index_key(owner: str, name: str, state: Dict, exts: tuple, window: int, stride: int,
+              engine: str = "bm25", chunking: str = "window", dedup: float = 0.0) -> Dict:
+    # manifests written before commits were recorded fall back to a digest of the file table
+    commit = state.get("commit") or hashlib.sha1(
+        json.dumps(state.get("files", {}), sort_keys=True).encode("utf-8")).hexdigest()
+    return {"repo": f"{owner}/{name}", "commit": commit, "exts": list(exts),
+            "window": window, "stride": stride, "fields": TEXT_FIELDS, "engine": engine, "chunking": chunking,
+            "dedup": dedup}
+
+
+def file_entries(filename: str, content: str, window: int, stride: int, chunking: str = "window") -> List[Entry]:
+    """Chunk one file -> [(content, spans, meta)]. With chunking="code", source files
+    are cut on class/function/element boundaries (at most `window` chars per chunk)
+    and each chunk gets its own entry carrying its symbols."""
+    title = Path(filename).stem
+    chunks = code_chunks(filename, content, max_chars=window) if chunking == "code" else None
+    if chunks is None:
+        return [(content, window_spans(len(content), window, stride), {"filename": filename, "title": title})]
+    return [(content, [(start, end)], {"filename": filename, "title": title, "symbols": symbols_text(symbols)})
+            for start, end, symbols in chunks]
+
+
+def add_file(store: ChunkStore, filename: str, content: str, window: int, stride: int,
+             chunking: str = "window") -> None:
+    """Chunk one file into `store`; the text itself is stored once however many entries it has."""
+    for text, spans, meta in file_entries(filename, content, window, stride, chunking):
+        store.add(text, spans, **meta)
+
+
+def build_index(docs_path: str, window: int, stride: int, engine: str = "bm25",
+                chunking: str = "window", dedup: float = 0.0) -> SearchIndex:
+    """Chunk every cached file into a ChunkStore and fit the lexical index.
+
+    dedup > 0 drops repeated chunks before the fit: spans contained in another
+    span of the same file, and chunks whose estimated Jaccard similarity to an
+    earlier one is at least `dedup` (see near_dup.dedup_entries).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    if chunking not in CHUNKINGS:
+        raise ValueError(f"unknown chunking {chunking!r}, expected one of {CHUNKINGS}")
+    entries: List[Entry] = []
+    with span("index.chunk"), open(docs_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                entries.extend(file_entries(d["filename"], d["content"], window, stride, chunking))
+    if dedup > 0:
+        with span("index.dedup"):
+            entries, stats = dedup_entries(entries, dedup)
+        count("index.dedup.dropped", stats["chunks"] - stats["kept"])
+    store = ChunkStore()
+    for text, spans, meta in entries:
+        store.add(text, spans, **meta)
+    with span("index.fit"):
+        if engine == "bm25":
+            return BM25Index(TEXT_FIELDS).fit(store)
+
+        from minsearch import Index   # only needed to build; loading a saved index skips sklearn/pandas
+        index = Index(text_fields=TEXT_FIELDS)
+        index.fit(store.views())
+        return LexicalIndex.from_minsearch(index, store)
+
+
+def load_repo_index(owner: str, name: str, exts: tuple, window: int, stride: int,
+                    cache_dir: str, fresh_for: float = FRESH_FOR, engine: str = "bm25", chunking: str = "window",
+                    dedup: float = 0.0, on_stage: Optional[Callable[[str], None]] = None) -> SearchIndex:
+    """Open the saved index for the repo's current commit; rebuild (and save) only on a key mismatch."""
+    stage = on_stage or (lambda s: None)
+    stage("syncing repo")
+    with span("ingest.sync"):
+        cache, state = sync_repo(owner, name, exts, cache_dir, fresh_for)
+    key = index_key(owner, name, state, exts, window, stride, engine, chunking, dedup)
+    stage("opening saved index")
+    with span("index.open"):
+        index = open_index(str(cache / "index"), key)
+    if index is None:
+        stage("building index")
+        index = build_index(str(cache / "docs.jsonl"), window, stride, engine, chunking, dedup)
+        stage("saving index")
+        with span("index.save"):
+            save_index(index, str(cache / "index"), key)
+    return index
+
+
+def load_repo_vectors(owner: str, name: str, index: SearchIndex, cache_dir: str, model_name: str = DEFAULT_MODEL,
+                      dtype: str = "float16", batch_size: int = 64, encoder: Optional[Encoder] = None,
+                      on_batch=None) -> VectorIndex:
+    """Vector index over the same chunks as `index`.
+
+    Embeddings live in one content-addressed store per model under cache_dir,
+    shared by every repo (and by concurrent builds: one store instance and one
+    model per process), so only chunks never seen before are encoded. The IVF
+    lists are saved per repo, keyed by the store rows they cover.
+    """
+    store = open_store(os.path.join(cache_dir, "embeddings", f"{model_name.replace('/', '__')}-{dtype}"),
+                       model_name, dtype=dtype, batch_size=batch_size, encoder=encoder)
+    with span("index.embed"):
+        rows = store.rows_for((d["content"] for d in index.docs), on_batch=on_batch)
+    vectors = StoreRows(store, rows)
+
+    root = Path(cache_dir) / f"{owner}__{name}" / "vectors"
+    digest = hashlib.sha1(f"{model_name}:{dtype}:".encode("utf-8") + rows.tobytes()).hexdigest()[:16]
+    if (root / digest).is_dir():
+        ivf = IVFIndex.load(str(root / digest))
+    else:
+        with span("index.ivf"):
+            ivf = IVFIndex.build(vectors)
+        ivf.save(str(root / digest))
+        for old in root.iterdir():
+            if old.name != digest:
+                shutil.rmtree(old, ignore_errors=True)
+    return VectorIndex(encode_query=store.encode_query).fit(vectors, index.docs, ivf=ivf)
@@ -0,0 +1,105 @@
+# -----------------------------------------------------------
+# Streaming GitHub ZIP ingestion shared by the Day 1/Day 2 CLIs and the app
+# -----------------------------------------------------------
+import time, tempfile, zipfile
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import span, count, record
+
+CHUNK_BYTES = 256 << 10 # read the socket 256 KiB at a time
+SPOOL_BYTES = 1 << 20   # archives up to 1 MiB stay in RAM, larger ones spill to a temp file,
+                        # so peak memory stays flat with archive size and concurrent downloads
+CODELOAD    = "https://codeload.github.com"  # overridable, e.g. by a local fixture server
+POOL_SIZE   = 16        # keep-alive connections shared by concurrent downloads
+
+# One pooled keep-alive session for every download (branch retries, batch mode).
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+SESSION.mount("http://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+
+
+def zip_url(owner: str, repo: str, branch: str) -> str:
+    return f"{CODELOAD}/{owner}/{repo}/zip/refs/heads/{branch}"
+
+
+def spool_download(url: str, timeout: int = 60, headers: Optional[Dict[str, str]] = None,
+                   into: Optional[IO[bytes]] = None) -> Tuple[Optional[IO[bytes]], requests.Response]:
+    """Stream `url` into `into` (default: a spooled temp file, closed again if the download fails).
+
+    Returns (file or None if not 200, response).
+    """
+    with span("ingest.download"), SESSION.get(url, stream=True, timeout=timeout, headers=headers) as resp:
+        if resp.status_code != 200:
+            return None, resp
+        spool = into if into is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        n = 0
+        try:
+            for block in resp.iter_content(CHUNK_BYTES):
+                spool.write(block)
+                n += len(block)
+        except BaseException:
+            if into is None:   # ours: don't leave a half-written temp file behind
+                spool.close()
+            raise
+        finally:
+            count("ingest.bytes", n)
+    spool.seek(0)
+    return spool, resp
+
+
+def try_download(owner: str, repo: str, branches=("main", "master")) -> IO[bytes]:
+    """Spool the first branch archive that exists; caller closes the file."""
+    last_status = None
+    for br in branches:
+        spool, resp = spool_download(zip_url(owner, repo, br))
+        last_status = resp.status_code
+        if spool is not None:
+            return spool
+    raise RuntimeError(f"Failed to download {owner}/{repo} (tried {branches}, last={last_status})")
+
+
+def strip_top(filename: str) -> str:
+    """'<repo>-<branch>/docs/a.md' -> 'docs/a.md'"""
+    try:
+        _, rel = filename.split("/", maxsplit=1)
+    except ValueError:
+        rel = filename
+    return rel
+
+
+def iter_zip_texts(fileobj: IO[bytes], exts: Iterable[str],
+                   want: Optional[Callable[[str, zipfile.ZipInfo], bool]] = None) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (repo-relative filename, decoded text), one member at a time.
+
+    `want(rel, info)` runs before a member is decompressed and can skip it.
+    """
+    exts = tuple(exts)
+    files, decode_s = 0, 0.0   # one record()/count() per archive, not per member
+    try:
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                fn = info.filename
+                if not fn.lower().endswith(exts):
+                    continue
+                if want is not None and not want(strip_top(fn), info):
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    with zf.open(info) as f:
+                        text = f.read().decode("utf-8", errors="ignore")
+                except Exception as e:
+                    print(f"[WARN] {fn}: {e}")
+                    continue
+                finally:
+                    decode_s += time.perf_counter() - t0
+                files += 1
+                yield strip_top(fn), text
+    finally:
+        if files:
+            record("ingest.decode", decode_s)
+            count("ingest.files", files)
@@ -0,0 +1,291 @@
+# -----------------------------------------------------------
+# DermaScan HTTP/JSON API (asyncio, stdlib only) over one shared DermaScanCore
+#   python service.py --port 8765 [--fake-llm] [--preload SiriYellu/DermaScan_AndroidApp]
+#
+#   GET  /health
+#   GET  /status?owner=&name=       index state (starts the first build)
+#   GET  /stats                     caches, model router, loaded repos, interaction log
+#   GET  /logs?n=&model=&q=&since=  newest logged interactions;   GET /log?id=  one in full
+#   GET  /metrics                   stage timings and counters, Prometheus text;   GET /metrics.json  same as JSON
+#   POST /search  {owner, name, q, topk}
+#   POST /answer  {owner, name, q, topk, stream}   stream=true -> NDJSON events
+#   POST /refresh {owner, name}     rebuild now;   POST /schedule {every}  auto-refresh seconds (null = off)
+# -----------------------------------------------------------
+import os, json, asyncio, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from dermascan_core import DermaScanCore, IndexNotReady
+from tracing import REGISTRY
+
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_json(r) -> Dict[str, Any]:
+    return {k: v for k, v in dict(r).items() if not k.startswith("_")}
+
+
+class Service:
+    """Routes requests to the core. Blocking core calls (search, model calls, index
+    status) run on a thread pool, so the event loop keeps accepting and serving
+    other connections; every worker shares the same in-memory indexes."""
+
+    def __init__(self, core: DermaScanCore, workers: int = 32):
+        self.core = core
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, partial(fn, *args, **kwargs))
+
+    # ---------------- HTTP ----------------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:   # keep-alive: one request after another on the connection
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:   # body left unread: answer, then close
+                    await self._send_json(writer, e.status, {"error": str(e)})
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep = headers.get("connection", "").lower() != "close"
+                try:
+                    await self.dispatch(writer, method, path, query, body)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)})
+                except IndexNotReady as e:
+                    await self._send_json(writer, 503, {"error": str(e), "status": e.status})
+                except Exception as e:
+                    await self._send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        try:
+            n = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "bad Content-Length")
+        if n > MAX_BODY:
+            raise HTTPError(413, f"request body over {MAX_BODY} bytes")
+        body = await reader.readexactly(n) if n else b""
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return method.upper(), url.path, query, headers, body
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, data: bytes, content_type: str) -> None:
+        writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, obj: Any) -> None:
+        await self._send(writer, status, json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8"),
+                         "application/json")
+
+    async def _send_events(self, writer: asyncio.StreamWriter, events) -> None:
+        """NDJSON over chunked transfer encoding, one event per line as it is produced."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        async for event in events:
+            line = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # ---------------- routes ----------------
+    async def dispatch(self, writer, method: str, path: str, query: Dict[str, str], body: bytes) -> None:
+        routes = {("GET", "/health"): self.health, ("GET", "/status"): self.status, ("GET", "/stats"): self.stats,
+                  ("GET", "/logs"): self.logs, ("GET", "/log"): self.log,
+                  ("GET", "/metrics"): self.metrics, ("GET", "/metrics.json"): self.metrics_json,
+                  ("POST", "/search"): self.search, ("POST", "/answer"): self.answer,
+                  ("POST", "/refresh"): self.refresh, ("POST", "/schedule"): self.schedule}
+        route = routes.get((method, path))
+        if route is None:
+            raise HTTPError(405 if any(p == path for _, p in routes) else 404, f"no route for {method} {path}")
+        if method == "POST":
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+        else:
+            params = query
+        result = await route(params)
+        if isinstance(result, tuple):   # (status, body), ("events", async iterator) or ("text", str)
+            if result[0] == "events":
+                await self._send_events(writer, result[1])
+            elif result[0] == "text":
+                await self._send(writer, 200, result[1].encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            else:
+                await self._send_json(writer, *result)
+        else:
+            await self._send_json(writer, 200, result)
+
+    @staticmethod
+    def _repo(params: Dict) -> Tuple[str, str]:
+        owner, name = params.get("owner"), params.get("name")
+        if not owner or not name:
+            raise HTTPError(400, "owner and name are required")
+        return owner, name
+
+    @staticmethod
+    def _number(params: Dict, key: str, kind=int, default=None):
+        """params[key] as `kind`, `default` if missing or empty; a 400 if it is not a finite number."""
+        value = params.get(key)
+        if value is None or value == "":
+            return default
+        try:
+            number = kind(value)
+        except (TypeError, ValueError, OverflowError):
+            raise HTTPError(400, f"{key} must be a number, got {value!r}")
+        if number != number or number in (float("inf"), float("-inf")):
+            raise HTTPError(400, f"{key} must be a finite number, got {value!r}")
+        return number
+
+    @classmethod
+    def _question(cls, params: Dict) -> Tuple[str, int]:
+        q = (params.get("q") or "").strip()
+        if not q:
+            raise HTTPError(400, "q is required")
+        return q, max(1, min(cls._number(params, "topk", int, 5), 50))
+
+    async def health(self, params):
+        return {"ok": True}
+
+    async def status(self, params):
+        return await self.run(self.core.status, *self._repo(params))
+
+    async def stats(self, params):
+        return await self.run(self.core.stats)
+
+    async def logs(self, params):
+        n = max(1, min(self._number(params, "n", int, 10), 1000))
+        return {"logs": await self.run(self.core.recent_logs, n,
+                                       model=params.get("model") or None, question=params.get("q") or None,
+                                       since=self._number(params, "since", float))}
+
+    async def log(self, params):
+        if not params.get("id"):
+            raise HTTPError(400, "id is required")
+        entry = await self.run(self.core.interaction, params["id"])
+        if entry is None:
+            raise HTTPError(404, f"no interaction {params['id']}")
+        return entry
+
+    async def metrics(self, params):
+        return "text", REGISTRY.prometheus()
+
+    async def metrics_json(self, params):
+        return REGISTRY.snapshot()
+
+    async def refresh(self, params):
+        return {"started": await self.run(self.core.refresh, *self._repo(params))}
+
+    async def schedule(self, params):
+        every = self._number(params, "every", float)
+        if every is not None and every < 0:
+            raise HTTPError(400, f"every must be seconds >= 0 or null, got {every!r}")
+        self.core.indexes.set_refresh(every or None)
+        return {"every": self.core.indexes.refresh_every}
+
+    async def search(self, params):
+        owner, name = self._repo(params)
+        q, topk = self._question(params)
+        results = await self.run(self.core.search, owner, name, q, topk)
+        return {"results": [chunk_json(r) for r in results]}
+
+    async def answer(self, params):
+        owner, name = self._repo(params)
+        q, topk = self._question(params)
+        stream, used_files, results, model_used = await self.run(self.core.answer_stream, owner, name, q, topk)
+        sources = [chunk_json(r) for r in results[:topk]]
+
+        def summary():
+            return {**stream.timings(), "spans": stream.meta.get("spans", {}),
+                    "context": {k: v for k, v in stream.meta.get("context", {}).items() if k != "files"}}
+
+        if not params.get("stream"):
+            answer = await self.run(lambda: "".join(stream))
+            return {"answer": answer, "files": used_files, "model": model_used, "sources": sources, **summary()}
+
+        async def events():
+            yield {"event": "start", "files": used_files, "model": model_used, "sources": sources}
+            it, done = iter(stream), object()
+            try:
+                while True:   # each piece may wait on the model: pull it on the pool
+                    piece = await self.run(next, it, done)
+                    if piece is done:
+                        break
+                    yield {"event": "token", "text": piece}
+            except Exception as e:
+                yield {"event": "error", "error": f"{type(e).__name__}: {e}"}
+            yield {"event": "done", "answer": stream.text, **summary()}
+        return "events", events()
+
+
+async def serve(core: DermaScanCore, host: str = "127.0.0.1", port: int = 8765, workers: int = 32,
+                ready: Optional[threading.Event] = None, bound: Optional[list] = None) -> None:
+    service = Service(core, workers)
+    server = await asyncio.start_server(service.handle, host, port)
+    if bound is not None:
+        bound.append(server.sockets[0].getsockname()[1])
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def start_background(core: DermaScanCore, host: str = "127.0.0.1", port: int = 0, workers: int = 32) -> int:
+    """Run the service on a daemon thread (its own event loop); returns the bound port."""
+    ready, bound = threading.Event(), []
+    threading.Thread(target=lambda: asyncio.run(serve(core, host, port, workers, ready, bound)),
+                     name="dermascan-api", daemon=True).start()
+    ready.wait(timeout=30)
+    return bound[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=32, help="threads for search and model calls")
+    ap.add_argument("--fake-llm", action="store_true", default=os.environ.get("DERMASCAN_FAKE_LLM", "") == "1")
+    ap.add_argument("--preload", nargs="*", default=[], help="owner/name repos to index at startup")
+    args = ap.parse_args()
+
+    core = DermaScanCore(fake_llm=args.fake_llm)
+    for repo in args.preload:
+        core.status(*repo.split("/", 1))
+    print(f"DermaScan API on http://{args.host}:{args.port}")
+    asyncio.run(serve(core, args.host, args.port, args.workers))
+
+
+if __name__ == "__main__":
+    main()
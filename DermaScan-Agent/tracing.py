@@ -0,0 +1,192 @@
+# -----------------------------------------------------------
+# Lightweight tracing: named span timers and counters for every stage
+# (download, decode, chunk, fit, search, context, model), aggregated per
+# process and optionally collected per request; Prometheus text / JSON export
+#   DERMASCAN_TRACE=0 turns it off: span() then returns a shared no-op
+# Spans and counters are per stage, never per file or per token: loops over
+# members/tokens add up locally and record() / count() once at the end
+# -----------------------------------------------------------
+import os, time, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+ENABLED = os.environ.get("DERMASCAN_TRACE", "1") != "0"
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, float("inf"))   # seconds
+PREFIX = "dermascan"
+
+
+class Trace:
+    """Spans and counters of one request or build, in the order they finished."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[tuple] = []   # (name, seconds)
+        self.counters: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.append((name, seconds))
+
+    def timings(self) -> Dict[str, float]:
+        """name -> total ms (a span that ran several times is summed)."""
+        out: Dict[str, float] = {}
+        for name, s in self.spans:
+            out[name] = out.get(name, 0.0) + s * 1000
+        return {k: round(v, 2) for k, v in out.items()}
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("dermascan_trace", default=None)
+
+
+class Registry:
+    """Process-wide histograms of span durations and monotonic counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans: Dict[str, list] = {}      # name -> [count, sum, max, bucket counts...]
+        self.counters: Dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self.lock:
+            h = self.spans.get(name)
+            if h is None:
+                h = self.spans[name] = [0, 0.0, 0.0] + [0] * len(BUCKETS)
+            h[0] += 1
+            h[1] += seconds
+            if seconds > h[2]:
+                h[2] = seconds
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le:
+                    h[3 + i] += 1
+                    break
+
+    def inc(self, name: str, n: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self) -> None:
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            spans = {name: {"count": h[0], "total_ms": round(h[1] * 1000, 2),
+                            "mean_ms": round(h[1] * 1000 / h[0], 3) if h[0] else 0.0, "max_ms": round(h[2] * 1000, 2)}
+                     for name, h in sorted(self.spans.items())}
+            return {"enabled": ENABLED, "spans": spans, "counters": dict(sorted(self.counters.items()))}
+
+    def prometheus(self) -> str:
+        """Text exposition format: one histogram over span names plus one counter family."""
+        with self.lock:
+            lines = [f"# HELP {PREFIX}_span_seconds Duration of traced stages.",
+                     f"# TYPE {PREFIX}_span_seconds histogram"]
+            for name, h in sorted(self.spans.items()):
+                cum = 0
+                for i, le in enumerate(BUCKETS):
+                    cum += h[3 + i]
+                    lines.append(f'{PREFIX}_span_seconds_bucket{{span="{name}",le="{"+Inf" if le == float("inf") else le}"}} {cum}')
+                lines.append(f'{PREFIX}_span_seconds_sum{{span="{name}"}} {h[1]:.6f}')
+                lines.append(f'{PREFIX}_span_seconds_count{{span="{name}"}} {h[0]}')
+            lines += [f"# HELP {PREFIX}_events_total Traced counters.", f"# TYPE {PREFIX}_events_total counter"]
+            for name, v in sorted(self.counters.items()):
+                lines.append(f'{PREFIX}_events_total{{name="{name}"}} {v:g}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+    # a bound builtin, not a Python method: `with` calls it without a frame, it ignores its
+    # arguments and returns "" (falsy, so exceptions propagate); about half the cost of def __exit__
+    __enter__ = __exit__ = "".format
+
+
+_NOOP = _NoSpan()
+
+
+# span() is one of these two bodies (set_enabled swaps its __code__, so names bound by
+# `from tracing import span` follow); defaults are locals, so the off path looks up nothing
+def _span_on(name: str, _noop=_NOOP, _Span=_Span):
+    return _Span(name)
+
+
+def _span_off(name: str, _noop=_NOOP, _Span=_Span):
+    return _noop
+
+
+def span(name: str, _noop=_NOOP, _Span=_Span):
+    """`with span("index.fit"):` times the block; a shared no-op when tracing is off."""
+    return _Span(name)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already measured duration (e.g. a stream's time to first token)."""
+    if not ENABLED:
+        return
+    REGISTRY.observe(name, seconds)
+    tr = _current.get()
+    if tr is not None:
+        tr.add(name, seconds)
+
+
+def count(name: str, n: float = 1) -> None:
+    if not ENABLED:
+        return
+    REGISTRY.inc(name, n)
+    tr = _current.get()
+    if tr is not None:
+        tr.counters[name] = tr.counters.get(name, 0) + n
+
+
+@contextmanager
+def collect(trace: Optional[Trace] = None):
+    """Also gather the spans finished in this thread/context into `trace` (a new one by default)."""
+    trace = trace or Trace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def set_enabled(flag: bool) -> None:
+    global ENABLED
+    ENABLED = flag
+    span.__code__ = (_span_on if flag else _span_off).__code__
+
+
+set_enabled(ENABLED)
+
+
+def summary(title: str = "timings") -> str:
+    """Per-stage table for CLI output."""
+    snap = REGISTRY.snapshot()
+    lines = [f"[{title.upper()}] {'stage':<24} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for name, s in snap["spans"].items():
+        lines.append(f"[{title.upper()}] {name:<24} {s['count']:>7} {s['total_ms']:>10.1f} {s['mean_ms']:>9.2f} "
+                     f"{s['max_ms']:>9.1f}")
+    if snap["counters"]:
+        lines.append(f"[{title.upper()}] " + ", ".join(f"{k}={v:g}" for k, v in snap["counters"].items()))
+    return "\n".join(lines)